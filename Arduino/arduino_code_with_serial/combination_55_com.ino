@@ -6,6 +6,7 @@
 
 //******************************  INCLUDING FILES
 #include "global.h"
+#include "protocol.h"
 #include <Wire.h>
 #include <ArduinoJson.h>
 
@@ -24,7 +25,14 @@ void sendTFTMessage(String message) {
 
 //****************************************  LCD DISPLAY FUNCTION
 void startDisplay() {
-    if (!game_active) {  // Show default screen if no game is active
+    if (!python_ready) {  // Python is still starting up (camera, model, engines)
+        sendTFTMessage("\n"
+                       "        CHESS \n"
+                       "\n"
+                       "     AI VS HUMAN \n"
+                       "\n\n"
+                       "   Starting up...\n");
+    } else if (!game_active) {  // Show default screen if no game is active
         sendTFTMessage("\n"
                        "        CHESS \n"
                        "\n"
@@ -50,21 +58,33 @@ void promptHumanMoveCheck() {
 
 //****************************************  SEND TO PYTHON
 void sendToPython(String data) {
-    Serial.println(data);
+    if (FRAMED_PROTOCOL) sendFrameMessage(data);  // Blocks until Python acknowledges it
+    else Serial.println(data);
 }
 
 
 
 //****************************************  RECEIVE DATA FROM PYTHON
+// Next message from Python, or "" if none has arrived
+String pollFromPython() {
+    if (FRAMED_PROTOCOL) {
+        pollFrames();
+        return inbox_count ? nextInboxMessage() : "";
+    }
+    if (Serial.available()) {
+        String received_data = Serial.readStringUntil('\n');
+        received_data.trim();
+        return received_data;
+    }
+    return "";
+}
+
 String receiveFromPython(unsigned long timeout = 3000) {
     unsigned long start_time = millis();
     
     while (millis() - start_time < timeout) {
-        if (Serial.available()) {
-            String received_data = Serial.readStringUntil('\n');
-            received_data.trim(); 
-            return received_data; 
-        }
+        String received_data = pollFromPython();
+        if (received_data.length()) return received_data;
     }
     
     return "TIMEOUT";  // Return "TIMEOUT" if no data received
@@ -73,7 +93,7 @@ String receiveFromPython(unsigned long timeout = 3000) {
 
 //****************************************  SETUP
 void setup() {
-  Serial.begin(9600);
+  Serial.begin(SERIAL_BAUD);
   Serial1.begin(9600);
 
 
@@ -101,6 +121,7 @@ void setup() {
   digitalWrite(EN_A, HIGH);
   digitalWrite(EN_B, HIGH);
 
+  sendSync();  // Python forgets our last seq before anything else arrives
   Serial.println("DEBUG: System initialized...");
     
   startDisplay();
@@ -111,6 +132,19 @@ void loop() {
     stop_execution = false;
     unsigned long current_time = millis(); // Get the current time
 
+    // Pre-positioning sent by Python while the human thinks (e.g. "PARK:T8,12")
+    String command = pollFromPython();
+    if (command.length()) {
+        if (command == "READY") {
+            Serial.println("DEBUG: Python ready.");
+            python_ready = true;
+            startDisplay();
+        } else if (command.startsWith("PARK:") && game_active) {
+            Serial.println("DEBUG: Parking trolley.");
+            execute_plan(command.substring(5));
+        }
+    }
+
     // Read button states
     if (digitalRead(START_BUTTON) == LOW) sequence = start;
     else if (digitalRead(END_BUTTON) == LOW) sequence = end;
@@ -121,7 +155,12 @@ void loop() {
     // Switch-Case to handle button actions
     switch (sequence) {
         case start:
-            if (!game_active && (current_time - last_start_press_time > debounce_delay)) {
+            if (!python_ready) {  // Ignored until Python has sent READY
+                if (current_time - last_start_press_time > debounce_delay) {
+                    last_start_press_time = current_time;
+                    Serial.println("DEBUG: Python not ready yet.");
+                }
+            } else if (!game_active && (current_time - last_start_press_time > debounce_delay)) {
                 last_start_press_time = current_time;
 
                 sendToPython("START");
@@ -189,8 +228,9 @@ void loop() {
                         String aiMove = receiveFromPython(5000);
                         Serial.print("DEBUG: AI Move Received: "); Serial.println(aiMove);
 
-                        // Validate AI move format (e.g., "e2e4:0" or "e7e8:1")
-                        if (aiMove.length() == 6 && aiMove[4] == ':') {
+                        // Validate AI move format (e.g., "e2e4:0" or "e7e8:1", optionally "e2e4:1|<plan>")
+                        bool has_plan = aiMove.length() > 7 && aiMove[6] == '|';
+                        if ((aiMove.length() == 6 || has_plan) && aiMove[4] == ':') {
                             char move[5];
                             aiMove.substring(0, 4).toCharArray(move, 5);
                             capture_flag = aiMove[5] - '0'; // '0' or '1'
@@ -202,7 +242,12 @@ void loop() {
                             }
 
                             sendTFTMessage(displayMessage);
-                            piece_movement(move, capture_flag);
+                            if (has_plan) {
+                                execute_plan(aiMove.substring(7));  // Path planned by Python
+                                if (capture_flag == 0) captured_piece_count++;
+                            } else {
+                                piece_movement(move, capture_flag);
+                            }
 
                             // Wait for AI Move Status
                             sendToPython("ASK_AI_STATUS");
@@ -253,6 +298,19 @@ void loop() {
                                       + moves);
 
                         delay(3000);
+                    } else if (python_response.startsWith("MOVE_ERROR:")) {
+                        Serial.println("DEBUG: Invalid move, showing nearest legal moves.");
+
+                        // Extract the suggested moves from the response
+                        int colonIndex = python_response.indexOf(':');
+                        String suggestions = python_response.substring(colonIndex + 1);
+
+                        sendTFTMessage("\n    Invalid Move\n"
+                                      "\n   Did you mean:\n\n "
+                                      + suggestions);
+
+                        delay(3000);
+                        promptHumanMove();
                     } else {
                         Serial.println("DEBUG: Invalid move or invalid board!");
 
@@ -687,3 +745,83 @@ void piece_movement(char *move, byte capture_flag) {
   Serial.println("DEBUG: Move Completed!");
 }
 
+
+
+// *******************************  COMBINED MOVE
+// Move both motors together by (dx, dy) squares: motor A turns (dx - dy), motor B -(dx + dy)
+void move_to(float dx, float dy, int speed) {
+  if (stop_execution) return;
+
+  long steps_A = lround((dx - dy) * SQUARE_SIZE);
+  long steps_B = lround(-(dx + dy) * SQUARE_SIZE);
+
+  //  Direction of the motor rotation (same convention as motor())
+  digitalWrite(DIR_A, steps_A > 0 ? HIGH : LOW);
+  digitalWrite(DIR_B, steps_B > 0 ? HIGH : LOW);
+  steps_A = labs(steps_A);
+  steps_B = labs(steps_B);
+
+  //  Bresenham: the motor with more steps steps every time, the other one evenly in between
+  long step_number = max(steps_A, steps_B);
+  long error_A = 0;
+  long error_B = 0;
+  for (long x = 0; x < step_number; x++) {
+    if (checkStopCondition() || stop_execution) return;
+
+    error_A += steps_A;
+    error_B += steps_B;
+    if (error_A >= step_number) {
+      digitalWrite(STEP_A, HIGH);
+      error_A -= step_number;
+    }
+    if (error_B >= step_number) {
+      digitalWrite(STEP_B, HIGH);
+      error_B -= step_number;
+    }
+    delayMicroseconds(speed);
+    digitalWrite(STEP_A, LOW);
+    digitalWrite(STEP_B, LOW);
+    delayMicroseconds(speed);
+  }
+}
+
+
+
+// *******************************  PLANNED PATH
+// Run a waypoint plan from Python: "T10,14;G;C9,13;R"
+// T = travel (fast), C = carry (slow) to x,y in half squares; G/R = magnet on/off; W = wait ms
+void execute_plan(String plan) {
+  Serial.println("DEBUG: Executing plan: " + plan);
+
+  float x = trolley_coordinate_X;
+  float y = trolley_coordinate_Y;
+  int start = 0;
+
+  while (start < (int)plan.length()) {
+    if (stop_execution) return;
+
+    int end = plan.indexOf(';', start);
+    if (end < 0) end = plan.length();
+    String step = plan.substring(start, end);
+    start = end + 1;
+
+    char kind = step[0];
+    if (kind == 'T' || kind == 'C') {
+      int comma = step.indexOf(',');
+      float target_X = step.substring(1, comma).toInt() / 2.0;
+      float target_Y = step.substring(comma + 1).toInt() / 2.0;
+      move_to(target_X - x, target_Y - y, kind == 'C' ? SPEED_SLOW : SPEED_FAST);
+      x = target_X;
+      y = target_Y;
+    }
+    else if (kind == 'G') electromagnet(true);
+    else if (kind == 'R') electromagnet(false);
+    else if (kind == 'W') delay(step.substring(1).toInt());
+  }
+
+  if (stop_execution) return;
+  // Plans end on a square
+  trolley_coordinate_X = round(x);
+  trolley_coordinate_Y = round(y);
+  Serial.println("DEBUG: Plan Completed!");
+}
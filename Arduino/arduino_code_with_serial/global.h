@@ -1,3 +1,7 @@
+//  Serial link to Python (must match SERIAL_BAUD / SERIAL_PROTOCOL in chess_test.py)
+const long SERIAL_BAUD = 115200;
+const bool FRAMED_PROTOCOL = true;  // false: plain text lines, as before
+
 //  Chessboard
 const float TROLLEY_START_POSITION_X = 2;
 const float TROLLEY_START_POSITION_Y = 5.7;
@@ -8,6 +12,7 @@ byte trolley_coordinate_Y = 7;
 byte capture_flag = 1;
 byte captured_piece_count = 0;
 boolean game_active = false;
+boolean python_ready = false;  // Set by Python's READY once its camera, model and engines are up
 boolean stop_execution = false;
 boolean difficulty_selected = false;
 
@@ -0,0 +1,227 @@
+//  Framed serial protocol, version 1 (same as Python/Chess v3/protocol.py)
+//
+//  Frame: 0xA5 | version << 4 | type | seq | length | payload | CRC-16 (CCITT, high byte first)
+//  DATA frames are acknowledged with an ACK frame of the same seq and retransmitted until
+//  they are. Payloads are compacted messages; decodeMessage() turns them back into the same
+//  text the game code used before ("MOVE_OK", "e2e4:1|T10,14;G;...").
+//  Each side opens with a SYN frame (acknowledged like DATA): the other side then forgets the
+//  last seq it received, so the first frame after a restart is never dropped as a repeat.
+
+#define PROTOCOL_VERSION 1
+#define FRAME_SOF 0xA5
+#define FRAME_DATA 0
+#define FRAME_ACK 1
+#define FRAME_SYN 2
+#define ACK_TIMEOUT_MS 100
+#define MAX_RETRIES 5
+#define INBOX_SIZE 4
+
+#define MSG_MOVE_ERROR 0x20
+#define MSG_MOVE_ERROR_CHECK 0x21
+#define MSG_AI_MOVE 0x22
+#define MSG_PARK 0x23
+#define MSG_TEXT 0x7F
+
+struct FixedMessage {
+  byte id;
+  const char *text;
+};
+
+const FixedMessage FIXED_MESSAGES[] = {
+  // Arduino -> Python
+  {0x01, "START"}, {0x02, "END"}, {0x03, "EASY"}, {0x04, "HARD"}, {0x05, "MOVE_CONFIRM"},
+  {0x06, "ASK_HUMAN_STATUS"}, {0x07, "ASK_AI_MOVE"}, {0x08, "ASK_AI_STATUS"},
+  // Python -> Arduino
+  {0x10, "START_OK"}, {0x11, "START_ERROR"}, {0x12, "MOVE_OK"}, {0x13, "MOVE_ERROR"},
+  {0x14, "MOVE_NO_CHANGE"}, {0x15, "GAME_CONTINUES"}, {0x16, "Human is CHECK"}, {0x17, "AI is CHECK"},
+  {0x18, "CHECKMATE: Human Wins"}, {0x19, "CHECKMATE: AI Wins"}, {0x1A, "STALEMATE"},
+  {0x1B, "DRAW INSUFFICIENT MATERIAL"}, {0x1C, "DRAW REPETITION"}, {0x1D, "DRAW 50 MOVE RULE"},
+  {0x1E, "READY"},
+};
+const byte FIXED_MESSAGE_COUNT = sizeof(FIXED_MESSAGES) / sizeof(FIXED_MESSAGES[0]);
+
+byte tx_seq = 0;
+int last_ack_seq = -1;
+int last_rx_seq = -1;
+
+byte frame_buffer[6 + 255];
+int frame_length = 0;
+
+String inbox[INBOX_SIZE];  // Decoded messages from Python, oldest first
+byte inbox_count = 0;
+
+
+//****************************************  CRC
+uint16_t crc16Update(uint16_t crc, const byte *data, int length) {
+  for (int i = 0; i < length; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (byte bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+
+//****************************************  ENCODE
+void writeFrame(byte type, byte seq, const byte *payload, byte length) {
+  byte header[3] = {(byte)((PROTOCOL_VERSION << 4) | type), seq, length};
+  uint16_t crc = crc16Update(0xFFFF, header, 3);
+  crc = crc16Update(crc, payload, length);
+
+  Serial.write(FRAME_SOF);
+  Serial.write(header, 3);
+  if (length) Serial.write(payload, length);
+  Serial.write((byte)(crc >> 8));
+  Serial.write((byte)(crc & 0xFF));
+}
+
+// Messages to Python are all fixed ones; anything else goes as text
+byte encodeMessage(String data, byte *payload, byte size) {
+  for (byte i = 0; i < FIXED_MESSAGE_COUNT; i++) {
+    if (data == FIXED_MESSAGES[i].text) {
+      payload[0] = FIXED_MESSAGES[i].id;
+      return 1;
+    }
+  }
+  payload[0] = MSG_TEXT;
+  byte length = min((unsigned int)(size - 1), data.length());
+  for (byte i = 0; i < length; i++) payload[i + 1] = data[i];
+  return length + 1;
+}
+
+
+//****************************************  DECODE
+String squareName(byte square) {
+  char name[3] = {(char)('a' + (square & 7)), (char)('1' + (square >> 3)), 0};
+  return String(name);
+}
+
+String moveName(uint16_t word) {
+  String name = squareName(word & 0x3F) + squareName((word >> 6) & 0x3F);
+  byte promotion = word >> 12;
+  if (promotion) name += "?pnbrqk"[promotion];
+  return name;
+}
+
+// Plan ops back to text: "T10,14;G;C9,13;R;W200"
+String planText(const byte *data, int length) {
+  String text = "";
+  int i = 0;
+  while (i < length) {
+    if (text.length()) text += ";";
+    char kind = data[i];
+    text += kind;
+    if (kind == 'T' || kind == 'C') {
+      text += String((int8_t)data[i + 1]) + "," + String((int8_t)data[i + 2]);
+      i += 3;
+    } else if (kind == 'W') {
+      text += String(((unsigned int)data[i + 1] << 8) | data[i + 2]);
+      i += 3;
+    } else {
+      i += 1;
+    }
+  }
+  return text;
+}
+
+String decodeMessage(const byte *payload, byte length) {
+  byte id = payload[0];
+  for (byte i = 0; i < FIXED_MESSAGE_COUNT; i++) {
+    if (FIXED_MESSAGES[i].id == id) return FIXED_MESSAGES[i].text;
+  }
+
+  if (id == MSG_MOVE_ERROR || id == MSG_MOVE_ERROR_CHECK) {
+    String text = (id == MSG_MOVE_ERROR) ? "MOVE_ERROR:" : "MOVE_ERROR_CHECK:";
+    for (int i = 1; i + 1 < length; i += 2) {
+      if (i > 1) text += " ";
+      text += moveName(((uint16_t)payload[i] << 8) | payload[i + 1]);
+    }
+    return text;
+  }
+  if (id == MSG_AI_MOVE && length >= 4) {
+    String text = moveName(((uint16_t)payload[1] << 8) | payload[2]).substring(0, 4) + ":" + String(payload[3]);
+    if (length > 4) text += "|" + planText(payload + 4, length - 4);
+    return text;
+  }
+  if (id == MSG_PARK) return "PARK:" + planText(payload + 1, length - 1);
+
+  String text = "";
+  for (byte i = 1; i < length; i++) text += (char)payload[i];
+  return text;
+}
+
+
+//****************************************  RECEIVE
+void handleFrame() {
+  byte length = frame_buffer[3];
+  uint16_t crc = ((uint16_t)frame_buffer[4 + length] << 8) | frame_buffer[5 + length];
+  if (crc != crc16Update(0xFFFF, frame_buffer + 1, 3 + length)) {
+    Serial.println("DEBUG: Frame CRC error, waiting for retransmission.");
+    return;
+  }
+  if ((frame_buffer[1] >> 4) != PROTOCOL_VERSION) return;
+
+  byte type = frame_buffer[1] & 0x0F;
+  byte seq = frame_buffer[2];
+  if (type == FRAME_ACK) {
+    last_ack_seq = seq;
+  } else if (type == FRAME_SYN) {
+    writeFrame(FRAME_ACK, seq, NULL, 0);
+    last_rx_seq = -1;  // Python restarted: its seqs start over
+  } else if (type == FRAME_DATA && length > 0) {
+    writeFrame(FRAME_ACK, seq, NULL, 0);
+    if (seq == last_rx_seq) return;  // Retransmission of a frame we already have
+    last_rx_seq = seq;
+    if (inbox_count < INBOX_SIZE) inbox[inbox_count++] = decodeMessage(frame_buffer + 4, length);
+  }
+}
+
+// Read whatever bytes arrived; complete frames end up acknowledged and in the inbox
+void pollFrames() {
+  while (Serial.available()) {
+    byte b = Serial.read();
+    if (frame_length == 0 && b != FRAME_SOF) continue;  // Python only sends frames
+    frame_buffer[frame_length++] = b;
+    if (frame_length >= 4 && frame_length == 6 + frame_buffer[3]) {
+      handleFrame();
+      frame_length = 0;
+    }
+  }
+}
+
+String nextInboxMessage() {
+  String message = inbox[0];
+  for (byte i = 1; i < inbox_count; i++) inbox[i - 1] = inbox[i];
+  inbox_count--;
+  return message;
+}
+
+
+//****************************************  SEND
+// One frame, retransmitted until acknowledged; false if it never is
+bool sendFrame(byte type, const byte *payload, byte length) {
+  byte seq = tx_seq++;
+  last_ack_seq = -1;
+
+  for (byte attempt = 0; attempt <= MAX_RETRIES; attempt++) {
+    writeFrame(type, seq, payload, length);
+    unsigned long sent_time = millis();
+    while (millis() - sent_time < ACK_TIMEOUT_MS) {
+      pollFrames();
+      if (last_ack_seq == seq) return true;
+    }
+  }
+  return false;
+}
+
+void sendFrameMessage(String data) {
+  byte payload[64];
+  byte length = encodeMessage(data, payload, sizeof(payload));
+  if (!sendFrame(FRAME_DATA, payload, length)) Serial.println("DEBUG: No ack from Python for " + data);
+}
+
+// Called once from setup(): tells Python the board restarted
+void sendSync() {
+  if (!sendFrame(FRAME_SYN, NULL, 0)) Serial.println("DEBUG: No ack from Python for SYN");
+}
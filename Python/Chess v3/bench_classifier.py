@@ -0,0 +1,128 @@
+"""Latency/agreement benchmark: per-square classifier vs the YOLO detector, on CPU.
+
+Both run the full path from a camera frame to the board_state dict the game uses (detector:
+board crop + box-to-square mapping; classifier: warp, 64 tiles in one batch). The frames are the
+validation split of the dataset's labels.json by default, so the classifier never trained on
+them. Those labels come from the detector itself, so they are no ground truth: the classifier is
+reported as agreement with the detector. Accuracy is only reported against boards checked by
+hand (--truth: a copy of labels.json with its boards corrected, scored on the frames it lists):
+    python bench_classifier.py --frames frames/ --backends torch onnx openvino
+    python bench_classifier.py --frames frames/ --truth hand_checked.json
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+import chess
+import cv2
+
+from bench_detector import square_accuracy
+from board_calibration import (CALIBRATION_FILE, board_roi, build_square_lut, compute_homography, default_corners,
+                               load_calibration)
+from detector_backends import BACKENDS, YoloDetector
+from game_session import map_detections, map_squares
+from square_classifier import CLASSIFIER_WEIGHTS, BoardWarper, SquareClassifier
+from train_square_classifier import DATASET_DIR
+
+os.environ["CUDA_VISIBLE_DEVICES"] = ""  # CPU only, like the tables (read when torch is imported)
+
+
+def board_from_fen(board_fen):
+    board = chess.Board(board_fen)
+    return {chess.square_name(square): piece.symbol() for square, piece in board.piece_map().items()}
+
+
+# Share of frames whose whole board matches
+def board_agreement(states, reference):
+    return sum(s == r for s, r in zip(states, reference)) / len(states)
+
+
+def run(recognize, frames, warmup=3):
+    for frame in frames[:warmup]:
+        recognize(frame)
+
+    latencies = []
+    states = []
+    for frame in frames:
+        start = time.perf_counter()
+        board_state, _ = recognize(frame)
+        latencies.append((time.perf_counter() - start) * 1000)
+        states.append(board_state)
+    return latencies, states
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the square classifier with the YOLO detector on CPU.")
+    parser.add_argument("--frames", default="frames")
+    parser.add_argument("--labels", default=os.path.join(DATASET_DIR, "labels.json"))
+    parser.add_argument("--truth", help="hand-checked boards (labels.json format) to score accuracy on")
+    parser.add_argument("--split", choices=["val", "train", "all"], default="val")
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--classifier", default=CLASSIFIER_WEIGHTS)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["torch"])
+    parser.add_argument("--imgsz", type=int, default=640, help="detector imgsz")
+    parser.add_argument("--crop-margin", type=int, default=40)
+    parser.add_argument("--calibration", default=CALIBRATION_FILE)
+    args = parser.parse_args()
+
+    with open(args.labels, encoding="utf-8") as f:
+        labels = json.load(f)
+    checked = None
+    if args.truth:
+        with open(args.truth, encoding="utf-8") as f:
+            checked = json.load(f)
+    frames, truth = [], []
+    for name, label in sorted(labels.items()):
+        if args.split not in ("all", label["split"]) or (checked is not None and name not in checked):
+            continue
+        frame = cv2.imread(os.path.join(args.frames, name))
+        if frame is None:
+            continue
+        frames.append(frame)
+        if checked is not None:
+            truth.append(board_from_fen(checked[name]["board"]))
+    if not frames:
+        print(f"❌ No {args.split} frames of {args.labels} found in {args.frames}")
+        return
+    print(f"{len(frames)} {args.split} frames" + (f", hand-checked boards from {args.truth}" if checked else
+                                                  ", no hand-checked boards: agreement with the detector only"))
+
+    corners = load_calibration(args.calibration) or default_corners(340, 940, 60, 660)
+    height, width = frames[0].shape[:2]
+    lut = build_square_lut(compute_homography(corners), width, height)
+    roi = board_roi(corners, args.crop_margin, frames[0].shape)
+    warper = BoardWarper(corners)
+
+    # Agreement is with the detector on the same backend; accuracy only with hand-checked boards
+    print(f"{'recognition':<12}{'backend':<10}{'mean ms':>10}{'p95 ms':>10}{'board agree':>13}{'square agree':>14}"
+          + (f"{'board acc':>11}{'square acc':>12}" if truth else ""))
+
+    def report(kind, backend, latencies, states, reference=None):
+        p95 = sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)]
+        line = f"{kind:<12}{backend:<10}{statistics.mean(latencies):>10.1f}{p95:>10.1f}"
+        if reference:
+            line += f"{board_agreement(states, reference):>13.3f}{square_accuracy(states, reference):>14.4f}"
+        else:
+            line += f"{'-':>13}{'-':>14}"
+        if truth:
+            line += f"{board_agreement(states, truth):>11.3f}{square_accuracy(states, truth):>12.4f}"
+        print(line)
+
+    for backend in args.backends:
+        try:
+            detector = YoloDetector(args.weights, backend, args.imgsz, roi=roi)
+            classifier = SquareClassifier(args.classifier, backend, warper=warper)
+        except Exception as e:  # Missing onnxruntime/openvino, failed export, ...
+            print(f"⚠ Skipping {backend}: {e}")
+            continue
+        latencies, detected = run(lambda frame: map_detections(detector(frame), detector.names, lut), frames)
+        report("detector", backend, latencies, detected)
+        report("classifier", backend,
+               *run(lambda frame: map_squares(classifier(frame), classifier.names, warper.square_boxes), frames),
+               reference=detected)
+
+
+if __name__ == "__main__":
+    main()
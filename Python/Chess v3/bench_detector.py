@@ -0,0 +1,118 @@
+"""Accuracy/latency benchmark of detector backends on recorded frames.
+
+Record frames from the table camera first, then compare backends:
+    python bench_detector.py --record 100 --frames frames/
+    python bench_detector.py --frames frames/ --backends torch onnx openvino --imgsz 640 480 320 --int8
+
+Accuracy is measured against the reference setup (PyTorch, full frame, imgsz 640): a frame
+counts as correct when its square -> piece map is identical to the reference one.
+"""
+import argparse
+import itertools
+import os
+import statistics
+import time
+
+import chess
+import cv2
+
+from board_calibration import board_roi, build_square_lut, compute_homography, default_corners, load_calibration
+from detector_backends import BACKENDS, YoloDetector, load_frames
+from game_session import map_detections
+
+
+def record_frames(camera, count, directory):
+    os.makedirs(directory, exist_ok=True)
+    cap = cv2.VideoCapture(camera)
+    cap.set(3, 1280)
+    cap.set(4, 720)
+    recorded = 0
+    while recorded < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        cv2.imwrite(os.path.join(directory, f"frame_{recorded:05d}.png"), frame)
+        recorded += 1
+        time.sleep(0.2)  # Spread frames over moves and lighting changes
+    cap.release()
+    print(f"📸 Recorded {recorded} frames to {directory}")
+
+
+def run(detector, frames, lut, warmup=3):
+    for frame in frames[:warmup]:
+        detector(frame)
+
+    latencies = []
+    states = []
+    for frame in frames:
+        start = time.perf_counter()
+        found = detector(frame)
+        latencies.append((time.perf_counter() - start) * 1000)
+        states.append(map_detections(found, detector.names, lut)[0])  # The game's own square mapping
+    return latencies, states
+
+
+def square_accuracy(states, reference):
+    correct = total = 0
+    for state, ref in zip(states, reference):
+        for square in chess.SQUARE_NAMES:
+            correct += state.get(square) == ref.get(square)
+            total += 1
+    return correct / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare detector backends on recorded frames.")
+    parser.add_argument("--frames", default="frames")
+    parser.add_argument("--record", type=int, default=0, help="record this many camera frames first")
+    parser.add_argument("--camera", type=int, default=1)
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[640, 480, 320])
+    parser.add_argument("--int8", action="store_true", help="also benchmark int8 exports")
+    parser.add_argument("--crop-margin", type=int, default=40)
+    parser.add_argument("--calibration-data", help="dataset yaml for int8 OpenVINO quantization")
+    args = parser.parse_args()
+
+    if args.record:
+        record_frames(args.camera, args.record, args.frames)
+
+    frames = load_frames(args.frames)
+    if not frames:
+        print(f"❌ No frames found in {args.frames}")
+        return
+    height, width = frames[0].shape[:2]
+
+    corners = load_calibration() or default_corners(340, 940, 60, 660)
+    lut = build_square_lut(compute_homography(corners), width, height)
+    roi = board_roi(corners, args.crop_margin, frames[0].shape)
+
+    reference_latencies, reference = run(YoloDetector(args.weights, "torch", 640), frames, lut)
+    print(f"{'backend':<10}{'imgsz':>6}{'crop':>6}{'int8':>6}{'mean ms':>10}{'p95 ms':>10}"
+          f"{'board acc':>11}{'square acc':>12}")
+
+    def report(backend, imgsz, crop, int8, latencies, states):
+        p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1]
+        board_acc = sum(s == r for s, r in zip(states, reference)) / len(states)
+        print(f"{backend:<10}{imgsz:>6}{'yes' if crop else 'no':>6}{'yes' if int8 else 'no':>6}"
+              f"{statistics.mean(latencies):>10.1f}{p95:>10.1f}{board_acc:>11.3f}"
+              f"{square_accuracy(states, reference):>12.4f}")
+
+    report("torch", 640, False, False, reference_latencies, reference)
+
+    int8_options = [False, True] if args.int8 else [False]
+    for backend, imgsz, int8 in itertools.product(args.backends, args.imgsz, int8_options):
+        if int8 and backend == "torch":
+            continue
+        try:
+            detector = YoloDetector(args.weights, backend, imgsz, roi=roi, int8=int8,
+                                    calibration_frames=args.frames, calibration_data=args.calibration_data)
+        except Exception as e:  # Missing onnxruntime/openvino, failed export, ...
+            print(f"⚠ Skipping {backend} imgsz={imgsz} int8={int8}: {e}")
+            continue
+        latencies, states = run(detector, frames, lut)
+        report(backend, imgsz, True, int8, latencies, states)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Mechanical time of AI moves: Arduino piece_movement vs the host motion planner (simulated).
+
+Plays random games (the AI is Black, as on the table) and runs every AI move through the
+kinematic simulator three ways: the firmware's own routine, the planner, and the planner with
+the trolley pre-positioned while the human thinks. No hardware needed:
+    python bench_motion.py --games 200
+"""
+import argparse
+import random
+import statistics
+
+import chess
+
+from motion_planner import START_POSITION, MotionPlanner, legacy_plan, simulate, square_xy
+from strength import ai_root_moves
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated trolley time per AI move, firmware vs planner.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--max-plies", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    names = ("firmware", "planner", "planner + park")
+    times = {name: {False: [], True: []} for name in names}  # name -> capture? -> seconds per AI move
+    park_times = []
+
+    for _ in range(args.games):
+        board = chess.Board()
+        legacy_position, legacy_captured = START_POSITION, 0
+        planner, parked = MotionPlanner(), MotionPlanner()
+
+        while not board.is_game_over() and board.ply() < args.max_plies:
+            if board.turn == chess.WHITE:
+                start = parked.position
+                park_times.append(simulate(parked.plan_park(board), start).total_s)  # Human's thinking time
+                board.push(rng.choice(list(board.legal_moves)))
+                continue
+
+            move = rng.choice(ai_root_moves(board))
+            capture = board.is_capture(move)
+
+            plan = legacy_plan(square_xy(move.from_square), square_xy(move.to_square), capture,
+                               legacy_position, legacy_captured)
+            estimate = simulate(plan, legacy_position)
+            times["firmware"][capture].append(estimate.total_s)
+            legacy_position, legacy_captured = estimate.end, legacy_captured + capture
+
+            for name, p in (("planner", planner), ("planner + park", parked)):
+                start = p.position
+                times[name][capture].append(simulate(p.plan_move(board, move), start).total_s)
+
+            board.push(move)
+
+    print(f"{'AI moves':<16}{'all s':>8}{'quiet s':>9}{'capture s':>11}{'vs firmware':>13}")
+    firmware_mean = statistics.mean(times["firmware"][False] + times["firmware"][True])
+    for name in names:
+        every = times[name][False] + times[name][True]
+        mean = statistics.mean(every)
+        print(f"{name:<16}{mean:>8.2f}{statistics.mean(times[name][False]):>9.2f}"
+              f"{statistics.mean(times[name][True]) if times[name][True] else 0.0:>11.2f}"
+              f"{mean / firmware_mean - 1:>+13.0%}")
+    print(f"{len(times['firmware'][False]) + len(times['firmware'][True])} AI moves; "
+          f"pre-positioning takes {statistics.mean(park_times):.2f} s of the human's time on average")
+
+
+if __name__ == "__main__":
+    main()
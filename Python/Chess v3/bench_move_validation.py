@@ -0,0 +1,99 @@
+"""Benchmark MOVE_CONFIRM -> MOVE_OK validation latency: Stockfish spawn per check vs in-process.
+
+Usage: python bench_move_validation.py [--stockfish PATH] [--positions N]
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+import chess
+import chess.engine
+
+from engine_pool import EnginePool, validate_move
+
+DEFAULT_STOCKFISH_PATH = "stockfish/stockfish-windows-x86-64-avx2.exe"
+
+
+# Build (fen, move) pairs from random games so both legal and illegal checks are covered
+def sample_confirms(count, seed=0):
+    rng = random.Random(seed)
+    samples = []
+    board = chess.Board()
+
+    while len(samples) < count:
+        legal_moves = list(board.legal_moves)
+        if not legal_moves or board.ply() > 80:
+            board.reset()
+            continue
+
+        move = rng.choice(legal_moves)
+        if rng.random() < 0.2:  # Sprinkle in some illegal confirms
+            move = chess.Move(rng.choice(chess.SQUARES), rng.choice(chess.SQUARES))
+        samples.append((board.fen(), move.uci()))
+        board.push(rng.choice(legal_moves))
+
+    return samples
+
+
+# Old path: spawn Stockfish for every validation (what validate_move_with_stockfish used to do)
+def validate_with_spawn(stockfish_path, fen, move_uci):
+    with chess.engine.SimpleEngine.popen_uci(stockfish_path):
+        board = chess.Board(fen)
+        return move_uci in [m.uci() for m in board.legal_moves]
+
+
+def time_calls(fn, samples):
+    latencies = []
+    for fen, move_uci in samples:
+        start = time.perf_counter()
+        fn(fen, move_uci)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<28} n={len(latencies):<5} mean={statistics.mean(latencies):9.3f} ms  "
+          f"p50={statistics.median(latencies):9.3f} ms  p99={p99:9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stockfish", default=DEFAULT_STOCKFISH_PATH)
+    parser.add_argument("--positions", type=int, default=200)
+    parser.add_argument("--spawn-positions", type=int, default=10,
+                        help="samples for the (slow) spawn-per-check baseline")
+    args = parser.parse_args()
+
+    samples = sample_confirms(args.positions)
+
+    report("in-process (after)", time_calls(validate_move, samples))
+
+    if not os.path.exists(args.stockfish):
+        print(f"⚠ Stockfish not found at {args.stockfish}, skipping engine baselines.")
+        return
+
+    spawn_samples = samples[:args.spawn_positions]
+    report("spawn per check (before)",
+           time_calls(lambda fen, move: validate_with_spawn(args.stockfish, fen, move), spawn_samples))
+
+    # Warm pool: callers that still want Stockfish to look at the move borrow a running engine
+    pool = EnginePool(args.stockfish, size=1)
+    try:
+        def validate_with_pool(fen, move_uci):
+            if not validate_move(fen, move_uci):
+                return False
+            with pool.acquire() as engine:
+                engine.analyse(chess.Board(fen), chess.engine.Limit(depth=1),
+                               root_moves=[chess.Move.from_uci(move_uci)])
+            return True
+        report("warm pool + depth-1 search", time_calls(validate_with_pool, samples))
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
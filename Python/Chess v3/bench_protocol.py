@@ -0,0 +1,198 @@
+"""Framed serial protocol vs plain text lines: size, wire time and behaviour on a noisy link.
+
+Builds the message traffic of random games (the same messages the table exchanges, trolley
+plans included), then
+  - compares bytes on the wire per message kind and the resulting time at 9600 / 115200 baud,
+  - plays the traffic between Python and a stand-in Arduino over a pty with bit errors and
+    dropped writes injected, checking every message arrives exactly once and in order,
+  - plays it again restarting one side every few messages (a reset board, a restarted table),
+    checking the restarted side's first message isn't dropped as a repeat,
+  - estimates how many text-protocol messages the same noise would corrupt silently.
+No hardware needed:
+    python bench_protocol.py --games 5 --error-rates 0 0.001 0.005
+"""
+import argparse
+import random
+import statistics
+import time
+from collections import defaultdict
+
+import chess
+import serial
+
+from motion_planner import MotionPlanner, encode_plan
+from protocol import FramedTransport, NoisyPty, PtyArduino, encode_message
+from strength import ai_root_moves
+
+BAUD_RATES = (9600, 115200)
+BITS_PER_BYTE = 10  # 8N1
+
+
+def game_traffic(rng, max_plies):
+    """(sender, text) pairs of one random game, in the order the table exchanges them."""
+    board = chess.Board()
+    planner = MotionPlanner()
+    traffic = [("arduino", "START"), ("python", "START_OK"), ("arduino", "EASY")]
+    while not board.is_game_over() and board.ply() < max_plies:
+        if rng.random() < 0.1:  # A misplaced piece: the game answers with the nearest legal moves
+            moves = rng.sample(list(board.legal_moves), min(3, board.legal_moves.count()))
+            kind = "MOVE_ERROR_CHECK" if board.is_check() else "MOVE_ERROR"
+            traffic += [("arduino", "MOVE_CONFIRM"), ("python", f"{kind}:{' '.join(m.uci() for m in moves)}")]
+        traffic += [("arduino", "MOVE_CONFIRM"), ("python", "MOVE_OK"), ("arduino", "ASK_HUMAN_STATUS")]
+        board.push(rng.choice(list(board.legal_moves)))
+        if board.is_game_over():
+            break
+        traffic.append(("python", "Human is CHECK" if board.is_check() else "GAME_CONTINUES"))
+
+        move = rng.choice(ai_root_moves(board))
+        flag = int(board.is_capture(move))
+        plan = encode_plan(planner.plan_move(board, move))
+        traffic += [("arduino", "ASK_AI_MOVE"), ("python", f"{move.uci()[:4]}:{flag}|{plan}")]
+        board.push(move)
+        traffic += [("arduino", "ASK_AI_STATUS"), ("python", "AI is CHECK" if board.is_check() else "GAME_CONTINUES")]
+        park = planner.plan_park(board)
+        if park:
+            traffic.append(("python", f"PARK:{encode_plan(park)}"))
+    traffic.append(("arduino", "END"))
+    return traffic
+
+
+def size_report(traffic):
+    by_kind = defaultdict(lambda: [0, 0, 0])  # kind -> [messages, text bytes, framed bytes]
+    for sender, text in traffic:
+        kind = text.split(":")[0] if not text[0].islower() else "AI move"
+        if kind == "AI move" or kind == "PARK":
+            kind += " + plan"
+        entry = by_kind[kind]
+        entry[0] += 1
+        entry[1] += len(text) + (2 if sender == "arduino" else 1)  # println ends with \r\n, Python with \n
+        entry[2] += 6 + len(encode_message(text)) + 6  # DATA frame + its ACK frame
+
+    print(f"{'message':<24}{'count':>7}{'text B':>9}{'framed B':>10}{'(incl. ack)':>12}")
+    totals = [0, 0, 0]
+    for kind, (count, text_bytes, framed_bytes) in sorted(by_kind.items(), key=lambda kv: -kv[1][1]):
+        print(f"{kind:<24}{count:>7}{text_bytes / count:>9.1f}{(framed_bytes / count) - 6:>10.1f}{framed_bytes / count:>12.1f}")
+        totals = [t + v for t, v in zip(totals, (count, text_bytes, framed_bytes))]
+    count, text_bytes, framed_bytes = totals
+    print(f"{'all':<24}{count:>7}{text_bytes / count:>9.1f}{(framed_bytes / count) - 6:>10.1f}{framed_bytes / count:>12.1f}")
+    for baud in BAUD_RATES:
+        per_byte_ms = BITS_PER_BYTE / baud * 1000
+        print(f"⏱ Wire time per message at {baud:>6} baud: text {text_bytes / count * per_byte_ms:.2f} ms, "
+              f"framed {(framed_bytes / count - 6) * per_byte_ms:.2f} ms (+ack {6 * per_byte_ms:.2f} ms)")
+
+
+def text_corruption(traffic, error_rate, rng):
+    """Share of text lines the same bit errors would alter without anyone noticing."""
+    link = NoisyPty(None, error_rate, rng=rng)
+    damaged = sum(link._damage(f"{text}\n".encode()) != f"{text}\n".encode() for _, text in traffic)
+    return damaged / len(traffic)
+
+
+def noisy_run(traffic, error_rate, drop_rate, seed, baud):
+    arduino = PtyArduino(error_rate, drop_rate, seed).start()
+    ser = serial.Serial(arduino.port, baud, timeout=0.1)
+    python = FramedTransport(ser).start()
+    sides = {"python": python, "arduino": arduino}
+
+    received, latencies, lost = [], [], 0
+    for sender, text in traffic:
+        receiver = arduino if sender == "python" else python
+        start = time.perf_counter()
+        if not sides[sender].send(text):
+            lost += 1
+            continue
+        message = receiver.get(timeout=2)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if message is None:
+            lost += 1
+        else:
+            received.append(message.raw)
+    time.sleep(0.3)  # Late retransmissions would show up as duplicates now
+    for side in (python, arduino):
+        while side.get() is not None:
+            received.append(None)
+
+    expected = [text for _, text in traffic]
+    python.stop()
+    arduino.stop()
+    ser.close()
+    ordered = sorted(latencies)
+    return {
+        "exact": received == expected,
+        "lost": lost,
+        "extra": max(0, len(received) - len(expected)),
+        "retransmits": python.retransmits + arduino.transport.retransmits,
+        "crc_errors": python.decoder.crc_errors + arduino.transport.decoder.crc_errors,
+        "damaged_bytes": arduino.link.damaged_bytes,
+        "dropped_writes": arduino.link.dropped_writes,
+        "p50_ms": statistics.median(ordered),
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+    }
+
+
+def restart_run(traffic, restart_every, seed, baud):
+    """Clean link; every restart_every messages the next sender restarts, sends one message and
+    restarts again: its seqs then start over at the very seq the other side saw last."""
+    arduino = PtyArduino(seed=seed).start()
+    ser = serial.Serial(arduino.port, baud, timeout=0.1)
+    python = FramedTransport(ser).start()
+
+    received, restarts, again = [], 0, None
+    for i, (sender, text) in enumerate(traffic):
+        if sender == again or (i and i % restart_every == 0 and again is None):
+            if sender == "arduino":
+                arduino.restart()
+            else:
+                python.stop()
+                python = FramedTransport(ser).start()
+            again = None if sender == again else sender
+            restarts += 1
+        sides = {"python": python, "arduino": arduino}
+        receiver = arduino if sender == "python" else python
+        sides[sender].send(text)
+        message = receiver.get(timeout=0.5)
+        received.append(message.raw if message else None)
+
+    python.stop()
+    arduino.stop()
+    ser.close()
+    return {
+        "exact": received == [text for _, text in traffic],
+        "restarts": restarts,
+        "lost": received.count(None),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Framed vs text serial protocol: bytes, wire time, noise.")
+    parser.add_argument("--games", type=int, default=3)
+    parser.add_argument("--max-plies", type=int, default=80)
+    parser.add_argument("--error-rates", type=float, nargs="+", default=[0.0, 0.001, 0.005],
+                        help="chance of a bit error per byte")
+    parser.add_argument("--drop-rate", type=float, default=0.01, help="chance of a whole write being lost")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--restart-every", type=int, default=7, help="messages between restarts")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    traffic = [item for _ in range(args.games) for item in game_traffic(rng, args.max_plies)]
+    print(f"📨 {len(traffic)} messages from {args.games} random games\n")
+    size_report(traffic)
+
+    print(f"\n{'bit errors/B':<14}{'drops':>7}{'exactly once':>14}{'lost':>6}{'retx':>6}{'CRC err':>9}"
+          f"{'p50 ms':>8}{'p99 ms':>8}{'text corrupt':>14}")
+    for error_rate in args.error_rates:
+        drop_rate = args.drop_rate if error_rate else 0.0
+        r = noisy_run(traffic, error_rate, drop_rate, args.seed, args.baud)
+        print(f"{error_rate:<14g}{r['dropped_writes']:>7}{'yes' if r['exact'] else 'NO':>14}{r['lost']:>6}"
+              f"{r['retransmits']:>6}{r['crc_errors']:>9}{r['p50_ms']:>8.2f}{r['p99_ms']:>8.2f}"
+              f"{text_corruption(traffic, error_rate, rng):>14.1%}")
+
+    r = restart_run(traffic, args.restart_every, args.seed, args.baud)
+    print(f"\n🔁 {r['restarts']} restarts (every {args.restart_every} messages): "
+          f"exactly once {'yes' if r['exact'] else 'NO'}, lost {r['lost']}")
+
+
+if __name__ == "__main__":
+    main()
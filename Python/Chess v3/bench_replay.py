@@ -0,0 +1,88 @@
+"""Latency regression benchmark: replays a recorded session through chess_test.py.
+
+Record a session on the real table first, then replay it on any Linux box:
+    python chess_test.py --record sessions/opening
+    python bench_replay.py sessions/opening --runs 3 --save-baseline baseline.json
+    python bench_replay.py sessions/opening --runs 3 --baseline baseline.json
+
+Each run feeds the recorded frames, Arduino lines and engine results through the real
+frame -> FEN -> validated move -> AI move -> serial path and times every reply to the
+stand-in Arduino. With a baseline, exits non-zero when a p50 got slower than the tolerance.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+def run_once(session, engine_time):
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "report.json")
+        subprocess.run([sys.executable, "chess_test.py", "--replay", session, "--no-window",
+                        "--engine-time", engine_time, "--bench-out", out],
+                       check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        with open(out, encoding="utf-8") as f:
+            return json.load(f)
+
+
+# Median over runs of each message kind's p50/p95 reply latency
+def combine(reports):
+    kinds = sorted({kind for r in reports for kind in r["latency"]})
+    latency = {}
+    for kind in kinds:
+        runs = [r["latency"][kind] for r in reports if kind in r["latency"]]
+        latency[kind] = {key: round(statistics.median(run[key] for run in runs), 1) for key in ("p50_ms", "p95_ms")}
+    return {
+        "latency": latency,
+        "tx_mismatches": max(r["tx_mismatches"] for r in reports),
+        "stalls": max(r["stalls"] for r in reports),
+        "engine_misses": max(r["engine_misses"] for r in reports),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session and check reply latencies.")
+    parser.add_argument("session")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--engine-time", choices=["recorded", "zero"], default="zero",
+                        help="zero isolates our own code from Stockfish search time")
+    parser.add_argument("--baseline", help="JSON from --save-baseline to compare against")
+    parser.add_argument("--save-baseline", metavar="FILE")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p50 slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    result = combine([run_once(args.session, args.engine_time) for _ in range(args.runs)])
+
+    print(f"{'message':<18}{'p50 ms':>10}{'p95 ms':>10}")
+    for kind, stats in result["latency"].items():
+        print(f"{kind:<18}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}")
+    print(f"Replies differing from the recording: {result['tx_mismatches']}, stalls: {result['stalls']}, "
+          f"unrecorded engine positions: {result['engine_misses']}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = []
+        for kind, stats in baseline["latency"].items():
+            current = result["latency"].get(kind)
+            if current and current["p50_ms"] > stats["p50_ms"] * (1 + args.tolerance):
+                regressions.append(f"{kind}: p50 {stats['p50_ms']:.1f} -> {current['p50_ms']:.1f} ms")
+        if result["tx_mismatches"] > baseline["tx_mismatches"]:
+            regressions.append(f"replies differing from the recording: "
+                               f"{baseline['tx_mismatches']} -> {result['tx_mismatches']}")
+        for line in regressions:
+            print(f"❌ Regression: {line}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
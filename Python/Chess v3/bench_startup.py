@@ -0,0 +1,73 @@
+"""Startup-time benchmark: how long a freshly started chess_test.py takes to become playable.
+
+Each run starts a new process (as after a power cycle, so imports and file caches count too),
+brings the table up and exits as soon as READY would go to the Arduino:
+    python bench_startup.py --runs 3
+    python bench_startup.py --runs 3 --replay sessions/opening   (no camera, Arduino or Stockfish)
+
+Compares parallel startup with the same tasks run one after another and prints, per task,
+the median seconds it took.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def run_once(sequential, replay=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "startup.json")
+        command = [sys.executable, "chess_test.py", "--startup-only", "--no-window", "--startup-out", out]
+        if sequential:
+            command.append("--sequential-startup")
+        if replay:
+            command += ["--replay", replay]
+        started = time.perf_counter()
+        subprocess.run(command, check=True, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        process_s = time.perf_counter() - started
+        with open(out, encoding="utf-8") as f:
+            report = json.load(f)
+        report["process_s"] = round(process_s, 3)  # Interpreter, imports, startup and shutdown
+        return report
+
+
+def summarize(reports):
+    tasks = reports[0]["tasks_s"]
+    return {
+        "ready_s": round(statistics.median(r["wall_s"] for r in reports), 2),
+        "process_s": round(statistics.median(r["process_s"] for r in reports), 2),
+        "tasks_s": {name: round(statistics.median(r["tasks_s"][name] for r in reports), 2) for name in tasks},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time chess_test.py from launch to ready.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--replay", metavar="DIR", help="start against a recorded session instead of the hardware")
+    parser.add_argument("--out", metavar="FILE", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    for mode, sequential in (("sequential", True), ("parallel", False)):
+        results[mode] = summarize([run_once(sequential, args.replay) for _ in range(args.runs)])
+
+    names = list(results["parallel"]["tasks_s"])
+    print(f"{'':<12}{'ready s':>10}{'process s':>11}" + "".join(f"{name + ' s':>11}" for name in names))
+    for mode, result in results.items():
+        print(f"{mode:<12}{result['ready_s']:>10.2f}{result['process_s']:>11.2f}"
+              + "".join(f"{result['tasks_s'][name]:>11.2f}" for name in names))
+    speedup = results["sequential"]["ready_s"] / max(results["parallel"]["ready_s"], 1e-6)
+    print(f"Parallel startup is ready {speedup:.1f}x sooner.")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Board calibration: camera pixels -> chess squares through a perspective homography.
+
+Run directly to calibrate and save board_calibration.json:
+    python board_calibration.py [--camera 1] [--click]
+"""
+import argparse
+import json
+import os
+
+import cv2
+import numpy as np
+
+CALIBRATION_FILE = "board_calibration.json"
+
+# Outer board corners in board-plane units (files a..h -> 0..8, ranks 1..8 -> 0..8),
+# listed in the order corners are stored and clicked: a1, h1, h8, a8
+BOARD_PLANE_CORNERS = np.float32([[0, 0], [8, 0], [8, 8], [0, 8]])
+CORNER_NAMES = ["a1", "h1", "h8", "a8"]
+
+
+# Corners matching the old axis-aligned BOARD_X/Y grid (a-file on the right, rank 1 at the top)
+def default_corners(x_min, x_max, y_min, y_max):
+    return [(x_max, y_min), (x_min, y_min), (x_min, y_max), (x_max, y_max)]
+
+
+# Homography from image pixels to board-plane coordinates
+def compute_homography(corners):
+    return cv2.getPerspectiveTransform(np.float32(corners), BOARD_PLANE_CORNERS)
+
+
+# Apply a homography to an (N, 2) array of points
+def transform_points(H, points):
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    homogeneous = np.hstack([points, np.ones((len(points), 1))]) @ H.T
+    return homogeneous[:, :2] / homogeneous[:, 2:3]
+
+
+########################################################################################
+
+
+# Precompute a pixel -> square index table (-1 = outside the board) for the whole frame
+def build_square_lut(H, width, height):
+    lut = np.full((height, width), -1, dtype=np.int8)
+
+    # Only pixels inside the board's bounding box can map to a square
+    outline = transform_points(np.linalg.inv(H), BOARD_PLANE_CORNERS)
+    x1, y1 = np.clip(np.floor(outline.min(axis=0)).astype(int), 0, [width, height])
+    x2, y2 = np.clip(np.ceil(outline.max(axis=0)).astype(int) + 1, 0, [width, height])
+    if x1 >= x2 or y1 >= y2:
+        return lut
+
+    # Sample at pixel centers so grid lines split the same way the old int() mapping did
+    xs, ys = np.meshgrid(np.arange(x1, x2) + 0.5, np.arange(y1, y2) + 0.5)
+    plane = transform_points(H, np.stack([xs.ravel(), ys.ravel()], axis=1))
+
+    files = np.floor(plane[:, 0])
+    ranks = np.floor(plane[:, 1])
+    inside = (files >= 0) & (files < 8) & (ranks >= 0) & (ranks < 8)
+
+    squares = np.full(len(plane), -1, dtype=np.int8)
+    squares[inside] = (ranks[inside] * 8 + files[inside]).astype(np.int8)
+    lut[y1:y2, x1:x2] = squares.reshape(y2 - y1, x2 - x1)
+    return lut
+
+
+# Map every box of a frame to its square in one vectorized lookup on the box centers
+def squares_for_boxes(xyxy, lut):
+    xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+    height, width = lut.shape
+    centers_x = ((xyxy[:, 0] + xyxy[:, 2]) / 2).astype(np.int32)
+    centers_y = ((xyxy[:, 1] + xyxy[:, 3]) / 2).astype(np.int32)
+
+    inside = (centers_x >= 0) & (centers_x < width) & (centers_y >= 0) & (centers_y < height)
+    squares = np.full(len(xyxy), -1, dtype=np.int8)
+    squares[inside] = lut[centers_y[inside], centers_x[inside]]
+    return squares
+
+
+# Pixel segments for the 9 + 9 grid lines, computed once and reused for every frame
+def grid_lines(corners):
+    H_inv = np.linalg.inv(compute_homography(corners))
+    lines = []
+    for i in range(9):
+        ends = [tuple(int(v) for v in p) for p in transform_points(H_inv, [(i, 0), (i, 8), (0, i), (8, i)]).round()]
+        lines.append((ends[0], ends[1]))  # File line
+        lines.append((ends[2], ends[3]))  # Rank line
+    return lines
+
+
+# Bounding rectangle (x1, y1, x2, y2) of the board in the image, with an optional margin
+def board_roi(corners, margin=0, frame_shape=None):
+    points = np.asarray(corners)
+    x1, y1 = points.min(axis=0) - margin
+    x2, y2 = points.max(axis=0) + margin
+    if frame_shape is not None:
+        height, width = frame_shape[:2]
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(width, x2), min(height, y2)
+    return int(x1), int(y1), int(x2), int(y2)
+
+
+########################################################################################
+
+
+# Automatic calibration from the 7x7 inner corners of the (empty or sparse) board
+def find_board_corners(frame, reference_corners):
+    """Return a1, h1, h8, a8 outer corners, or None if the board pattern isn't found.
+
+    The inner-corner grid has no notion of which side is a1, so the orientation closest to
+    reference_corners (e.g. the previous calibration) is kept."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    found, inner = cv2.findChessboardCorners(gray, (7, 7))
+    if not found:
+        return None
+
+    inner = cv2.cornerSubPix(gray, inner, (5, 5), (-1, -1),
+                             (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01))
+    plane = np.float32([(i, j) for j in range(1, 8) for i in range(1, 8)])
+    H_plane_to_image, _ = cv2.findHomography(plane, inner.reshape(-1, 2))
+    outer = transform_points(H_plane_to_image, BOARD_PLANE_CORNERS)
+
+    # Try the 4 rotations and their mirror images against the reference orientation
+    reference = np.asarray(reference_corners, dtype=np.float64)
+    candidates = []
+    for order in (outer, outer[::-1]):
+        for shift in range(4):
+            candidates.append(np.roll(order, shift, axis=0))
+    best = min(candidates, key=lambda c: np.linalg.norm(c - reference, axis=1).sum())
+    return [tuple(map(float, p)) for p in best]
+
+
+# Manual calibration: click the outer a1, h1, h8, a8 corners in that order
+def click_board_corners(frame):
+    clicked = []
+    window = "Click board corners: " + ", ".join(CORNER_NAMES)
+
+    def on_mouse(event, x, y, flags, param):
+        if event == cv2.EVENT_LBUTTONDOWN and len(clicked) < 4:
+            clicked.append((float(x), float(y)))
+            print(f"📍 {CORNER_NAMES[len(clicked) - 1]} corner: ({x}, {y})")
+
+    cv2.namedWindow(window)
+    cv2.setMouseCallback(window, on_mouse)
+    while len(clicked) < 4:
+        preview = frame.copy()
+        for name, point in zip(CORNER_NAMES, clicked):
+            cv2.circle(preview, (int(point[0]), int(point[1])), 5, (0, 0, 255), -1)
+            cv2.putText(preview, name, (int(point[0]) + 6, int(point[1]) - 6),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+        cv2.imshow(window, preview)
+        if cv2.waitKey(20) & 0xFF == ord('q'):
+            break
+    cv2.destroyWindow(window)
+    return clicked if len(clicked) == 4 else None
+
+
+def save_calibration(corners, path=CALIBRATION_FILE):
+    with open(path, "w") as f:
+        json.dump({"corners": [list(p) for p in corners], "order": CORNER_NAMES}, f, indent=2)
+
+
+def load_calibration(path=CALIBRATION_FILE):
+    """Saved corners, or None if the board was never calibrated."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return [tuple(p) for p in json.load(f)["corners"]]
+
+
+########################################################################################
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the board corners for square mapping.")
+    parser.add_argument("--camera", type=int, default=1)
+    parser.add_argument("--click", action="store_true", help="click the corners instead of auto-detecting")
+    parser.add_argument("--output", default=CALIBRATION_FILE)
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.camera)
+    cap.set(3, 1280)
+    cap.set(4, 720)
+    ret, frame = cap.read()
+    cap.release()
+    if not ret:
+        print("❌ ERROR: Could not grab a frame from the camera.")
+        return
+
+    reference = load_calibration(args.output) or default_corners(340, 940, 60, 660)
+    corners = None if args.click else find_board_corners(frame, reference)
+    if corners is None:
+        if not args.click:
+            print("⚠ Board pattern not found, falling back to clicking the corners.")
+        corners = click_board_corners(frame)
+    if corners is None:
+        print("❌ Calibration cancelled.")
+        return
+
+    save_calibration(corners, args.output)
+    print(f"✅ Calibration saved to {args.output}: {corners}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+from collections import defaultdict, deque
+
+
+class BoardStateTracker:
+    """Consensus board state over the last N frames of detections.
+
+    Each frame votes for every square: a detected piece votes with its confidence, a square
+    with no detection votes "empty" with empty_weight. The heaviest vote wins the square and
+    certainty is the winner's share of the total vote."""
+
+    def __init__(self, history=5, empty_weight=0.5):
+        self.frames = deque(maxlen=history)  # Ring buffer of {square: (piece, conf)}
+        self.empty_weight = empty_weight
+
+    def clear(self):
+        self.frames.clear()
+
+    # Add one frame of (square, piece, conf) detections
+    def add_frame(self, detections):
+        frame = {}
+        for square, piece, conf in detections:
+            if square is None:
+                continue
+            # Two boxes on one square: keep the more confident one
+            if square not in frame or conf > frame[square][1]:
+                frame[square] = (piece, conf)
+        self.frames.append(frame)
+
+    def consensus(self):
+        """Return (board_state, certainty): {square: piece} and {square: 0..1} for seen squares."""
+        squares = set()
+        for frame in self.frames:
+            squares.update(frame)
+
+        board_state = {}
+        certainty = {}
+        for square in squares:
+            votes = defaultdict(float)
+            for frame in self.frames:
+                if square in frame:
+                    piece, conf = frame[square]
+                    votes[piece] += conf
+                else:
+                    votes[None] += self.empty_weight
+
+            winner = max(votes, key=votes.get)
+            certainty[square] = votes[winner] / sum(votes.values())
+            if winner is not None:
+                board_state[square] = winner
+
+        return board_state, certainty
+
+    def board_state(self):
+        return self.consensus()[0]
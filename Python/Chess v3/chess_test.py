@@ -1,551 +1,421 @@
+import argparse
+import json
+import socket
 import cv2
 import chess
-import chess.engine
-import torch
-import random
 import serial
 import time
-from ultralytics import YOLO
-
-# Connect to Arduino Mega (Update COM port for Windows)
-try:
-    ser = serial.Serial('COM5', 9600, timeout=1)
-    time.sleep(2)
-    if ser.is_open:
-        print("✅ Serial connection established.")
-except serial.SerialException:
-    print("❌ ERROR: Unable to connect to Arduino. Check COM port.")
-    ser = None
-
-# Load YOLO Model
-model = YOLO("best.pt")  # Ensure best.pt is in the same directory
-
-# Initialize Stockfish Engine
-STOCKFISH_PATH = "stockfish/stockfish-windows-x86-64-avx2.exe"
-
-# Open webcam
-cap = cv2.VideoCapture(1)  # Change index if using external camera
-cap.set(3, 1280)  # Set width
-cap.set(4, 720)   # Set height
-
-# Define chessboard grid (Adjust based on camera calibration)
-BOARD_X_MIN, BOARD_X_MAX = 340, 940
-BOARD_Y_MIN, BOARD_Y_MAX = 60, 660
-SQUARE_SIZE_X = (BOARD_X_MAX - BOARD_X_MIN) / 8
-SQUARE_SIZE_Y = (BOARD_Y_MAX - BOARD_Y_MIN) / 8
-
-
-# Piece notation mappings
-piece_short_names = {
-    "black-pawn": "p", "black-knight": "n", "black-bishop": "b", "black-rook": "r",
-    "black-queen": "q", "black-king": "k",
-    "white-pawn": "P", "white-knight": "N", "white-bishop": "B", "white-rook": "R",
-    "white-queen": "Q", "white-king": "K"
-}
-
-
-# Read data from Arduino and return it as a string
-def read_arduino():
-    if ser and ser.is_open:  # Check if Serial connection exists
-        if ser.in_waiting > 0:
-            return ser.readline().decode().strip()
-    time.sleep(0.01)
-    return None
-
-
-# Send AI move to Arduino
-def send_ai_move(move):
-    if ser and ser.is_open:
-        print(f"📡 Sending AI Move: {move}")
-        ser.write(f"{move}\n".encode())
-    else:
-        print("❌ ERROR: Serial connection is closed. Cannot send AI move.")
-
-
-# Convert bounding box center to chess notation
-def get_chess_square(x, y):
-    if x < BOARD_X_MIN or x > BOARD_X_MAX or y < BOARD_Y_MIN or y > BOARD_Y_MAX:
-        return None  # Outside board
-
-    # Flip column (X-axis)
-    col = 7 - int((x - BOARD_X_MIN) / SQUARE_SIZE_X)
-    # Flip row (Y-axis)
-    row = int((y - BOARD_Y_MIN) / SQUARE_SIZE_Y) + 1
-
-    if 0 <= col < 8 and 1 <= row <= 8:
-        return f"{chr(97 + col)}{row}"  # 'a1' to 'h8'
-    return None
-
-
-# Draw chessboard grid
-def draw_chess_grid(frame):
-    for i in range(9):  # 8 squares + 1 for edges
-        x = int(BOARD_X_MIN + i * SQUARE_SIZE_X)
-        y = int(BOARD_Y_MIN + i * SQUARE_SIZE_Y)
-        
-        # Draw vertical lines (columns)
-        cv2.line(frame, (x, BOARD_Y_MIN), (x, BOARD_Y_MAX), (0, 255, 255), 1)
-        
-        # Draw horizontal lines (rows)
-        cv2.line(frame, (BOARD_X_MIN, y), (BOARD_X_MAX, y), (0, 255, 255), 1)
-
-    return frame
-
-
-########################################################################################    
-
-
-# Game Status (Check, Checkmate, Stalemate, Draw Conditions)
-def process_game_status(board, player1, player2):
-    global game_started, previous_fen
-    game_over = False
-    message = ""
-
-    # Checkmate
-    if board.is_checkmate():
-        message = f"CHECKMATE: {player1} Wins"
-        print(f" 🎉 Game Status: Checkmate")
-        print(f" 🏆 {player1} Wins by Checkmate!")
-        game_over = True
-
-    # Stalemate
-    elif board.is_stalemate():
-        message = "STALEMATE"
-        print(f" 🤝 Game Status: Stalemate")
-        print(f" 😐 The game is drawn due to Stalemate.")
-        game_over = True
-
-    # Draw by Insufficient Material
-    elif board.is_insufficient_material():
-        message = "DRAW INSUFFICIENT MATERIAL"
-        print(f" 🤝 Game Status: Draw by Insufficient Material")
-        print(f" 😐 Neither player has enough material to checkmate.")
-        game_over = True
-
-    # Draw by Threefold Repetition
-    elif board.is_repetition(3):
-        message = "DRAW REPETITION"
-        print(f" 🤝 Game Status: Draw by Threefold Repetition")
-        print(f" 🔄 The same position has repeated three times.")
-        game_over = True
-
-    # Draw by 50-Move Rule
-    elif board.halfmove_clock >= 100:  # 50-move rule (100 half-moves = 50 full moves)
-        message = "DRAW 50 MOVE RULE"
-        print(f" 🤝 Game Status: Draw by 50-Move Rule")
-        print(f" ⏳ No captures or pawn moves in 50 moves.")
-        game_over = True
-
-    # Check (Not a game-ending event)
-    elif board.is_check():
-        message = f"{player2} is CHECK"
-        print(f" ⚠️ {player2} is in Check!")
-
-    # If No Special Status, Send a Default Message
-    if not message:
-        message = "GAME_CONTINUES"
-
-    # Send status to Arduino
-    if ser and ser.is_open:
-        ser.write(f"{message}\n".encode())
-        print(f"📡 Sent to Arduino: {message}")
-    else:
-        print("❌ ERROR: Serial connection is closed. Cannot send status.")
-
-    # Reset game if it's over but keep detection running
-    if game_over:
-        game_started = False  # Allow restarting
-        previous_fen = initial_fen  # Reset position
-        board.reset()  # Reset board
-        print("🔄 Game over. Press Start Button for a new game.")
-        return False  # Game ended
-
-    return True  # Game continues
-
-
-########################################################################################    
-
-
-# Convert detected board state to FEN notation
-def board_state_to_fen(board_state, board):
-    """Update the board's FEN while preserving game state."""
-    
-    new_board = board.copy()  # Keep castling, en passant, turn tracking
-    new_board.clear_board()  # Remove all pieces first
-
-    for square, piece in board_state.items():
-        rank = int(square[1]) - 1
-        file = ord(square[0]) - ord('a')
-        new_board.set_piece_at(rank * 8 + file, chess.Piece.from_symbol(piece))
-
-    return new_board.fen()  # Stockfish handles castling & en passant correctly
-
-
-########################################################################################    
-
-
-def validate_move_with_stockfish(fen, move_uci):
-    """Send FEN and move to Stockfish to check legality."""
-    with chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH) as engine:
-        board = chess.Board(fen)  # Load board state
-        legal_moves = [m.uci() for m in board.legal_moves]  # Get legal moves
-        
-        print(f"🧾 Stockfish Legal Moves: {legal_moves}")  # Debug all legal moves
-
-        return move_uci in legal_moves  # Return True if move is legal
-
-
-########################################################################################    
-
-
-def detect_human_move(old_board, new_board):
-    """Detects the human move by finding one White piece that moved and optionally one Black piece that was removed."""
-
-    moved_from, moved_to = None, None
-    moved_from_2, moved_to_2 = None, None # for castling validation
-    removed_black = None  # Track removed Black piece
-    white_moved_count = 0  # Count moved White pieces
-    black_removed_count = 0  # Count removed Black pieces
-    black_moved_count = 0  # Count Black pieces that changed squares
-
-    for square in chess.SQUARES:
-        old_piece = old_board.piece_at(square)
-        new_piece = new_board.piece_at(square)
-
-        # ✅ Find White piece that moved (previously here but now gone)
-        if old_piece and old_piece.color == chess.WHITE and not new_piece:
-            white_moved_count += 1
-            if moved_from is None:
-                moved_from = square
-            elif moved_from_2 is None:
-               moved_from_2 = square
-            else:
-                print("❌ Multiple White pieces moved! Invalid turn.")
-                return None
-
-        # ✅ Detect where a White piece moved to (Capture Move)
-        if new_piece and new_piece.color == chess.WHITE and old_piece and old_piece.color == chess.BLACK:
-            if moved_to is None:
-                moved_to = square  # ✅ Assign move destination (Capture Move)
-                removed_black = square  # ✅ Also assign removed Black piece
-                black_removed_count += 1
-            else:
-                print("❌ Multiple White pieces detected in new locations! Invalid turn.")
-                return None
-
-        # ✅ Detect where a White piece moved to (Normal Move)
-        if new_piece and new_piece.color == chess.WHITE and not old_piece:
-            if moved_to is None:
-                moved_to = square  # ✅ Assign move destination (Normal Move)
-            elif moved_to_2 is None:
-                moved_to_2 = square  
-            else:
-                print("❌ Multiple White pieces detected in new locations! Invalid turn.")
-                return None
-
-        # ❌ If a Black piece moved (not just removed), it's invalid
-        if new_piece and new_piece.color == chess.BLACK and not old_piece:
-            black_moved_count += 1
-            print("❌ A Black piece appeared in a new square! Invalid turn.")
-            return None
-
-    print(f"🔹 Move From: {chess.square_name(moved_from) if moved_from else 'None'}")
-    print(f"🔹 Move To: {chess.square_name(moved_to) if moved_to else 'None'}")
-    print(f"🔹 Removed Black Piece: {chess.square_name(removed_black) if removed_black else 'None'}")
-
-    # ✅ Separate Castling Check (Runs after normal move validation)
-    if white_moved_count == 2 and black_removed_count == 0:
-        # ✅ Check if this is a castling move (White's king & rook moved correctly)
-        castling_moves = {
-            "O-O": (chess.E1, chess.G1, chess.H1, chess.F1),  # Kingside castling
-            "O-O-O": (chess.E1, chess.C1, chess.A1, chess.D1)  # Queenside castling
-        }
-
-        for castling_type, (king_from, king_to, rook_from, rook_to) in castling_moves.items():
-            if {moved_from, moved_from_2} == {king_from, rook_from} and {moved_to, moved_to_2} == {king_to, rook_to}:
-                castling_move = chess.Move(king_from, king_to)
-                print(f"✅ Castling Move Detected: {castling_type}")
-
-                # ✅ Validate move with Stockfish
-                if validate_move_with_stockfish(old_board.fen(), castling_move.uci()):
-                    return castling_move
-                else:
-                    print(f"❌ Castling Move {castling_move.uci()} is not legal!")
-                    return None
-
-    # ❌ If more than one White piece moved or any Black piece moved
-    if white_moved_count > 1 or black_moved_count > 0:
-        print("❌ Invalid move: Multiple White pieces moved or Black moved.")
-        return None
-
-    # ❌ Handle edge case where moved_from exists but moved_to is still None
-    if moved_from and not moved_to:
-        print("❌ Move destination not detected! Invalid move.")
-        return None
-
-    # ❌ Invalid Case: No White moved, but a Black piece was removed
-    if white_moved_count == 0 and black_removed_count == 1:
-        print("❌ A Black piece was removed but no White piece moved! Invalid turn.")
-        return None  
-
-    # ✅ Normal Move: If one White piece moved and no Black piece was removed
-    if white_moved_count == 1 and black_removed_count == 0:
-        # ✅ Check if this is a Pawn Promotion move
-        if old_board.piece_at(moved_from) and old_board.piece_at(moved_from).piece_type == chess.PAWN:
-            if chess.square_rank(moved_to) == 7:  # White Pawn reaching 8th rank
-                print("♛ Pawn Promotion Detected! Promoting to Queen.")
-                move = chess.Move(moved_from, moved_to, promotion=chess.QUEEN)  # Auto-promote to Queen
-            else:
-                move = chess.Move(moved_from, moved_to)  # Regular pawn move
-        else:
-            move = chess.Move(moved_from, moved_to)  # Non-pawn moves
 
-        move_uci = move.uci()
-        print(f"✅ Normal Move Detected: {move_uci}")
-
-        # ✅ Validate move with Stockfish
-        if validate_move_with_stockfish(old_board.fen(), move_uci):
-            return move
-        else:
-            print(f"❌ Move {move_uci} is not legal according to Stockfish!")
-            return None
-
-
-    # ✅ Capture Move: If one White piece moved and exactly one Black piece was removed
-    if white_moved_count == 1 and black_removed_count == 1:
-        # ✅ Check if this is a Pawn Promotion move
-        if old_board.piece_at(moved_from) and old_board.piece_at(moved_from).piece_type == chess.PAWN:
-            if chess.square_rank(moved_to) == 7:  # White Pawn reaching 8th rank
-                print("♛ Pawn Promotion Detected! Promoting to Queen.")
-                move = chess.Move(moved_from, moved_to, promotion=chess.QUEEN)  # Auto-promote to Queen
+from board_calibration import (board_roi, build_square_lut, compute_homography, default_corners, grid_lines,
+                               load_calibration, squares_for_boxes)
+from board_tracker import BoardStateTracker
+from control import ControlQueue, ControlServer, read_console
+from detector_backends import YoloDetector
+from engine_config import SearchLimits, calibrate, engine_options
+from engine_pool import EnginePool
+from game_session import GameSession, map_detections, map_squares
+from journal import GameJournal
+from metrics import JsonlExporter, MetricsServer, metrics
+from motion_gate import MotionGate
+from move_cache import MoveCache, OpeningBook
+from motion_planner import MotionPlanner
+from ponder import Ponderer
+from pipeline import CaptureStage, FpsCounter, InferenceStage, LatestQueue, ResultQueue, format_stage_stats
+from preview import Preview
+from protocol import FramedTransport
+from serial_transport import SerialTransport, log_debug_to_file, wait_for_boot
+from session import (RecordingCapture, RecordingEnginePool, ReplayArduino, ReplayCapture, ReplayClock,
+                     ReplayEnginePool, SessionRecorder, load_session)
+from square_classifier import BoardWarper, SquareClassifier
+from startup import Startup
+from strength import DIFFICULTY_PROFILES
+from table_config import (ARDUINO_BOOT_TIMEOUT, BOARD_X_MAX, BOARD_X_MIN, BOARD_Y_MAX, BOARD_Y_MIN, CLASSIFIER_WEIGHTS,
+                          CONTROL_PORT, DETECTOR_BACKEND, DETECTOR_CROP_MARGIN, DETECTOR_IMGSZ, DETECTOR_INT8,
+                          DETECTOR_WEIGHTS, FRAME_HEIGHT, FRAME_WIDTH, METRICS_FILE, METRICS_INTERVAL, METRICS_PORT,
+                          MIN_SQUARE_CERTAINTY, MOTION_ROI_MARGIN, MOVE_CACHE_FILE, MOVE_CACHE_SIZE,
+                          MOVE_MATCH_TOLERANCE, OPENING_BOOK, PONDER_CANDIDATES, PRE_POSITION_TROLLEY, RECOGNITION,
+                          SEARCH_LIMIT_KIND, SERIAL_BAUD, SERIAL_PROTOCOL, STOCKFISH_PATH, TRACKER_HISTORY)
+
+# Settings shared with table_server.py (baud, metrics, Stockfish, detector, tracker, ...) are in table_config.py
+
+# Serial link
+SERIAL_PORT = 'COM5'  # Update for your machine
+
+# Startup: serial, YOLO (+ a warm-up inference), camera and Stockfish come up side by side (see startup.py)
+PARALLEL_STARTUP = True
+
+# Per-stage latency histograms and event counters (see metrics.py)
+TABLE_ID = socket.gethostname()  # Label that tells tables apart on a shared dashboard
+
+# Plan the trolley's path on the host and send it with the AI move (needs the matching Arduino firmware)
+MOTION_PLANNER = True
+
+# Stockfish Engine
+ENGINE_POOL_SIZE = 1  # Warm Stockfish processes shared by the AI and any other engine users
+PONDERING = True      # Search the AI's replies to likely human moves while the human thinks
+ENGINE_OPTIONS = None  # Threads/Hash for each engine; None sizes them to this host (see engine_config.py)
+
+# Game journal
+JOURNAL_FILE = "game_journal.log"  # Game in progress, resumed after a restart; None to disable
+GAMES_PGN = "games.pgn"            # Finished games are moved here
+
+# Webcam
+CAMERA_INDEX = 1  # Change index if using external camera
+
+# Preview window (not in headless mode): drawn in its own thread, at most this many frames per second
+PREVIEW_FPS = 10
+
+# Pipeline mode runs capture and YOLO in background threads (see run_pipeline)
+PIPELINE_MODE = False
+PIPELINE_STATS_INTERVAL = 5.0  # Seconds between per-stage FPS reports
+
+# Motion gating: only run YOLO once the board changed and settled, or when the Arduino asks
+MOTION_GATING = True
+
+
+########################################################################################
+
+
+class ChessApp:
+    """One table: the game loop of this script, with its slow parts brought up concurrently by start()."""
+
+    def __init__(self, args):
+        self.args = args
+        self.show_window = not args.no_window
+        self.serial_protocol = SERIAL_PROTOCOL
+        if args.replay:
+            self.serial_protocol = "text"  # Recorded sessions hold text lines, and the replay Arduino speaks them
+        self.recorder = SessionRecorder(args.record) if args.record else None
+        if args.replay:
+            self.session_events = load_session(args.replay)
+            self.replay_clock = ReplayClock()
+            self.replay_arduino = ReplayArduino(self.session_events, self.replay_clock).start()
+
+        # Board corners (a1, h1, h8, a8) -> homography -> pixel-to-square lookup table, built once
+        self.board_corners = load_calibration() or default_corners(BOARD_X_MIN, BOARD_X_MAX, BOARD_Y_MIN, BOARD_Y_MAX)
+        self.square_lut = build_square_lut(compute_homography(self.board_corners), FRAME_WIDTH, FRAME_HEIGHT)
+        self.frame_shape = (FRAME_HEIGHT, FRAME_WIDTH)
+
+        self.startup = None
+        self.transport = None
+        self.model = None
+        self.cap = None
+        self.engine_pool = self.ponderer = self.move_cache = self.opening_book = None
+        self.engine_options = ENGINE_OPTIONS or engine_options(ENGINE_POOL_SIZE)
+        self.search_limits = None if args.replay else SearchLimits(SEARCH_LIMIT_KIND)
+        self.session = None
+        self.journal = None
+        self.controls = ControlQueue()
+        self.preview = self.control_server = self.metrics_exporter = self.metrics_server = None
+
+    ####################################################################################
+    # Startup tasks: independent of each other, run side by side by start()
+
+    # Connect to Arduino Mega (Update COM port for Windows) and wait out its reset
+    def _open_serial(self):
+        try:
+            if self.args.replay:
+                ser = serial.Serial(self.replay_arduino.port, SERIAL_BAUD, timeout=1)  # Stand-in Arduino on a pty
             else:
-                move = chess.Move(moved_from, moved_to)  # Regular pawn move
-        else:
-            move = chess.Move(moved_from, moved_to)  # Non-pawn moves
-
-        move_uci = move.uci()
-        print(f"✅ Capture Move Detected: {move_uci} (Captured {chess.square_name(removed_black)})")
-
-        # ✅ Validate move with Stockfish
-        if validate_move_with_stockfish(old_board.fen(), move_uci):
-            return move
+                ser = serial.Serial(SERIAL_PORT, SERIAL_BAUD, timeout=1)
+                if wait_for_boot(ser, ARDUINO_BOOT_TIMEOUT) is None:
+                    print(f"⚠ No boot message from the Arduino within {ARDUINO_BOOT_TIMEOUT:.0f} s, carrying on.")
+            if ser.is_open:
+                print(f"✅ Serial connection established ({SERIAL_BAUD} baud, {self.serial_protocol} protocol).")
+        except serial.SerialException:
+            print("❌ ERROR: Unable to connect to Arduino. Check COM port.")
+            return
+
+        # Background reader: Arduino messages become typed Messages, DEBUG lines go to their own log file
+        log_debug_to_file("arduino_debug.log")
+        transport_class = FramedTransport if self.serial_protocol == "framed" else SerialTransport
+        self.transport = transport_class(ser, tap=self.recorder.record_serial if self.recorder else None).start()
+
+    # Load YOLO or the square classifier (ultralytics and torch are only imported here) and pay its warm-up cost
+    def _load_model(self):
+        if RECOGNITION == "classifier":
+            self.model = SquareClassifier(CLASSIFIER_WEIGHTS, backend=DETECTOR_BACKEND,
+                                          warper=BoardWarper(self.board_corners))
+            self.model.warm_up(self.frame_shape)
+            return
+        roi = None if DETECTOR_CROP_MARGIN is None else board_roi(self.board_corners, DETECTOR_CROP_MARGIN,
+                                                                  self.frame_shape)
+        self.model = YoloDetector(DETECTOR_WEIGHTS, backend=DETECTOR_BACKEND, imgsz=DETECTOR_IMGSZ, roi=roi,
+                                  conf=0.4, int8=DETECTOR_INT8)
+        self.model.warm_up(self.frame_shape)
+
+    # Open webcam; the first frame is grabbed here, as drivers often take a while to deliver it
+    def _open_camera(self):
+        if self.args.replay:
+            cap = ReplayCapture(self.args.replay, self.session_events, self.replay_clock)
         else:
-            print(f"❌ Move {move_uci} is not legal according to Stockfish!")
-            return None
-
-    print("❌ No valid White move detected!")
-    return None  # Invalid move
-
-
-########################################################################################    
-
-
-# Function to get AI move while preventing special moves
-def get_ai_move(board, difficulty):
-    time_limit = 0.5 if difficulty == "easy" else 1.5  
-    options = {"UCI_LimitStrength": True, "UCI_Elo": 1320 if difficulty == "easy" else 2000}
-
-    # ✅ Ensure AI does not have castling rights
-    fen_parts = board.fen().split()
-    fen_parts[2] = fen_parts[2].replace("k", "").replace("q", "")  # Remove kq (Black's castling rights)
-    fixed_fen = " ".join(fen_parts)
-    board.set_fen(fixed_fen)  # ✅ Apply updated FEN
-
-    result = engine.play(board, chess.engine.Limit(time=time_limit), options=options)
-    ai_move = result.move
-
-    # ✅ Introduce 75% blunder chance in easy mode
-    if difficulty == "easy" and random.random() < 0.75:
-        legal_moves = list(board.legal_moves)  # Get all legal moves
-        if len(legal_moves) > 1 and not board.is_check():  # ✅ Ensure not in check
-            blunder_move = random.choice(legal_moves)  # Pick a random move
-            ai_move = blunder_move  # Replace AI move with a blunder
-
-    # ✅ Force AI promotion to be only to a Queen
-    if board.piece_at(ai_move.from_square) and board.piece_at(ai_move.from_square).piece_type == chess.PAWN:
-        if chess.square_rank(ai_move.to_square) in [0, 7]:  # If AI pawn reaches last rank
-            print("♛ AI Pawn Promotion Detected! Forcing Queen Promotion.")
-            ai_move = chess.Move(ai_move.from_square, ai_move.to_square, promotion=chess.QUEEN)
-
-    # **Ensure AI move is valid (retry if illegal)**
-    while board.is_castling(ai_move) or board.is_en_passant(ai_move):
-        print("⚠ AI generated a special move (castling/en passant), recalculating...")
-        result = engine.play(board, chess.engine.Limit(time=time_limit), options=options)
-        ai_move = result.move
-
-    return ai_move
-
-
-########################################################################################    
-
-
-# Initialize Stockfish Engine (Ensure the path is correct)
-engine = chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH)
-
-board = chess.Board()  # tracks all moves properly
-initial_fen = board.fen()  # Store correct default FEN
-previous_fen = initial_fen  # Set previous FEN to the starting position
-game_started = False
-difficulty = None  # "easy" or "hard"
-
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        print("Failed to grab frame")
-        break
-
-    # Run YOLO inference
-    results = model(frame, verbose=False, conf=0.4)  # Suppress unnecessary logs
-
-    # Detected board state
-    board_state = {}
-
-    for r in results:
-        for box in r.boxes:
-            x1, y1, x2, y2 = box.xyxy[0]  
-            class_id = int(box.cls[0])  
-            piece_label = model.names[class_id]  
-            piece_short = piece_short_names.get(piece_label, piece_label)
-
-            center_x = (x1 + x2) / 2
-            center_y = (y1 + y2) / 2
-            square = get_chess_square(center_x, center_y)
-
-            if square:
-                board_state[square] = piece_short
-
-            # Draw bounding box
-            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-            cv2.putText(frame, f"{piece_short}-{square}", (int(x1), int(y1) - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-
-    # Draw the chessboard grid
-    frame = draw_chess_grid(frame)
-
-    # Display camera with detected chessboard
-    cv2.imshow("YOLOv8 Chess Detection", frame)
-
-    # 'q' to exit
-    key = cv2.waitKey(1) & 0xFF
-    if key == ord('q'):
-        print("❌ Exiting program...")
-        break
-
-    # 'r' to reset the board
-    if key == ord('r'):
-        print("🔄 Resetting the board...")
-        game_started = False
-        previous_fen = initial_fen
-        board.reset()
-        print("🔄 Game Ended. Press Start Button for a new game.")
-
-    # ✅ Read Serial Data from Arduino
-    if ser:
-        arduino_data = read_arduino()
-        if arduino_data:
-            print(f"📡 Arduino Sent: {arduino_data}")  # Debugging
-
-            if arduino_data == "START":
-                detected_fen = board_state_to_fen(board_state, board)
-                print("🔎 Detected FEN:", detected_fen)
-
-                if detected_fen == initial_fen:
-                    print("✅ Board is in the correct initial position. Ready to play!")
-                    game_started = True
-                    ser.write(b"START_OK\n")  # ✅ Send confirmation to Arduino
-                else:
-                    print("⚠️ Incorrect board setup! Please adjust and try again.")
-                    ser.write(b"START_ERROR\n")  # ✅ Send error message to Arduino
-
-            elif arduino_data == "EASY":
-                if game_started:
-                    difficulty = "easy"
-                    print("🎯 Difficulty set to: EASY")
-
-            elif arduino_data == "HARD":
-                if game_started:
-                    difficulty = "hard"
-                    print("🔥 Difficulty set to: HARD")
-
-            elif arduino_data == "END":
-                game_started = False
-                previous_fen = initial_fen
-                board.reset()
+            cap = cv2.VideoCapture(CAMERA_INDEX)
+        cap.set(3, FRAME_WIDTH)  # Set width
+        cap.set(4, FRAME_HEIGHT)   # Set height
+        if not self.args.replay and cap.isOpened():
+            cap.read()
+        self.cap = RecordingCapture(cap, self.recorder) if self.recorder else cap
+
+    # Initialize Stockfish Engine pool (Ensure the path is correct)
+    def _start_engines(self):
+        if self.args.replay:
+            # Replayed searches answer with the recorded AI moves, so caching, book and pondering are off
+            self.engine_pool = ReplayEnginePool(self.session_events, engine_time=self.args.engine_time)
+            self.move_cache = MoveCache(None, capacity=0)
+            self.opening_book = OpeningBook(None)
+            return
+        engine_pool = EnginePool(STOCKFISH_PATH, size=ENGINE_POOL_SIZE, options=self.engine_options)
+        if self.search_limits.kind == "time":
+            self.search_limits.nps = calibrate(STOCKFISH_PATH, self.engine_options, measure=False)
+        self.engine_pool = RecordingEnginePool(engine_pool, self.recorder) if self.recorder else engine_pool
+        self.ponderer = Ponderer(self.engine_pool, candidates=PONDER_CANDIDATES) if PONDERING else None
+        self.move_cache = MoveCache(MOVE_CACHE_FILE, capacity=MOVE_CACHE_SIZE)
+        self.opening_book = OpeningBook(OPENING_BOOK)
+
+    ####################################################################################
+
+    def start(self, parallel=PARALLEL_STARTUP):
+        self.startup = Startup(parallel, registry=metrics)
+        self.startup.add("serial", self._open_serial)
+        self.startup.add("model", self._load_model)
+        self.startup.add("camera", self._open_camera)
+        self.startup.add("engines", self._start_engines)
+        self.startup.run()
+        if self.search_limits and self.search_limits.kind == "time" and not self.search_limits.nps:
+            # First start with these settings: `bench` now that nothing else competes for the CPU
+            self.search_limits.nps = calibrate(STOCKFISH_PATH, self.engine_options)
+        if self.search_limits:
+            print(f"♟ Stockfish {self.engine_options}")
+            print(self.search_limits.describe(DIFFICULTY_PROFILES))
+
+        motion_gate = None
+        if MOTION_GATING:
+            motion_gate = MotionGate(board_roi(self.board_corners, MOTION_ROI_MARGIN, self.frame_shape))
+
+        if JOURNAL_FILE and not self.args.replay:  # A replay must not resume or log a real game
+            self.journal = GameJournal(JOURNAL_FILE, GAMES_PGN, site=TABLE_ID)
+
+        # Board, turn state and the Arduino conversation of this table
+        self.session = GameSession(self.transport, self.engine_pool, self.move_cache, self.opening_book,
+                                   ponderer=self.ponderer, motion_planner=MotionPlanner() if MOTION_PLANNER else None,
+                                   motion_gate=motion_gate, tracker=BoardStateTracker(history=TRACKER_HISTORY),
+                                   recorder=self.recorder, min_square_certainty=MIN_SQUARE_CERTAINTY,
+                                   move_match_tolerance=MOVE_MATCH_TOLERANCE, pre_position_trolley=PRE_POSITION_TROLLEY,
+                                   search_limits=self.search_limits, journal=self.journal)
+
+        # Operator controls: preview keys, control socket and console all end up in handle_controls()
+        if self.show_window:
+            self.preview = Preview(grid_lines(self.board_corners), self.frame_shape, self.controls, fps=PREVIEW_FPS)
+            self.preview.start()
+        try:
+            if CONTROL_PORT:
+                self.control_server = ControlServer(self.controls, CONTROL_PORT, status=self.session_status).start()
+        except OSError as e:  # Port taken, e.g. by a second table on the same host
+            print(f"⚠ Control socket disabled: {e}")
+        if not self.args.replay:  # Replays run unattended from bench_replay.py
+            read_console(self.controls)
+
+        metrics.labels["table"] = TABLE_ID
+        self.metrics_exporter = JsonlExporter(metrics, METRICS_FILE, METRICS_INTERVAL) if METRICS_FILE else None
+        if self.metrics_exporter:
+            self.metrics_exporter.start()
+        try:
+            self.metrics_server = MetricsServer(metrics, METRICS_PORT).start() if METRICS_PORT else None
+        except OSError as e:  # Port taken, e.g. by a second table on the same host
+            print(f"⚠ Metrics endpoint disabled: {e}")
+
+        # Only now may the Arduino accept START: everything the first move needs is up
+        print(self.startup.format_report())
+        self.session.send_ready()
+        return self
+
+    # Convert bounding box center to chess notation
+    def get_chess_square(self, x, y):
+        square = squares_for_boxes([x, y, x, y], self.square_lut)[0]
+        if square < 0:
+            return None  # Outside board
+        return chess.square_name(int(square))  # 'a1' to 'h8'
+
+    # Run YOLO (or the square classifier) on a frame and map every detection to its square
+    def detect_board_state(self, frame):
+        with metrics.timer("inference"):
+            found = self.model(frame)  # Boxes already in full-frame coordinates (or the 64 squares' classes)
+        with metrics.timer("square_mapping"):
+            if RECOGNITION == "classifier":
+                return map_squares(found, self.model.names, self.model.warper.square_boxes)
+            return map_detections(found, self.model.names, self.square_lut)
+
+    # Hand the frame to the preview thread (if any); drawing and the GUI never hold up detection
+    def show_frame(self, frame, detections):
+        if self.preview:
+            self.preview.show(frame, detections)
+
+    # Apply operator commands from the preview keys, control socket and console (returns False to exit)
+    def handle_controls(self):
+        while True:
+            command = self.controls.get()
+            if command is None:
+                return True
+
+            if command.name == "quit":
+                print(f"❌ Exiting program ({command.source})...")
+                return False
+
+            if command.name == "reset":
+                print(f"🔄 Resetting the board ({command.source})...")
+                self.session.reset()
                 print("🔄 Game Ended. Press Start Button for a new game.")
 
-            elif arduino_data == "MOVE_CONFIRM":
-                if game_started and difficulty:
-                    fen = board_state_to_fen(board_state, board)  # Convert detected board to FEN
-
-                    if fen != previous_fen:  # Only proceed if board has changed
-                        print("🔎 New board state detected!")
-                        print("FEN:", fen)
-
-                        previous_board = chess.Board(previous_fen)
-                        current_board = chess.Board(fen)
-
-                        # ✅ Validate human move
-                        human_move = detect_human_move(previous_board, current_board)
-
-                        if human_move is None:
-                            if previous_board.is_check():
-                                # Human was in check but made invalid move
-                                legal_moves = [m.uci() for m in previous_board.legal_moves]
-                                moves_str = " ".join(legal_moves)
-                                print(f"⚠️ Invalid Move While In Check! Legal moves: {moves_str}")
-                                ser.write(f"MOVE_ERROR_CHECK:{moves_str}\n".encode())
-                            else:
-                                print("❌ No valid White move detected! Please try again.")
-                                ser.write(b"MOVE_ERROR\n")
-                        elif current_board.turn == chess.BLACK:  # White should be moving
-                            print("❌ Black (AI) moved out of turn! Invalid board setup.")
-                            ser.write(b"MOVE_ERROR\n")
-                        else:
-                            print(f"✅ White Move Detected: {human_move.uci()}")
-                            ser.write(b"MOVE_OK\n")
-                            board.push(human_move)  # Apply human move
-
-                            # ✅ Check game status after Human Move
-                            while True:
-                                arduino_response = read_arduino()
-                                if arduino_response == "ASK_HUMAN_STATUS":
-                                    break                 
-                            if not process_game_status(board, "Human", "AI"):
-                                continue  # Skip AI move if the game ended
-
-                            # ✅ AI's Turn
-                            while True:
-                                arduino_response = read_arduino()
-                                if arduino_response == "ASK_AI_MOVE":
-                                    break
-                            ai_move = get_ai_move(board, difficulty)
-                            is_capture = 0 if board.is_capture(ai_move) else 1  
-                            board.push(ai_move)  # Apply AI move
-                            print(board)
-                            print(f"🤖 AI Move (Black): {ai_move.uci()}:{is_capture}")
-
-                            # Handle Pawn Promotion (Remove last character if promotion occurs)
-                            move_str = ai_move.uci()
-                            if len(move_str) == 5:
-                                move_str = move_str[:4]
-
-                            # Send AI move to Arduino
-                            send_ai_move(f"{move_str}:{is_capture}")
-
-                            # ✅ Check game status after AI Move
-                            while True:
-                                arduino_response = read_arduino()
-                                if arduino_response == "ASK_AI_STATUS":
-                                    break
-                            process_game_status(board, "AI", "Human")
-
-                            # Store board state for next turn
-                            previous_fen = board.fen()
-                    else:
-                        print("♟ No changes detected in board state.")
-                        ser.write(b"MOVE_NO_CHANGE\n")
-
-# Release resources
-cap.release()
-cv2.destroyAllWindows()
-engine.quit()
+            elif command.name == "status":
+                print(f"ℹ {self.session_status()}")
+
+    def session_status(self):
+        state = "playing" if self.session.game_started else "waiting for START"
+        return f"{TABLE_ID}: {state}, difficulty={self.session.difficulty}, fen={self.session.board.fen()}"
+
+    # Single-threaded loop: capture, inference, display and serial all in turn
+    def run_sequential(self):
+        detections = []
+        motion_gate = self.session.motion_gate
+
+        while self.cap.isOpened():
+            with metrics.timer("capture"):
+                ret, frame = self.cap.read()
+            if not ret:
+                print("Failed to grab frame")
+                break
+            captured_at = time.monotonic()
+
+            if not motion_gate or motion_gate.update(frame):
+                _, detections = self.detect_board_state(frame)
+                self.session.update_board(detections, captured_at, changed=motion_gate.changed if motion_gate else False)
+
+            self.show_frame(frame, detections)
+            if not self.handle_controls():
+                break
+
+            # ✅ Read Serial Data from Arduino
+            self.session.poll()
+
+    # Pipeline loop: capture and inference run in their own threads, linked by latest-frame queues,
+    # so the game/serial controller always sees the freshest board state and never waits on YOLO
+    def run_pipeline(self):
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Don't let the driver queue stale frames
+
+        frames = LatestQueue()
+        results = ResultQueue()  # Inferred results queue up: each is a tracker vote
+        capture = CaptureStage(self.cap, frames)
+        inference = InferenceStage(self.detect_board_state, frames, results, gate=self.session.motion_gate)
+        controller = FpsCounter()
+        capture.start()
+        inference.start()
+
+        detections = []
+        last_report = time.perf_counter()
+
+        try:
+            while not capture.stopped:
+                latest = results.get(timeout=0.01)  # Never blocks behind inference for long
+                if latest:
+                    if latest.inferred:
+                        detections = latest.detections
+                        self.session.update_board(detections, latest.captured_at, changed=latest.changed)
+                    self.show_frame(latest.frame, detections)
+                if not self.handle_controls():
+                    break
+                controller.tick()
+
+                # ✅ Read Serial Data from Arduino
+                self.session.poll()
+
+                if time.perf_counter() - last_report > PIPELINE_STATS_INTERVAL:
+                    last_report = time.perf_counter()
+                    counters = {"capture": capture.counter, "inference": inference.counter, "controller": controller}
+                    print(format_stage_stats(counters, frames, results))
+        finally:
+            capture.stop()
+            inference.stop()
+            capture.join(timeout=1)
+            inference.join(timeout=1)
+
+    def run(self):
+        if PIPELINE_MODE:
+            self.run_pipeline()
+        else:
+            self.run_sequential()
+
+    # Release resources
+    def close(self):
+        if self.cap:
+            self.cap.release()
+        if self.preview:
+            self.preview.stop()
+        if self.control_server:
+            self.control_server.stop()
+        if self.session:
+            self.session.close()
+        if self.journal:
+            self.journal.close()
+            print(self.journal.format_stats())
+        if self.ponderer:
+            print(self.ponderer.format_stats())
+        if self.engine_pool:
+            self.engine_pool.close()
+        if self.move_cache:
+            self.move_cache.close()
+        if self.opening_book:
+            self.opening_book.close()
+        if self.transport:
+            self.transport.stop()
+            if isinstance(self.transport, FramedTransport):
+                print(self.transport.format_stats())
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        print(metrics.format_summary())
+        if self.recorder:
+            self.recorder.close()
+        if self.args.replay:
+            self.replay_arduino.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chess robot game loop.")
+    parser.add_argument("--record", metavar="DIR", help="record frames, serial traffic and engine calls to a session")
+    parser.add_argument("--replay", metavar="DIR", help="replay a recorded session (no camera, Arduino or Stockfish)")
+    parser.add_argument("--engine-time", choices=["recorded", "zero"], default="recorded",
+                        help="replayed searches take their recorded time, or none")
+    parser.add_argument("--bench-out", metavar="FILE", help="write the replay latency report to this JSON file")
+    parser.add_argument("--no-window", "--headless", dest="no_window", action="store_true",
+                        help="no preview window and no drawing at all (use the control socket or console)")
+    parser.add_argument("--sequential-startup", action="store_true",
+                        help="bring serial, model, camera and engines up one after another (for comparison)")
+    parser.add_argument("--startup-only", action="store_true", help="exit as soon as the table is ready")
+    parser.add_argument("--startup-out", metavar="FILE", help="write the startup timings to this JSON file")
+    args = parser.parse_args()
+
+    app = ChessApp(args).start(parallel=PARALLEL_STARTUP and not args.sequential_startup)
+    if args.startup_out:
+        with open(args.startup_out, "w", encoding="utf-8") as f:
+            json.dump(app.startup.report(), f, indent=2)
+
+    run_started = time.perf_counter()
+    try:
+        if not args.startup_only:
+            app.run()
+    finally:
+        app.close()
+
+    if args.replay:
+        report = app.replay_arduino.report()
+        report.update(frames=app.cap.served, engine_misses=app.engine_pool.misses,
+                      wall_s=round(time.perf_counter() - run_started, 2))
+        print(f"⏱ Replay report: {json.dumps(report, indent=2)}")
+        if args.bench_out:
+            with open(args.bench_out, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
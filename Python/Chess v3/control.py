@@ -0,0 +1,100 @@
+"""Operator controls that don't need the preview window.
+
+The preview's keys, a local control socket and the console all put commands on one
+ControlQueue; the game loop takes them off on its own thread, so sessions are never touched
+from elsewhere. Control a headless table with e.g.
+    echo reset | nc 127.0.0.1 9109      (or type "reset" in the console)
+Commands: quit, reset [table], status.
+"""
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+from collections import namedtuple
+
+COMMANDS = ("quit", "reset", "status")
+
+# args are the words after the command (e.g. a table name for the table server)
+Command = namedtuple("Command", ["name", "args", "source"])
+
+
+class ControlQueue:
+    def __init__(self):
+        self._commands = queue.Queue()
+
+    def put(self, line, source="console"):
+        """Queue a command line; returns an error message if it isn't one."""
+        words = line.strip().split()
+        if not words:
+            return None
+        if words[0].lower() not in COMMANDS:
+            return f"unknown command {words[0]!r} (commands: {', '.join(COMMANDS)})"
+        self._commands.put(Command(words[0].lower(), words[1:], source))
+        return None
+
+    def get(self):
+        """Next command, or None (never blocks)."""
+        try:
+            return self._commands.get_nowait()
+        except queue.Empty:
+            return None
+
+
+class ExclusiveBindMixin:
+    """Local server ports that a second table can't share (mix in before the socketserver class).
+
+    On Unix, SO_REUSEADDR only lets a restarted table bind without waiting out TIME_WAIT. On
+    Windows it would let a second process bind a port in use, so there the port is claimed with
+    SO_EXCLUSIVEADDRUSE instead, and a taken port raises OSError."""
+
+    allow_reuse_address = os.name != "nt"
+
+    def server_bind(self):
+        if os.name == "nt":
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        super().server_bind()
+
+
+class _Server(ExclusiveBindMixin, socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+
+class ControlServer:
+    """Line-based command socket on localhost; "status" is answered with status() right away."""
+
+    def __init__(self, controls, port=9109, host="127.0.0.1", status=None):
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    line = raw.decode(errors="replace").strip()
+                    if line.lower() == "status" and status:
+                        reply = status()
+                    else:
+                        reply = controls.put(line, source="socket") or "ok"
+                    self.wfile.write(f"{reply}\n".encode())
+
+        self._server = _Server((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="control-socket", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# Commands typed in the console (stdin); stops quietly when stdin is closed
+def read_console(controls):
+    def run():
+        for line in sys.stdin:
+            error = controls.put(line, source="console")
+            if error:
+                print(f"⚠ {error}")
+
+    thread = threading.Thread(target=run, name="control-console", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,164 @@
+"""Pluggable YOLO detector backends for CPU-only tables.
+
+The same best.pt can run as PyTorch, ONNX Runtime or OpenVINO (optionally int8-quantized),
+on the full frame or on just the board crop at a smaller imgsz. Exports are created on first
+use next to the weights and reused afterwards. Export ahead of time with:
+    python detector_backends.py --backend openvino --imgsz 480 --int8 --calibration-frames frames/
+"""
+import argparse
+import glob
+import os
+import shutil
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+BACKENDS = ("torch", "onnx", "openvino")
+
+# Boxes of one frame as NumPy arrays, in full-frame pixel coordinates
+Detections = namedtuple("Detections", ["xyxy", "conf", "cls"])
+
+
+# Where the export of weights for a backend/imgsz/int8 combination lives
+def exported_model_path(weights, backend, imgsz, int8=False):
+    if backend == "torch":
+        return weights
+    stem = os.path.splitext(weights)[0]
+    suffix = f"_{imgsz}" + ("_int8" if int8 else "")
+    if backend == "onnx":
+        return f"{stem}{suffix}.onnx"
+    if backend == "openvino":
+        return f"{stem}{suffix}_openvino_model"
+    raise ValueError(f"Unknown detector backend: {backend} (choose from {', '.join(BACKENDS)})")
+
+
+# Read calibration frames (board crops work best) from a directory of images
+def load_frames(directory, limit=None):
+    paths = sorted(glob.glob(os.path.join(directory, "*.png")) + glob.glob(os.path.join(directory, "*.jpg")))
+    frames = [cv2.imread(path) for path in paths[:limit]]
+    return [frame for frame in frames if frame is not None]
+
+
+# Letterbox-free preprocessing matching a fixed-size ONNX export: BGR uint8 -> 1x3xSxS float
+def preprocess(frame, imgsz):
+    image = cv2.resize(frame, (imgsz, imgsz), interpolation=cv2.INTER_LINEAR)
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)
+    return np.ascontiguousarray(image, dtype=np.float32)[None] / 255.0
+
+
+########################################################################################
+
+
+def export_model(weights, backend, imgsz, int8=False, calibration_frames=None, calibration_data=None):
+    """Export weights for a backend and return the path of the exported model.
+
+    int8 OpenVINO uses Ultralytics/NNCF quantization (calibration_data is a dataset yaml);
+    int8 ONNX uses ONNX Runtime static quantization on a directory of calibration frames."""
+    from ultralytics import YOLO
+
+    target = exported_model_path(weights, backend, imgsz, int8)
+    if backend == "torch" or os.path.exists(target):
+        return target
+
+    print(f"📦 Exporting {weights} to {backend} (imgsz={imgsz}, int8={int8})...")
+    model = YOLO(weights)
+
+    if backend == "openvino":
+        exported = model.export(format="openvino", imgsz=imgsz, int8=int8, data=calibration_data)
+        shutil.move(exported, target)
+        return target
+
+    exported = model.export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True)
+    if not int8:
+        shutil.move(exported, target)
+        return target
+
+    if not calibration_frames:
+        raise ValueError("int8 ONNX export needs calibration_frames (a directory of board frames)")
+    quantize_onnx(exported, target, load_frames(calibration_frames, limit=200), imgsz)
+    os.remove(exported)
+    return target
+
+
+def quantize_onnx(source, target, frames, imgsz):
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._inputs = iter([{"images": preprocess(frame, imgsz)} for frame in frames])
+
+        def get_next(self):
+            return next(self._inputs, None)
+
+    quantize_static(source, target, FrameReader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+
+########################################################################################
+
+
+class YoloDetector:
+    """Runs best.pt (or one of its exports) on the board crop and returns full-frame Detections."""
+
+    def __init__(self, weights="best.pt", backend="torch", imgsz=640, roi=None, conf=0.4, int8=False,
+                 calibration_frames=None, calibration_data=None):
+        from ultralytics import YOLO
+
+        self.backend = backend
+        self.imgsz = imgsz
+        self.roi = roi  # (x1, y1, x2, y2) crop, or None for the full frame
+        self.conf = conf
+        path = export_model(weights, backend, imgsz, int8, calibration_frames, calibration_data)
+        self.model = YOLO(path, task="detect")
+        self.names = self.model.names
+
+    def __call__(self, frame):
+        return self.predict([frame])[0]
+
+    # One throwaway inference at startup, so the first real frame doesn't pay the warm-up cost
+    def warm_up(self, frame_shape):
+        self(np.zeros((frame_shape[0], frame_shape[1], 3), dtype=np.uint8))
+
+    def predict(self, frames, rois=None):
+        """Run one batched call over several frames; returns one Detections per frame.
+
+        rois gives each frame its own crop (frames of several cameras); default self.roi for all."""
+        offsets = []
+        crops = []
+        for frame, roi in zip(frames, rois or [self.roi] * len(frames)):
+            if roi:
+                x1, y1, x2, y2 = roi
+                crops.append(frame[y1:y2, x1:x2])
+                offsets.append((x1, y1, x1, y1))
+            else:
+                crops.append(frame)
+                offsets.append((0, 0, 0, 0))
+
+        results = self.model(crops, imgsz=self.imgsz, conf=self.conf, verbose=False)
+
+        detections = []
+        for r, offset in zip(results, offsets):
+            boxes = r.boxes
+            xyxy = boxes.xyxy.cpu().numpy() + np.float32(offset)
+            detections.append(Detections(xyxy, boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy().astype(int)))
+        return detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export best.pt for a CPU detector backend.")
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--backend", choices=BACKENDS, default="onnx")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--calibration-frames", help="directory of frames for int8 ONNX quantization")
+    parser.add_argument("--calibration-data", help="dataset yaml for int8 OpenVINO quantization")
+    args = parser.parse_args()
+
+    path = export_model(args.weights, args.backend, args.imgsz, args.int8,
+                        args.calibration_frames, args.calibration_data)
+    print(f"✅ Exported model: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Stockfish settings sized to the host, and search limits that mean the same on every host.
+
+Threads and Hash follow the core count and memory (shared with YOLO and capture, and split
+between pool workers); they are set once per engine process. Difficulty limits come in three
+kinds:
+    "time"  - the profile's time, rescaled by a startup `bench` so a search visits as many
+              nodes on a slow laptop as on the host the profiles were tuned on
+    "nodes" - a fixed node budget: identical strength everywhere, time varies with the host
+    "depth" - a fixed depth (cheap in quiet positions, slow in sharp ones, so capped in time too)
+The bench result is cached per binary and settings, so it only costs time on the first start.
+
+    python engine_config.py     (print the detected settings and calibration)
+"""
+import ctypes
+import json
+import os
+import re
+import subprocess
+import sys
+
+import chess.engine
+
+LIMIT_KINDS = ("time", "nodes", "depth")
+
+REFERENCE_NPS = 1_000_000  # Nodes per second of the host DIFFICULTY_PROFILES were tuned on
+ENGINE_CORE_SHARE = 0.5    # Cores left to Stockfish; the rest run YOLO, capture and the game loop
+HASH_MEMORY_SHARE = 1 / 16  # Share of RAM for all Stockfish hash tables together
+MIN_HASH_MB, MAX_HASH_MB = 16, 1024
+MAX_TIME_SCALE = 2.0       # Slow hosts get at most this times the profile's time (the Arduino waits 5 s)
+BENCH_DEPTH = 11           # `bench` depth: about a second on a desktop CPU
+CALIBRATION_FILE = "engine_calibration.json"
+
+
+def memory_mb():
+    """Physical memory in MB, or None if it can't be found out."""
+    if sys.platform == "win32":
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+        status = MemoryStatus(dwLength=ctypes.sizeof(MemoryStatus))
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys // 2**20
+        return None
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2**20
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def engine_options(workers=1, cores=None, memory=None):
+    """Threads and Hash for each of `workers` Stockfish processes on this host."""
+    cores = cores or os.cpu_count() or 1
+    memory = memory if memory is not None else memory_mb()
+    threads = max(1, int(cores * ENGINE_CORE_SHARE) // workers)
+
+    hash_mb = MIN_HASH_MB
+    if memory:
+        budget = memory * HASH_MEMORY_SHARE / workers
+        while hash_mb * 2 <= min(budget, MAX_HASH_MB):  # Powers of two, like Stockfish's own default
+            hash_mb *= 2
+    return {"Threads": threads, "Hash": hash_mb}
+
+
+def run_bench(path, options, depth=BENCH_DEPTH):
+    """Stockfish's built-in `bench` with these settings; returns nodes per second, or None."""
+    try:
+        result = subprocess.run([path, "bench", str(options["Hash"]), str(options["Threads"]), str(depth)],
+                                capture_output=True, text=True, timeout=120)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = re.search(r"Nodes/second\s*:\s*(\d+)", result.stdout + result.stderr)
+    return int(match.group(1)) if match else None
+
+
+def calibrate(path, options, cache_file=CALIBRATION_FILE, measure=True):
+    """Nodes per second of this host with these settings: cached, or measured with `bench`
+    (unless measure is False, e.g. while other startup work would skew the result)."""
+    try:
+        key = f"{os.path.abspath(path)}|{os.path.getmtime(path):.0f}|{options['Threads']}|{options['Hash']}"
+    except OSError:
+        return None
+    cache = {}
+    if cache_file and os.path.exists(cache_file):
+        with open(cache_file, encoding="utf-8") as f:
+            cache = json.load(f)
+    if key in cache or not measure:
+        return cache.get(key)
+
+    nps = run_bench(path, options)
+    if nps and cache_file:
+        cache[key] = nps
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+    return nps
+
+
+class SearchLimits:
+    """Turns a difficulty profile into the chess.engine.Limit for this host."""
+
+    def __init__(self, kind="time", nps=None, reference_nps=REFERENCE_NPS):
+        if kind not in LIMIT_KINDS:
+            raise ValueError(f"unknown limit kind {kind!r} (expected one of {', '.join(LIMIT_KINDS)})")
+        self.kind = kind
+        self.nps = nps  # Measured by calibrate(); None keeps the profiles' own times
+        self.reference_nps = reference_nps
+
+    def limit(self, profile):
+        max_time = profile.limit.time * MAX_TIME_SCALE  # Never past what the Arduino waits for
+        if self.kind == "depth":
+            return chess.engine.Limit(depth=profile.depth, time=max_time)
+        nodes = int(profile.limit.time * self.reference_nps)  # What the profile searches on the reference host
+        if self.kind == "nodes":
+            return chess.engine.Limit(nodes=nodes, time=max_time)
+        if self.nps:
+            return chess.engine.Limit(time=round(min(nodes / self.nps, max_time), 3))
+        return profile.limit
+
+    def describe(self, profiles):
+        limits = ", ".join(f"{name} {self.limit(profile)}" for name, profile in profiles.items())
+        calibration = f"{self.nps / 1e6:.2f} Mnps" if self.nps else "uncalibrated"
+        return f"♟ Search limits ({self.kind}, {calibration}): {limits}"
+
+
+def main():
+    from chess_test import ENGINE_POOL_SIZE
+    from strength import DIFFICULTY_PROFILES
+    from table_config import STOCKFISH_PATH
+
+    options = engine_options(ENGINE_POOL_SIZE)
+    print(f"Host: {os.cpu_count()} cores, {memory_mb()} MB -> {options} per engine")
+    nps = calibrate(STOCKFISH_PATH, options, cache_file=None)
+    print(f"bench: {nps} nodes/s" if nps else f"bench failed (is {STOCKFISH_PATH} there?)")
+    for kind in LIMIT_KINDS:
+        print(SearchLimits(kind, nps).describe(DIFFICULTY_PROFILES))
+
+
+if __name__ == "__main__":
+    main()
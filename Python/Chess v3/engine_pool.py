@@ -0,0 +1,212 @@
+import itertools
+import queue
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import chess
+import chess.engine
+
+
+# Check move legality in-process (no Stockfish spawn needed)
+def validate_move(board, move_uci):
+    """Return True if move_uci is legal on board (chess.Board or FEN string)."""
+    if isinstance(board, str):
+        board = chess.Board(board)
+
+    try:
+        move = chess.Move.from_uci(move_uci)
+    except ValueError:
+        return False
+
+    return board.is_legal(move)
+
+
+########################################################################################
+
+
+class EnginePool:
+    """Keeps warm Stockfish processes so callers never pay a spawn + NNUE load per request."""
+
+    def __init__(self, path, size=1, options=None):
+        self.path = path
+        self.size = size
+        self.options = options or {}  # UCI options (Threads, Hash) set once per process, see engine_config.py
+        self._idle = queue.Queue()
+        self._engines = []
+        self._lock = threading.Lock()
+
+        with ThreadPoolExecutor(max_workers=size) as executor:  # Processes start (and load NNUE) side by side
+            for engine in executor.map(lambda _: self._spawn(), range(size)):
+                self._idle.put(engine)
+
+    def _spawn(self):
+        engine = chess.engine.SimpleEngine.popen_uci(self.path)
+        if self.options:
+            engine.configure(self.options)
+        with self._lock:
+            self._engines.append(engine)
+        return engine
+
+    def _retire(self, engine):
+        with self._lock:
+            if engine in self._engines:
+                self._engines.remove(engine)
+        try:
+            engine.quit()
+        except (chess.engine.EngineError, chess.engine.EngineTerminatedError):
+            pass
+
+    # Borrow an engine for the duration of a with-block
+    @contextmanager
+    def acquire(self, timeout=None):
+        try:
+            engine = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No Stockfish engine available in the pool")
+
+        try:
+            yield engine
+        except chess.engine.EngineTerminatedError:
+            # Engine crashed mid-search: replace it so the pool stays warm
+            print("⚠ Stockfish process died, respawning...")
+            self._retire(engine)
+            engine = None  # Never hand the dead one out again
+            try:
+                engine = self._spawn()
+            except Exception as e:  # Binary gone, engine failing at startup, ...
+                with self._lock:
+                    self.size -= 1
+                print(f"❌ Could not respawn Stockfish ({e}), pool down to {self.size} engines")
+            raise
+        finally:
+            if engine is not None:
+                self._idle.put(engine)
+
+    def close(self):
+        with self._lock:
+            engines = list(self._engines)
+            self._engines.clear()
+
+        for engine in engines:
+            try:
+                engine.quit()
+            except (chess.engine.EngineError, chess.engine.EngineTerminatedError):
+                pass
+
+
+########################################################################################
+
+
+class _Ticket:
+    def __init__(self, client, order):
+        self.client = client
+        self.order = order
+        self.granted = False
+        self.preempted = False
+
+
+class FairEnginePool:
+    """Shares one bounded EnginePool between several tables, round robin.
+
+    Each table borrows through its own client(). When every engine is busy, the next free one
+    goes to the waiting table that was served longest ago, so a table never waits behind more
+    than one search of each other table. Background clients (pondering) only get an engine
+    when no table is waiting for an AI move, and are asked to stop (on_preempt) when one is.
+    All clients search as one pinned game (EngineClient.game), so engines keep their hash."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._cond = threading.Condition()
+        self._free = pool.size
+        self._waiting = []   # Tickets not granted yet
+        self._holding = []   # Tickets holding an engine
+        self._order = itertools.count()
+        self._last_served = {}  # table name -> order of its last grant
+        self.waits = defaultdict(list)  # table name -> ms waited for an engine
+        self.preemptions = 0
+
+    def client(self, name, background=False, registry=None):
+        return EngineClient(self, name, background, registry)
+
+    # With the lock held: hand free engines to waiting tickets, foreground and least recently served first
+    def _dispatch(self):
+        while self._free and self._waiting:
+            ticket = min(self._waiting, key=lambda t: (t.client.background,
+                                                       self._last_served.get(t.client.name, -1), t.order))
+            self._waiting.remove(ticket)
+            self._holding.append(ticket)
+            self._free -= 1
+            ticket.granted = True
+            self._last_served[ticket.client.name] = next(self._order)
+            self._cond.notify_all()
+
+        waiting_moves = sum(not t.client.background for t in self._waiting)
+        for ticket in self._holding:
+            if waiting_moves <= 0:
+                break
+            if ticket.client.background and not ticket.preempted and ticket.client.on_preempt:
+                ticket.preempted = True
+                self.preemptions += 1
+                ticket.client.on_preempt()  # Must only signal: the holder releases its engine itself
+                waiting_moves -= 1
+
+    @contextmanager
+    def acquire(self, client, timeout=None):
+        started = time.perf_counter()
+        ticket = _Ticket(client, next(self._order))
+        with self._cond:
+            self._waiting.append(ticket)
+            self._dispatch()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not ticket.granted:
+                if client.cancelled and client.cancelled():
+                    self._waiting.remove(ticket)
+                    raise TimeoutError("Engine request cancelled")
+                if deadline is not None and time.monotonic() >= deadline:
+                    self._waiting.remove(ticket)
+                    raise TimeoutError("No Stockfish engine available in the pool")
+                self._cond.wait(0.05)  # Wakes on every grant; the slice bounds how long a cancel goes unseen
+        waited = (time.perf_counter() - started) * 1000
+        self.waits[client.name].append(waited)
+        if client.registry:
+            client.registry.observe("engine_wait", waited)
+
+        try:
+            with self.pool.acquire() as engine:  # One engine per granted ticket, so this never waits
+                yield engine
+        finally:
+            with self._cond:
+                self._holding.remove(ticket)
+                # The pool may have lost an engine it couldn't respawn
+                self._free = min(self._free + 1, self.pool.size - len(self._holding))
+                self._dispatch()
+
+    def close(self):
+        self.pool.close()
+
+    def format_stats(self):
+        parts = [f"{name} {len(w)}x p50 {statistics.median(w):.0f}/max {max(w):.0f} ms"
+                 for name, w in sorted(self.waits.items()) if w]
+        return f"♟ Engine waits: {', '.join(parts) or 'none'} ({self.preemptions} ponder preemptions)"
+
+
+class EngineClient:
+    """One table's handle on a FairEnginePool; usable wherever an EnginePool is (acquire())."""
+
+    def __init__(self, pool, name, background=False, registry=None):
+        self.pool = pool
+        self.name = name
+        self.background = background
+        self.registry = registry  # Metrics that get an engine_wait sample per borrow
+        self.on_preempt = None    # Called when a table waits for a move while this client holds an engine
+        self.cancelled = None     # Returns True to give up waiting for an engine (e.g. pondering was stopped)
+        # game= of every search: engines switch tables all the time, and a new game id each switch would
+        # send ucinewgame and clear the hash. Positions of different games can share a hash just fine.
+        self.game = "shared"
+
+    def acquire(self, timeout=None):
+        return self.pool.acquire(self, timeout)
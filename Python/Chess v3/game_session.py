@@ -0,0 +1,584 @@
+"""One table's game: the board, the Arduino conversation and the AI's turns.
+
+A GameSession owns everything that belongs to a single table (board, turn state, tracker,
+motion gate, trolley planner, serial transport) and borrows the heavy shared parts (engine
+pool, move cache, opening book) from whoever created it, so one process can run one table
+(chess_test.py) or several (table_server.py).
+"""
+import random
+import time
+
+import chess
+
+from board_calibration import squares_for_boxes
+from board_tracker import BoardStateTracker
+from metrics import metrics as default_metrics
+from motion_planner import encode_plan, simulate
+from move_detection import match_move
+from strength import DIFFICULTY_PROFILES, ai_root_moves, analyse_candidates, choose_move, profile_signature
+
+# How long to wait for each Arduino follow-up request before giving up on the turn (seconds)
+ARDUINO_REPLY_TIMEOUTS = {
+    "ASK_HUMAN_STATUS": 5.0,
+    "ASK_AI_MOVE": 12.0,     # Arduino may show a CHECK message for 6 s first
+    "ASK_AI_STATUS": 90.0,   # Covers the physical piece movement
+}
+
+FRESH_BOARD_MESSAGES = ("START", "MOVE_CONFIRM")  # Handled only after a fresh inference (motion gating)
+
+# Piece notation mappings
+piece_short_names = {
+    "black-pawn": "p", "black-knight": "n", "black-bishop": "b", "black-rook": "r",
+    "black-queen": "q", "black-king": "k",
+    "white-pawn": "P", "white-knight": "N", "white-bishop": "B", "white-rook": "R",
+    "white-queen": "Q", "white-king": "K"
+}
+
+
+# Map one frame's YOLO boxes to squares: (board_state, detections)
+def map_detections(found, names, square_lut):
+    board_state = {}  # Detected board state (most confident box per square)
+    best_conf = {}
+    detections = []   # (x1, y1, x2, y2, piece, square, conf)
+
+    squares = squares_for_boxes(found.xyxy, square_lut)  # All boxes of the frame in one lookup
+
+    for (x1, y1, x2, y2), class_id, conf, square_index in zip(found.xyxy.astype(int).tolist(), found.cls,
+                                                              found.conf.tolist(), squares):
+        piece_label = names[class_id]
+        piece_short = piece_short_names.get(piece_label, piece_label)
+        square = chess.square_name(int(square_index)) if square_index >= 0 else None
+
+        if square and conf > best_conf.get(square, 0):
+            board_state[square] = piece_short
+            best_conf[square] = conf
+
+        detections.append((x1, y1, x2, y2, piece_short, square, conf))
+
+    return board_state, detections
+
+
+# Map one frame's per-square classes (square_classifier.Squares) the same way: (board_state, detections)
+def map_squares(found, names, square_boxes):
+    board_state = {}
+    detections = []  # One box per occupied square: the square's outline in the image
+    for square_index, (class_id, conf) in enumerate(zip(found.cls.tolist(), found.conf.tolist())):
+        if class_id < 0 or names[class_id] == "empty":
+            continue
+        piece_short = piece_short_names.get(names[class_id], names[class_id])
+        square = chess.square_name(square_index)
+        board_state[square] = piece_short
+        detections.append((*square_boxes[square_index], piece_short, square, conf))
+    return board_state, detections
+
+
+########################################################################################
+
+
+class GameSession:
+    """Game state and Arduino protocol handling for one table.
+
+    Feed it detections with update_board() and call poll() regularly: it reads the Arduino's
+    messages, answers them from the latest consensus board state and plays the AI's moves."""
+
+    def __init__(self, transport, engine_pool, move_cache, opening_book, name=None, ponderer=None,
+                 motion_planner=None, motion_gate=None, tracker=None, recorder=None, metrics=None,
+                 min_square_certainty=0.6, move_match_tolerance=0, pre_position_trolley=True, search_limits=None,
+                 journal=None):
+        self.name = name  # Prefixes console output when several tables share a process
+        self.transport = transport
+        self.engine_pool = engine_pool
+        self.move_cache = move_cache
+        self.opening_book = opening_book
+        self.ponderer = ponderer
+        self.motion_planner = motion_planner
+        self.motion_gate = motion_gate
+        self.tracker = tracker or BoardStateTracker()
+        self.recorder = recorder
+        self.metrics = metrics or default_metrics
+        self.min_square_certainty = min_square_certainty  # Squares below this are reported
+        self.move_match_tolerance = move_match_tolerance  # Squares the best legal move may differ
+        self.pre_position_trolley = pre_position_trolley
+        self.search_limits = search_limits  # engine_config.SearchLimits; None uses the profiles' own limits
+        self.journal = journal  # journal.GameJournal: moves and game events, to resume after a restart
+
+        self.board = chess.Board()  # tracks all moves properly
+        self.initial_fen = self.board.fen()  # Store correct default FEN
+        self.previous_fen = self.initial_fen  # Set previous FEN to the starting position
+        self.game_started = False
+        self.ready = False  # READY sent: resent whenever the Arduino boots again
+        self.difficulty = None  # "easy" or "hard"
+        # Bumped on every START_OK (numbering on from the journal's games); own engines start a new game when it changes
+        self.game_number = journal.last_game_number() if journal else 0
+        self.pending_request = None  # (expected Arduino request, deadline) while a turn is in progress
+        self.deferred_message = None  # START/MOVE_CONFIRM waiting for a fresh inference
+
+        self.board_state, self.certainty = {}, {}  # Latest consensus of the tracker
+        self.board_seen_at = 0.0  # Capture time of the last inferred frame
+        self.fresh_frames = None  # Frames in the tracker since the first fresh start after a deferral
+
+        # Game the journal says was in progress: resumed once the camera shows its position
+        self.resumable = journal.unfinished_game() if journal else None
+        if self.resumable:
+            self.log(f"📒 Unfinished game {self.resumable.number} in the journal "
+                     f"({self.resumable.board.fullmove_number - 1} moves), resuming when the board matches it.")
+
+    def log(self, text):
+        for line in str(text).splitlines() or [""]:
+            print(f"[{self.name}] {line}" if self.name else line)
+
+    # Board and turn state back to a fresh game (keeps detection running)
+    def reset(self):
+        self.pending_request = None
+        if self.ponderer:
+            self.ponderer.stop()
+        if self.journal and self.game_started:
+            self.journal.end_game("*")
+        self.game_started = False
+        self.previous_fen = self.initial_fen
+        self.board.reset()
+
+    # Everything the first move needs is up: the Arduino may accept START
+    def send_ready(self):
+        self.ready = True
+        if self.transport and self.transport.is_open:
+            self.transport.send("READY")
+            self.log("📡 Sent to Arduino: READY")
+
+    def close(self):
+        if self.ponderer:
+            self.ponderer.stop()
+
+    # Feed one inferred frame of detections to the tracker
+    def update_board(self, detections, captured_at, changed=False):
+        if changed:
+            self.tracker.clear()  # Old frames show the board before the change
+            self.fresh_frames = 0
+        self.tracker.add_frame((square, piece, conf) for _, _, _, _, piece, square, conf in detections)
+        self.board_state, self.certainty = self.tracker.consensus()
+        self.board_seen_at = captured_at
+        if self.fresh_frames is not None:
+            self.fresh_frames += 1
+
+    ########################################################################################
+
+    # Game Status (Check, Checkmate, Stalemate, Draw Conditions)
+    def process_game_status(self, player1, player2):
+        board = self.board
+        game_over = False
+        message = ""
+
+        # Checkmate
+        if board.is_checkmate():
+            message = f"CHECKMATE: {player1} Wins"
+            self.log(f" 🎉 Game Status: Checkmate")
+            self.log(f" 🏆 {player1} Wins by Checkmate!")
+            game_over = True
+
+        # Stalemate
+        elif board.is_stalemate():
+            message = "STALEMATE"
+            self.log(f" 🤝 Game Status: Stalemate")
+            self.log(f" 😐 The game is drawn due to Stalemate.")
+            game_over = True
+
+        # Draw by Insufficient Material
+        elif board.is_insufficient_material():
+            message = "DRAW INSUFFICIENT MATERIAL"
+            self.log(f" 🤝 Game Status: Draw by Insufficient Material")
+            self.log(f" 😐 Neither player has enough material to checkmate.")
+            game_over = True
+
+        # Draw by Threefold Repetition
+        elif board.is_repetition(3):
+            message = "DRAW REPETITION"
+            self.log(f" 🤝 Game Status: Draw by Threefold Repetition")
+            self.log(f" 🔄 The same position has repeated three times.")
+            game_over = True
+
+        # Draw by 50-Move Rule
+        elif board.halfmove_clock >= 100:  # 50-move rule (100 half-moves = 50 full moves)
+            message = "DRAW 50 MOVE RULE"
+            self.log(f" 🤝 Game Status: Draw by 50-Move Rule")
+            self.log(f" ⏳ No captures or pawn moves in 50 moves.")
+            game_over = True
+
+        # Check (Not a game-ending event)
+        elif board.is_check():
+            message = f"{player2} is CHECK"
+            self.log(f" ⚠️ {player2} is in Check!")
+
+        # If No Special Status, Send a Default Message
+        if not message:
+            message = "GAME_CONTINUES"
+
+        # Send status to Arduino
+        if self.transport and self.transport.is_open:
+            self.transport.send(message)
+            self.log(f"📡 Sent to Arduino: {message}")
+        else:
+            self.log("❌ ERROR: Serial connection is closed. Cannot send status.")
+
+        # Reset game if it's over but keep detection running
+        if game_over:
+            if self.journal:
+                self.journal.end_game(board.result(claim_draw=True))
+            self.game_started = False  # Allow restarting
+            self.previous_fen = self.initial_fen  # Reset position
+            board.reset()  # Reset board
+            self.log("🔄 Game over. Press Start Button for a new game.")
+            return False  # Game ended
+
+        return True  # Game continues
+
+    # Convert detected board state to FEN notation
+    def board_state_to_fen(self):
+        """Update the board's FEN while preserving game state."""
+        with self.metrics.timer("board_state_to_fen"):
+            # Flag squares the tracker isn't sure about (e.g. a hand or glare over them)
+            doubtful = [f"{sq}({c:.2f})" for sq, c in sorted(self.certainty.items())
+                        if c < self.min_square_certainty]
+            if doubtful:
+                self.log(f"⚠ Low confidence squares: {' '.join(doubtful)}")
+
+            new_board = self.board.copy()  # Keep castling, en passant, turn tracking
+            new_board.clear_board()  # Remove all pieces first
+
+            for square, piece in self.board_state.items():
+                new_board.set_piece_at(chess.parse_square(square), chess.Piece.from_symbol(piece))
+
+            return new_board.fen()  # Stockfish handles castling & en passant correctly
+
+    def detect_human_move(self, old_board, new_board):
+        """Find the legal move whose resulting position matches the detected board.
+
+        Returns (move, suggestions): suggestions are the nearest legal moves when nothing matches."""
+        with self.metrics.timer("detect_human_move"):
+            move, suggestions = match_move(old_board, new_board, tolerance=self.move_match_tolerance)
+
+        if move:
+            kind = "Castling" if old_board.is_castling(move) else \
+                "En Passant" if old_board.is_en_passant(move) else \
+                "Capture" if old_board.is_capture(move) else "Normal"
+            if move.promotion:
+                self.log(f"♛ Pawn Promotion Detected! Promoting to {chess.piece_name(move.promotion).title()}.")
+            self.log(f"✅ {kind} Move Detected: {move.uci()}")
+            return move, []
+
+        if suggestions:
+            self.log(f"🤔 No legal move matches the board. Did you mean: {' '.join(m.uci() for m in suggestions)}?")
+        else:
+            self.log("❌ No valid White move detected!")
+        return None, suggestions
+
+    ########################################################################################
+
+    # Identifies the current game to the engines; a shared pool's clients pin one for all tables
+    @property
+    def game_id(self):
+        return getattr(self.engine_pool, "game", None) or (self.name, self.game_number)
+
+    def search_limit(self, profile):
+        return self.search_limits.limit(profile) if self.search_limits else profile.limit
+
+    # Start thinking about the AI's replies while the human is on the move
+    def start_pondering(self):
+        if self.ponderer and self.difficulty:
+            profile = DIFFICULTY_PROFILES[self.difficulty]
+            self.ponderer.start(self.board, self.search_limit(profile), profile.multipv, game=self.game_id)
+
+    # One bounded MultiPV search, then a move picked by the difficulty's Elo curve.
+    # Castling, en passant and underpromotion are never searched, so no retry is needed.
+    def get_ai_move(self):
+        with self.metrics.timer("get_ai_move"):
+            board = self.board
+            profile = DIFFICULTY_PROFILES[self.difficulty]
+
+            book_move = self.opening_book.move(board)
+            if book_move:
+                self.log(f"📖 Book move: {book_move.uci()}")
+                return book_move
+
+            def analyse(position, search_limit=None):
+                with self.engine_pool.acquire() as engine:
+                    return analyse_candidates(engine, position, search_limit or self.search_limit(profile),
+                                              profile.multipv, game=self.game_id)
+
+            strength = profile_signature(self.difficulty, profile, self.search_limits)
+            candidates = self.move_cache.get(board, strength)  # Openings repeat game after game
+            if candidates is None:
+                if self.ponderer:
+                    candidates = self.ponderer.reply(board, analyse)  # Instant when the human played a pondered move
+                    self.log(self.ponderer.format_stats())
+                else:
+                    candidates = analyse(board)
+                self.move_cache.put(board, strength, candidates)
+            self.log(self.move_cache.format_stats())
+
+            if not candidates:  # Engine returned no scored line: fall back to any playable move
+                return random.choice(ai_root_moves(board))
+            return choose_move(candidates, profile.elo)
+
+    ########################################################################################
+
+    # Handle one message from the Arduino using the latest detected board state
+    def handle_arduino_message(self, message):
+        board = self.board
+        self.log(f"📡 Arduino Sent: {message.raw}")  # Debugging
+
+        # ✅ Follow-up requests of a turn in progress
+        if self.pending_request and message.kind == self.pending_request[0]:
+            self.pending_request = None
+            if message.kind == "ASK_HUMAN_STATUS":
+                self.answer_human_status()
+            elif message.kind == "ASK_AI_MOVE":
+                self.answer_ai_move()
+            elif message.kind == "ASK_AI_STATUS":
+                self.answer_ai_status()
+            self.metrics.observe(f"roundtrip_{message.kind.lower()}", (time.monotonic() - message.received_at) * 1000)
+            return
+
+        if message.kind == "BOOT":
+            self.log("🔁 Arduino restarted.")
+            if self.ready:  # Its READY flag was lost with the reset
+                self.send_ready()
+
+        elif message.kind == "START":
+            detected_fen = self.board_state_to_fen()
+            self.log(f"🔎 Detected FEN: {detected_fen}")
+
+            if detected_fen == self.initial_fen:
+                self.log("✅ Board is in the correct initial position. Ready to play!")
+                self.game_started = True
+                self.game_number += 1
+                self.resumable = None  # A fresh game replaces an unfinished one
+                if self.journal:
+                    self.journal.start_game(self.game_number)
+                if self.motion_planner:
+                    self.motion_planner.reset()  # The Arduino recalibrates the trolley on START_OK
+                self.reply_to_arduino(message, "START_OK")  # ✅ Send confirmation to Arduino
+            elif self.resume_game(detected_fen):
+                self.reply_to_arduino(message, "START_OK")
+            else:
+                self.log("⚠️ Incorrect board setup! Please adjust and try again.")
+                self.reply_to_arduino(message, "START_ERROR")  # ✅ Send error message to Arduino
+
+        elif message.kind == "EASY":
+            if self.game_started:
+                self.difficulty = "easy"
+                if self.journal:
+                    self.journal.set_difficulty(self.difficulty)
+                self.log("🎯 Difficulty set to: EASY")
+                self.start_pondering()  # Human moves first
+
+        elif message.kind == "HARD":
+            if self.game_started:
+                self.difficulty = "hard"
+                if self.journal:
+                    self.journal.set_difficulty(self.difficulty)
+                self.log("🔥 Difficulty set to: HARD")
+                self.start_pondering()  # Human moves first
+
+        elif message.kind == "END":
+            self.reset()
+            self.log("🔄 Game Ended. Press Start Button for a new game.")
+
+        elif message.kind == "MOVE_CONFIRM":
+            if not self.game_started and self.resumable:  # Only Python restarted: the Arduino is mid-game
+                self.resume_game(self.board_state_to_fen())
+            if self.game_started and self.difficulty:
+                fen = self.board_state_to_fen()  # Convert detected board to FEN
+
+                if fen != self.previous_fen:  # Only proceed if board has changed
+                    self.log("🔎 New board state detected!")
+                    self.log(f"FEN: {fen}")
+
+                    previous_board = chess.Board(self.previous_fen)
+                    current_board = chess.Board(fen)
+
+                    # ✅ Match the detected board against every legal move
+                    human_move, suggestions = self.detect_human_move(previous_board, current_board)
+
+                    if human_move is None:
+                        if previous_board.is_check():
+                            # Human was in check but made invalid move
+                            legal_moves = [m.uci() for m in previous_board.legal_moves]
+                            moves_str = " ".join(legal_moves)
+                            self.log(f"⚠️ Invalid Move While In Check! Legal moves: {moves_str}")
+                            self.reply_to_arduino(message, f"MOVE_ERROR_CHECK:{moves_str}")
+                        elif suggestions:
+                            # Nearest legal moves as "did you mean" feedback
+                            self.reply_to_arduino(message, f"MOVE_ERROR:{' '.join(m.uci() for m in suggestions)}")
+                        else:
+                            self.log("❌ No valid White move detected! Please try again.")
+                            self.reply_to_arduino(message, "MOVE_ERROR")
+                    elif current_board.turn == chess.BLACK:  # White should be moving
+                        self.log("❌ Black (AI) moved out of turn! Invalid board setup.")
+                        self.reply_to_arduino(message, "MOVE_ERROR")
+                    else:
+                        self.log(f"✅ White Move Detected: {human_move.uci()}")
+                        self.reply_to_arduino(message, "MOVE_OK")
+                        board.push(human_move)  # Apply human move
+                        if self.journal:
+                            self.journal.human_move(human_move)
+
+                        # ✅ Check game status after Human Move once the Arduino asks for it
+                        self.expect_request("ASK_HUMAN_STATUS")
+                else:
+                    self.log("♟ No changes detected in board state.")
+                    self.reply_to_arduino(message, "MOVE_NO_CHANGE")
+
+        else:
+            self.log(f"⚠ Unexpected message from Arduino: {message.raw}")
+
+    # Pick up the journal's unfinished game if the pieces show its position (or the human's next move on it)
+    def resume_game(self, detected_fen):
+        game = self.resumable
+        if not game:
+            return False
+        placement = detected_fen.split()[0]
+        board = game.board.copy()
+        matches = placement == board.board_fen()
+        for move in board.legal_moves if not matches else ():
+            board.push(move)
+            matches = placement == board.board_fen()
+            board.pop()
+            if matches:
+                break
+        if not matches:
+            self.log("📒 The board doesn't show the journal's unfinished game.")
+            return False
+
+        self.resumable = None
+        self.board.reset()  # Same object: the message handlers hold it as `board`
+        for move in game.board.move_stack:
+            self.board.push(move)
+        self.previous_fen = self.board.fen()
+        self.difficulty = game.difficulty
+        self.game_number = game.number
+        self.game_started = True
+        if self.journal and game.undone_human_move:
+            self.journal.undo()  # The human confirms that move again
+        if self.motion_planner:
+            self.motion_planner.reset()
+            self.motion_planner.captured = game.ai_captures  # Captured pieces already on the stacks
+        self.log(f"♻ Resumed game {game.number} at move {self.board.fullmove_number} ({self.board.fen()})")
+        return True
+
+    # Answer a START/MOVE_CONFIRM, timing the round trip from the button press and counting the outcome
+    def reply_to_arduino(self, message, text):
+        self.transport.send(text)
+        self.metrics.count(text.partition(":")[0])
+        self.metrics.observe(f"roundtrip_{message.kind.lower()}", (time.monotonic() - message.received_at) * 1000)
+
+    # Remember which Arduino request continues the current turn, and until when to wait for it
+    def expect_request(self, kind):
+        self.pending_request = (kind, time.monotonic() + ARDUINO_REPLY_TIMEOUTS[kind])
+
+    def answer_human_status(self):
+        if not self.process_game_status("Human", "AI"):
+            return  # Skip AI move if the game ended
+
+        # ✅ AI's Turn
+        self.expect_request("ASK_AI_MOVE")
+
+    def answer_ai_move(self):
+        board = self.board
+        ai_move = self.get_ai_move()
+        if self.recorder:
+            self.recorder.record("ai_move", fen=board.fen(), move=ai_move.uci())
+        is_capture = 0 if board.is_capture(ai_move) else 1
+
+        plan = None
+        if self.motion_planner:
+            start = self.motion_planner.position
+            plan = self.motion_planner.plan_move(board, ai_move)
+            estimate = simulate(plan, start)
+            self.metrics.observe("trolley_estimate", estimate.total_s * 1000)
+            self.log(f"🛤 Trolley plan: {len(plan)} steps, ~{estimate.total_s:.1f} s")
+
+        board.push(ai_move)  # Apply AI move
+        if self.journal:
+            self.journal.ai_move(ai_move)
+        self.log(board)
+        self.log(f"🤖 AI Move (Black): {ai_move.uci()}:{is_capture}")
+
+        # Handle Pawn Promotion (Remove last character if promotion occurs)
+        move_str = ai_move.uci()
+        if len(move_str) == 5:
+            move_str = move_str[:4]
+
+        # Send AI move to Arduino, with the planned trolley path after a '|'
+        self.send_ai_move(f"{move_str}:{is_capture}|{encode_plan(plan)}" if plan else f"{move_str}:{is_capture}")
+
+        # ✅ Check game status after AI Move
+        self.expect_request("ASK_AI_STATUS")
+
+    # Send AI move to Arduino
+    def send_ai_move(self, move):
+        if self.transport and self.transport.is_open:
+            self.log(f"📡 Sending AI Move: {move}")
+            self.transport.send(move)
+        else:
+            self.log("❌ ERROR: Serial connection is closed. Cannot send AI move.")
+
+    def answer_ai_status(self):
+        game_continues = self.process_game_status("AI", "Human")
+
+        # Store board state for next turn
+        self.previous_fen = self.board.fen()
+
+        # 🧠 Think on the human's time
+        if game_continues:
+            self.start_pondering()
+            self.park_trolley()
+
+    # Park the trolley where the AI's next move most likely starts (the Arduino reads PARK between turns)
+    def park_trolley(self):
+        if self.motion_planner and self.pre_position_trolley:
+            park = self.motion_planner.plan_park(self.board)
+            if park:
+                self.transport.send(f"PARK:{encode_plan(park)}")
+
+    # A lost Arduino message must not hang the game: drop the turn instead of waiting forever
+    def check_pending_timeout(self):
+        if not self.pending_request or time.monotonic() < self.pending_request[1]:
+            return
+
+        kind = self.pending_request[0]
+        self.pending_request = None
+        self.log(f"⏱ Timed out waiting for {kind} from Arduino.")
+        self.metrics.count(f"TIMEOUT_{kind}")
+
+        if kind == "ASK_AI_STATUS":
+            self.previous_fen = self.board.fen()  # AI move was already sent, keep it
+        else:
+            self.board.pop()  # Undo the human move, the Arduino gave up on this turn
+            if self.journal:
+                self.journal.undo()
+            self.log("🔄 Turn cancelled. Please confirm your move again.")
+
+    ########################################################################################
+
+    # Read and handle Arduino messages; START/MOVE_CONFIRM wait for a burst of frames inferred after the press
+    def poll(self):
+        if not self.transport:
+            return
+
+        # The forced burst (or a rerun of it) is in the tracker, and was seen after the press
+        if (self.deferred_message and self.fresh_frames is not None
+                and self.fresh_frames >= self.motion_gate.burst_frames
+                and self.board_seen_at >= self.deferred_message.received_at):
+            message, self.deferred_message = self.deferred_message, None
+            self.handle_arduino_message(message)
+
+        arduino_message = self.transport.get()
+        if arduino_message:
+            if self.motion_gate and arduino_message.kind in FRESH_BOARD_MESSAGES:
+                self.motion_gate.request_inference()
+                self.deferred_message = arduino_message
+                self.fresh_frames = None  # Counting starts with the forced frame, which clears the tracker
+            else:
+                self.handle_arduino_message(arduino_message)
+
+        self.check_pending_timeout()
@@ -0,0 +1,243 @@
+"""Append-only game journal, so a restarted table picks up the game where it was.
+
+One short line per event:
+    G <game> <unix time>   game started (START_OK)
+    D <difficulty>         EASY / HARD pressed
+    H <uci> / A <uci>      human / AI move
+    U                      last human move undone (the Arduino gave up on the turn)
+    R <result>             game over ("1-0", "0-1", "1/2-1/2", or "*" when abandoned)
+Writes only go to the file buffer; a background thread flushes and fsyncs every
+sync_interval seconds, so the game loop never waits on the disk and a power cut loses at
+most that much. Finished games are moved out to a PGN file in the background, which keeps
+the journal down to the game in progress and resuming instant. Game numbers (the PGN Round)
+carry on from the highest one in either file.
+"""
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+import chess
+import chess.pgn
+
+JOURNAL_FILE = "game_journal.log"
+PGN_FILE = "games.pgn"
+ROUND_HEADER = re.compile(r'\[Round "(\d+)"\]')
+
+# A game the journal has no result for; board is at the last position with White (the human) to move
+UnfinishedGame = namedtuple("UnfinishedGame", ["number", "started", "difficulty", "board", "ai_captures",
+                                               "undone_human_move"])
+
+
+# Journal lines grouped per game, each group starting with its "G" line
+def split_games(lines):
+    groups = []
+    for line in lines:
+        if line.startswith("G ") or not groups:
+            groups.append([])
+        groups[-1].append(line)
+    return groups
+
+
+def read_games(lines):
+    """Parse journal lines into games: dicts with number, started, difficulty, moves [(side, uci)], result."""
+    games = []
+    for line in lines:
+        kind, *fields = line.split()
+        if kind == "G":
+            games.append({"number": int(fields[0]), "started": float(fields[1]), "difficulty": None,
+                          "moves": [], "result": None})
+        elif not games or games[-1]["result"] is not None:
+            continue  # Events outside a game (shouldn't happen): skip
+        elif kind == "D":
+            games[-1]["difficulty"] = fields[0]
+        elif kind in ("H", "A"):
+            games[-1]["moves"].append((kind, fields[0]))
+        elif kind == "U" and games[-1]["moves"]:
+            games[-1]["moves"].pop()
+        elif kind == "R":
+            games[-1]["result"] = fields[0]
+    return games
+
+
+def game_to_pgn(game, site=None):
+    pgn = chess.pgn.Game()
+    pgn.headers["Event"] = "Chess robot"
+    pgn.headers["Site"] = site or "?"
+    pgn.headers["Date"] = time.strftime("%Y.%m.%d", time.localtime(game["started"]))
+    pgn.headers["Round"] = str(game["number"])
+    pgn.headers["White"] = "Human"
+    pgn.headers["Black"] = f"AI ({game['difficulty']})" if game["difficulty"] else "AI"
+    pgn.headers["Result"] = game["result"]
+    node = pgn
+    for _, uci in game["moves"]:
+        node = node.add_variation(chess.Move.from_uci(uci))
+    return str(pgn) + "\n\n"
+
+
+class GameJournal:
+    def __init__(self, path=JOURNAL_FILE, pgn_path=PGN_FILE, sync_interval=0.2, site=None):
+        self.path = path
+        self.pgn_path = pgn_path
+        self.sync_interval = sync_interval
+        self.site = site  # PGN Site header (the table's name)
+        self.syncs = 0
+        self.rotated = 0
+
+        self._lines = self._load()
+        games = read_games(self._lines)
+        self.in_game = bool(games) and games[-1]["result"] is None
+        self._file = open(path, "a", encoding="utf-8")
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._rotate_due = any(game["result"] for game in games)  # Finished games left by a crash
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+        self._thread.start()
+
+    # Complete lines of the journal; a line torn by a crash mid-write is cut off the file
+    def _load(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "rb") as f:
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        if len(complete) < len(data):
+            with open(self.path, "r+b") as f:
+                f.truncate(len(complete))
+        return complete.decode("utf-8", errors="replace").splitlines()
+
+    def unfinished_game(self):
+        """The game in progress when the journal was last written, or None."""
+        games = read_games(self._lines)
+        if not games or games[-1]["result"] is not None:
+            return None
+        game = games[-1]
+        board = chess.Board()
+        ai_captures = 0
+        for side, uci in game["moves"]:
+            move = chess.Move.from_uci(uci)
+            if move not in board.legal_moves:
+                break  # Shouldn't happen; keep what is consistent
+            if side == "A" and board.is_capture(move):
+                ai_captures += 1
+            board.push(move)
+        undone = board.turn == chess.BLACK  # Human move the AI never answered: the human confirms it again
+        if undone:
+            board.pop()
+        return UnfinishedGame(game["number"], game["started"], game["difficulty"], board, ai_captures, undone)
+
+    def last_game_number(self):
+        """Highest game number in the journal or the PGN file (0 for none), to number on after a restart."""
+        numbers = [game["number"] for game in read_games(self._lines)]  # As loaded: rotation can't hide a game
+        if os.path.exists(self.pgn_path):
+            with open(self.pgn_path, encoding="utf-8", errors="replace") as f:
+                numbers += [int(match.group(1)) for match in map(ROUND_HEADER.match, f) if match]
+        return max(numbers, default=0)
+
+    ####################################################################################
+    # Called from the game loop: a buffered write, no disk wait
+
+    def record(self, kind, *fields):
+        with self._lock:
+            self._file.write(" ".join((kind, *map(str, fields))) + "\n")
+            self._dirty = True
+
+    def start_game(self, number):
+        if self.in_game:
+            self.record("R", "*")  # The previous game was never finished
+        self.in_game = True
+        self.record("G", number, round(time.time()))
+
+    def set_difficulty(self, difficulty):
+        self.record("D", difficulty)
+
+    def human_move(self, move):
+        self.record("H", move.uci())
+
+    def ai_move(self, move):
+        self.record("A", move.uci())
+
+    def undo(self):
+        self.record("U")
+
+    def end_game(self, result):
+        if not self.in_game:
+            return
+        self.in_game = False
+        self.record("R", result)
+        self._rotate_due = True
+        self._wake.set()  # Sync the result right away and rotate the game out
+
+    ####################################################################################
+    # Background thread: batched fsync, and finished games out to PGN
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self.sync_interval)
+            self._wake.clear()
+            self.sync()
+            if self._rotate_due:
+                self._rotate_due = False
+                self.rotate()
+
+    def sync(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self._file.flush()
+            self._dirty = False
+            fd = self._file.fileno()
+        os.fsync(fd)  # Outside the lock: the game loop keeps appending meanwhile
+        self.syncs += 1
+
+    def rotate(self):
+        """Append finished games to the PGN file and drop them from the journal."""
+        with self._lock:
+            self._file.flush()
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        finished, moved = [], set()
+        for group in split_games(lines):
+            games = read_games(group)
+            if games and games[0]["result"] is not None:
+                finished.append(games[0])
+                moved.add(group[0])  # Its "G" line identifies the game
+        if not finished:
+            return
+
+        # PGN first: a crash between the two steps repeats a game in the PGN rather than losing it
+        with open(self.pgn_path, "a", encoding="utf-8") as f:
+            f.write("".join(game_to_pgn(game, self.site) for game in finished))
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._lock:
+            self._file.flush()
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.read().splitlines()  # Including anything appended since the first read
+            keep = [line for group in split_games(lines) if group[0] not in moved for line in group]
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write("".join(line + "\n" for line in keep))
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp, self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._dirty = False
+        self.rotated += len(finished)
+
+    def close(self):
+        self._running = False
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.sync()
+        if self._rotate_due:
+            self.rotate()
+        self._file.close()
+
+    def format_stats(self):
+        return f"📒 Journal: {self.syncs} batched fsyncs, {self.rotated} finished games moved to {self.pgn_path}"
@@ -0,0 +1,212 @@
+import functools
+import json
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from control import ExclusiveBindMixin
+
+# Histogram bucket upper bounds in milliseconds (Prometheus "le" labels)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram plus a window of recent samples for percentiles."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS, window=1000):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, ms):
+        self.count += 1
+        self.sum += ms
+        self.recent.append(ms)
+        for i, bound in enumerate(self.buckets):
+            if ms <= bound:
+                self.bucket_counts[i] += 1
+
+    def percentile(self, q):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count, 2) if self.count else 0.0,
+            "p50_ms": round(statistics.median(self.recent), 2) if self.recent else 0.0,
+            "p99_ms": round(self.percentile(0.99), 2),
+        }
+
+
+class Metrics:
+    """Per-stage latency histograms and event counters for one table.
+
+    labels (e.g. {"table": "table-3"}) are attached to every exported series, so several
+    tables can be scraped into the same dashboard."""
+
+    def __init__(self, labels=None, window=1000):
+        self.labels = dict(labels or {})
+        self._histograms = defaultdict(lambda: Histogram(window=window))  # window=None keeps every sample
+        self._counters = defaultdict(int)
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def observe(self, stage, ms):
+        with self._lock:
+            self._histograms[stage].observe(ms)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000)
+
+    def timed(self, stage):
+        """Decorator: time every call of the function as stage."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    ########################################################################################
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "time": round(time.time(), 3),
+                "uptime_s": round(time.time() - self.started_at, 1),
+                **self.labels,
+                "stages": {stage: h.summary() for stage, h in sorted(self._histograms.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def prometheus_text(self, prefix="chess"):
+        """Prometheus text exposition format (version 0.0.4)."""
+        return prometheus_text([self], prefix)
+
+    def _series(self, prefix):
+        """(histogram lines, counter lines) of this registry, without the TYPE headers."""
+        def label_str(extra=None):
+            labels = {**self.labels, **(extra or {})}
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+        histograms, counters = [], []
+        with self._lock:
+            for stage, h in sorted(self._histograms.items()):
+                for bound, count in zip(h.buckets, h.bucket_counts):
+                    histograms.append(f"{prefix}_stage_latency_ms_bucket{label_str({'stage': stage, 'le': bound})} {count}")
+                histograms.append(f"{prefix}_stage_latency_ms_bucket{label_str({'stage': stage, 'le': '+Inf'})} {h.count}")
+                histograms.append(f"{prefix}_stage_latency_ms_sum{label_str({'stage': stage})} {h.sum:.3f}")
+                histograms.append(f"{prefix}_stage_latency_ms_count{label_str({'stage': stage})} {h.count}")
+            for name, value in sorted(self._counters.items()):
+                counters.append(f"{prefix}_events_total{label_str({'event': name})} {value}")
+        return histograms, counters
+
+    def format_summary(self):
+        s = self.snapshot()
+        parts = [f"{stage} p50 {h['p50_ms']:.1f}/p99 {h['p99_ms']:.1f} ms" for stage, h in s["stages"].items()]
+        counters = ", ".join(f"{name}={value}" for name, value in s["counters"].items())
+        return "📊 " + " | ".join(parts) + (f"\n📊 Events: {counters}" if counters else "")
+
+
+########################################################################################
+
+
+def prometheus_text(registries, prefix="chess"):
+    """One exposition of several registries (e.g. one per table), told apart by their labels."""
+    series = [registry._series(prefix) for registry in registries]
+    lines = [f"# TYPE {prefix}_stage_latency_ms histogram"]
+    for histograms, _ in series:
+        lines += histograms
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    for _, counters in series:
+        lines += counters
+    return "\n".join(lines) + "\n"
+
+
+class JsonlExporter(threading.Thread):
+    """Appends a metrics snapshot to a JSONL file every interval seconds (and once on stop).
+
+    metrics may be one registry or a list of them (one snapshot line each)."""
+
+    def __init__(self, metrics, path, interval=10.0):
+        super().__init__(name="metrics-jsonl", daemon=True)
+        self.registries = metrics if isinstance(metrics, (list, tuple)) else [metrics]
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.write()
+
+    def write(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for registry in self.registries:
+                f.write(json.dumps(registry.snapshot()) + "\n")
+
+    def stop(self):
+        self._stop_event.set()
+        self.join(timeout=1)
+        self.write()
+
+
+# HTTPServer sets allow_reuse_address, which on Windows lets a second table share the port
+class _HTTPServer(ExclusiveBindMixin, ThreadingHTTPServer):
+    pass
+
+
+class MetricsServer:
+    """Serves the Prometheus text of one registry (or a list) at http://host:port/metrics from a background thread."""
+
+    def __init__(self, metrics, port=9108, host="127.0.0.1"):
+        registries = metrics if isinstance(metrics, (list, tuple)) else [metrics]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = prometheus_text(registries).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the console
+
+        self._server = _HTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# Shared registry for the process
+metrics = Metrics()
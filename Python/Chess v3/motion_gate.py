@@ -0,0 +1,94 @@
+import threading
+
+import cv2
+
+
+class MotionGate:
+    """Decides which frames YOLO needs to see.
+
+    Inference is skipped while the board ROI is unchanged, paused while something (a hand)
+    is moving over it, and run for a short burst once the motion has settled and the board
+    looks different from the last inferred frame (or a burst was cut short by motion, so the
+    tracker never got all its frames). request_inference() forces the next frame
+    through and starts a burst from it, e.g. when the Arduino sends START or MOVE_CONFIRM."""
+
+    def __init__(self, roi, pixel_threshold=18, motion_fraction=0.005, settle_frames=4,
+                 burst_frames=3, scale=0.25):
+        self.roi = roi  # (x1, y1, x2, y2) board area in the frame
+        self.pixel_threshold = pixel_threshold  # Grey-level change that counts as "changed"
+        self.motion_fraction = motion_fraction  # Share of changed pixels that counts as motion
+        self.settle_frames = settle_frames      # Still frames needed before inferring again
+        self.burst_frames = burst_frames        # Frames inferred per settle (feeds the tracker)
+        self.scale = scale
+
+        self.changed = False    # True on the first frame of a burst caused by a board change, or a forced frame
+        self.skipped = 0
+        self.inferred = 0
+        self._previous = None   # Last frame, for frame-to-frame motion
+        self._reference = None  # Last inferred frame, for "board differs from what we know"
+        self._still = 0
+        self._burst_left = 0
+        self._rerun = False  # A burst was cut short: run it again once the board is still
+        self._force = threading.Event()
+
+    def request_inference(self):
+        self._force.set()
+
+    # Small blurred grey crop of the board: cheap to diff every frame
+    def _thumbnail(self, frame):
+        x1, y1, x2, y2 = self.roi
+        crop = frame[y1:y2, x1:x2]
+        small = cv2.resize(crop, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def _differs(self, a, b):
+        diff = cv2.absdiff(a, b)
+        changed = cv2.countNonZero(cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)[1])
+        return changed > self.motion_fraction * diff.size
+
+    def update(self, frame):
+        """Return True if this frame should go through YOLO."""
+        thumb = self._thumbnail(frame)
+        previous, self._previous = self._previous, thumb
+        self.changed = False
+
+        if self._force.is_set():
+            self._force.clear()
+            self.changed = True  # The tracker starts over: pre-press frames mustn't outvote this burst
+            self._burst_left = self.burst_frames - 1
+            return self._infer(thumb)
+
+        if previous is None:  # First frame: nothing known yet
+            self.changed = True
+            self._burst_left = self.burst_frames - 1
+            return self._infer(thumb)
+
+        if self._differs(previous, thumb):  # Something is moving over the board
+            self._still = 0
+            if self._burst_left > 0:
+                self._rerun = True
+            self._burst_left = 0
+            return self._skip()
+
+        self._still += 1
+        if self._burst_left > 0:
+            self._burst_left -= 1
+            return self._infer(thumb)
+
+        if self._still >= self.settle_frames and (self._rerun or self._differs(self._reference, thumb)):
+            self._rerun = False
+            self.changed = True
+            self._burst_left = self.burst_frames - 1
+            return self._infer(thumb)
+
+        return self._skip()
+
+    def _infer(self, thumb):
+        self._reference = thumb
+        self.inferred += 1
+        return True
+
+    def _skip(self):
+        self.skipped += 1
+        return False
@@ -0,0 +1,253 @@
+"""Trolley motion planning for AI moves, plus a kinematic simulator of the CoreXY trolley.
+
+Coordinates are in squares, as on the Arduino: X is the file (a = 1 .. h = 8), Y the rank,
+square centres are whole numbers and the grid lines between squares are at .5. Captured
+pieces go to two stacks beside the a-file at X = 0 / -0.5, filled downwards from Y = 9.
+
+A plan is a list of ops:
+    ("T", x, y)  travel there with the magnet off (fast)
+    ("C", x, y)  carry a piece there with the magnet on (slow)
+    ("G",)       grab: magnet on          ("R",)  release: magnet off
+    ("W", ms)    wait
+and goes over serial as e.g. "T10,14;G;C9,13;R" (coordinates in half squares).
+"""
+import math
+import statistics
+from collections import namedtuple
+
+import chess
+
+from strength import ai_root_moves
+
+# Mechanics, as in Arduino/arduino_code_with_serial/global.h
+SQUARE_SIZE = 275      # Motor steps per square
+SPEED_FAST_US = 1000   # Half step period travelling empty (µs)
+SPEED_SLOW_US = 3000   # ... and carrying a piece
+MAGNET_WAIT_S = 0.6    # electromagnet() settle time, on and off
+START_POSITION = (5, 7)  # Trolley after calibration (e7)
+
+MIN_CLEARANCE = 0.5    # Carried piece vs other pieces' centres, in squares (grid-line routing)
+
+MotionEstimate = namedtuple("MotionEstimate", ["total_s", "travel_s", "carry_s", "wait_s", "end"])
+
+
+def square_xy(square):
+    return chess.square_file(square) + 1, chess.square_rank(square) + 1
+
+
+def stack_slot(captured_count):
+    """Where the n-th captured piece is dropped (same layout as the Arduino's piece_movement)."""
+    return (0.0 if captured_count % 2 == 0 else -0.5), 9 - (captured_count // 2) * 0.5
+
+
+########################################################################################
+# Kinematic simulator
+
+
+def segment_time(dx, dy, period_us):
+    """CoreXY: motor A turns (dx - dy), motor B (dx + dy); both step at most once per period pair.
+
+    So any move, straight, diagonal or combined, takes max(|dx - dy|, |dx + dy|) = |dx| + |dy|
+    squares' worth of steps: the time is the L1 distance."""
+    steps = max(abs(dx - dy), abs(dx + dy)) * SQUARE_SIZE
+    return steps * 2 * period_us / 1e6
+
+
+def simulate(plan, start):
+    """Estimated mechanical time of a plan starting from trolley position start."""
+    x, y = start
+    travel = carry = wait = 0.0
+    for op in plan:
+        kind = op[0]
+        if kind == "T":
+            travel += segment_time(op[1] - x, op[2] - y, SPEED_FAST_US)
+            x, y = op[1], op[2]
+        elif kind == "C":
+            carry += segment_time(op[1] - x, op[2] - y, SPEED_SLOW_US)
+            x, y = op[1], op[2]
+        elif kind in ("G", "R"):
+            wait += MAGNET_WAIT_S
+        elif kind == "W":
+            wait += op[1] / 1000
+    return MotionEstimate(travel + carry + wait, travel, carry, wait, (x, y))
+
+
+def encode_plan(plan):
+    parts = []
+    for op in plan:
+        if op[0] in ("T", "C"):
+            parts.append(f"{op[0]}{round(op[1] * 2)},{round(op[2] * 2)}")
+        elif op[0] == "W":
+            parts.append(f"W{int(op[1])}")
+        else:
+            parts.append(op[0])
+    return ";".join(parts)
+
+
+########################################################################################
+# Firmware reference (piece_movement as it was), for benchmarks
+
+
+def legacy_plan(departure, arrival, capture, trolley, captured_count):
+    """The moves and pauses the Arduino's piece_movement() makes, as a plan."""
+    (dx0, dy0), (ax, ay) = departure, arrival
+    x, y = trolley
+    plan = []
+
+    def axis(kind, tx, ty):  # One motor() call per axis
+        nonlocal x, y
+        if tx != x:
+            plan.append((kind, tx, y))
+            x = tx
+        if ty != y:
+            plan.append((kind, x, ty))
+            y = ty
+
+    if capture:
+        axis("T", ax, ay)
+        plan.append(("G",))
+        extra = {8: 3.5, 7: 2.5, 6: 1.5}.get(ay, 0.5)
+        axis("C", ax - 0.5, y)
+        plan.append(("W", 500))
+        axis("C", x, ay - extra)
+        plan.append(("W", 500))
+        sx, sy = stack_slot(captured_count)
+        axis("C", sx, y)
+        plan.append(("W", 500))
+        axis("C", x, sy)
+        plan.append(("W", 500))
+        plan += [("R",), ("W", 200)]
+        axis("T", x, ay)  # Back to the arrival square before heading for the departure one
+        plan.append(("W", 500))
+        axis("T", ax, y)
+        plan.append(("W", 500))
+
+    axis("T", dx0, dy0)
+    plan += [("G",), ("W", 500)]
+    if {abs(ax - dx0), abs(ay - dy0)} == {1, 2}:  # Knight: half step, long side, half step
+        if abs(ay - dy0) == 2:
+            axis("C", x + (ax - dx0) * 0.5, y)
+            axis("C", x, ay)
+            axis("C", ax, y)
+        else:
+            axis("C", x, y + (ay - dy0) * 0.5)
+            axis("C", ax, y)
+            axis("C", x, ay)
+    else:
+        plan.append(("C", ax, ay))  # Straight or diagonal, one motor() call
+    plan += [("R",), ("W", 500)]
+    return plan
+
+
+########################################################################################
+# Planner
+
+
+def _point_segment_distance(p, a, b):
+    (px, py), (ax, ay), (bx, by) = p, a, b
+    vx, vy = bx - ax, by - ay
+    length2 = vx * vx + vy * vy
+    t = 0.0 if length2 == 0 else max(0.0, min(1.0, ((px - ax) * vx + (py - ay) * vy) / length2))
+    return math.hypot(px - (ax + t * vx), py - (ay + t * vy))
+
+
+def clearance(path, obstacles):
+    """Smallest distance from a polyline to any obstacle centre (inf without obstacles)."""
+    return min((_point_segment_distance(p, a, b) for a, b in zip(path, path[1:]) for p in obstacles),
+               default=math.inf)
+
+
+def _carry_routes(departure, arrival):
+    """Candidate carry paths, all of minimum (L1) length: straight, then grid-line detours."""
+    (x, y), (ax, ay) = departure, arrival
+    routes = [[departure, arrival]]
+    dx, dy = ax - x, ay - y
+    if {abs(dx), abs(dy)} == {1, 2}:  # Knight: along the grid line between the two files (or ranks)
+        sx, sy = math.copysign(0.5, dx), math.copysign(0.5, dy)
+        if abs(dy) == 2:
+            routes.append([departure, (x + sx, y), (x + sx, ay), arrival])
+            routes.append([departure, (x, y + sy), (ax, y + sy), arrival])
+            routes.append([departure, (x, ay - sy), (ax, ay - sy), arrival])
+        else:
+            routes.append([departure, (x, y + sy), (ax, y + sy), arrival])
+            routes.append([departure, (x + sx, y), (x + sx, ay), arrival])
+            routes.append([departure, (ax - sx, y), (ax - sx, ay), arrival])
+    return routes
+
+
+def best_route(routes, obstacles):
+    """Shortest route keeping MIN_CLEARANCE, preferring more clearance, then fewer segments."""
+    def length(route):
+        return sum(abs(b[0] - a[0]) + abs(b[1] - a[1]) for a, b in zip(route, route[1:]))
+
+    scored = [(clearance(route, obstacles), route) for route in routes]
+    safe = [(c, r) for c, r in scored if c >= MIN_CLEARANCE] or [max(scored, key=lambda s: s[0])]
+    return min(safe, key=lambda s: (length(s[1]), -min(s[0], 1.0), len(s[1])))[1]
+
+
+def capture_route(arrival, captured_count):
+    """Carry a captured piece to its stack slot along grid lines, reaching the stack from below."""
+    ax, ay = arrival
+    sx, sy = stack_slot(captured_count)
+    # Grid line to cross towards the stacks: below both stacks' lowest piece, never through a square row
+    row = min(ay - 0.5, math.floor(sy - 1) + 0.5)
+    route = [arrival, (ax - 0.5, ay - 0.5)]
+    if row != ay - 0.5:
+        route.append((ax - 0.5, row))
+    route += [(sx, row), (sx, sy)]
+    return route
+
+
+class MotionPlanner:
+    """Plans the trolley's moves for AI moves, tracking its position and the capture stacks."""
+
+    def __init__(self):
+        self.reset()
+
+    # New game: the Arduino recalibrates to START_POSITION and empties the stacks
+    def reset(self):
+        self.position = START_POSITION  # Best guess only: the Arduino may skip a PARK (it parks only in a game)
+        self.captured = 0
+
+    def plan_move(self, board, move):
+        """Plan for an AI move on board (before the move is pushed)."""
+        departure, arrival = square_xy(move.from_square), square_xy(move.to_square)
+        occupied = {square_xy(sq) for sq in chess.SquareSet(board.occupied)}
+        plan = []
+
+        if board.is_capture(move):
+            plan.append(("T", *arrival))
+            plan.append(("G",))
+            plan += [("C", *point) for point in capture_route(arrival, self.captured)[1:]]
+            plan.append(("R",))
+            self.captured += 1
+            occupied.discard(arrival)
+
+        plan.append(("T", *departure))  # Even if we think it's there already: a skipped PARK leaves it elsewhere
+        plan.append(("G",))
+        obstacles = occupied - {departure, arrival}
+        plan += [("C", *point) for point in best_route(_carry_routes(departure, arrival), obstacles)[1:]]
+        plan.append(("R",))
+
+        self.position = arrival
+        return plan
+
+    def plan_park(self, board):
+        """While the human thinks: move to where the AI's next move most likely starts.
+
+        Takes the median (the point of least expected L1 travel) of the first waypoint of every
+        move the AI could play if it were its turn now: the captured piece or the moving piece."""
+        if board.is_check() or board.is_game_over():
+            return []
+        position = board.copy(stack=False)
+        position.push(chess.Move.null())
+        targets = [square_xy(m.to_square if position.is_capture(m) else m.from_square)
+                   for m in ai_root_moves(position)]
+        if not targets:
+            return []
+        target = (round(statistics.median_low(x for x, _ in targets)),
+                  round(statistics.median_low(y for _, y in targets)))
+        if target == self.position:
+            return []
+        self.position = target
+        return [("T", *target)]
@@ -0,0 +1,164 @@
+import json
+import os
+import random
+import sqlite3
+import statistics
+import threading
+import time
+from collections import OrderedDict
+
+import chess
+import chess.polyglot
+
+from strength import ai_root_moves
+
+CACHE_FILE = "ai_move_cache.sqlite"
+
+
+class MoveCache:
+    """AI search results keyed by (Zobrist hash, strength), with LRU eviction and a SQLite store.
+
+    Stores the scored MultiPV candidates rather than the final move, so a repeated position
+    skips the engine but the difficulty's Elo curve still picks (and varies) the move. The
+    strength key is strength.profile_signature(): changing a profile's search stops serving
+    what the old one found. The in-memory LRU is loaded from disk at startup; puts are written
+    to SQLite by a background thread every commit_interval seconds, off the AI move's path."""
+
+    def __init__(self, path=CACHE_FILE, capacity=50000, commit_interval=1.0):
+        self.capacity = capacity
+        self.commit_interval = commit_interval
+        self._entries = OrderedDict()  # (zobrist, strength) -> [(move, centipawns)]
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writes = []  # ("put", row) / ("delete", key) in order, for the writer thread
+        self._wake = threading.Event()
+        self._writer = None
+
+        self.hits = 0
+        self.misses = 0
+        self.lookup_latencies = []  # µs per get()
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS moves (zobrist INTEGER, difficulty TEXT, "
+                             "candidates TEXT, used REAL, PRIMARY KEY (zobrist, difficulty))")
+            self._load()
+            self._writer = threading.Thread(target=self._run, name="move-cache", daemon=True)
+            self._writer.start()
+
+    def _load(self):
+        rows = self._db.execute("SELECT zobrist, difficulty, candidates FROM moves ORDER BY used DESC LIMIT ?",
+                                (self.capacity,)).fetchall()
+        for zobrist, difficulty, candidates in reversed(rows):  # Most recently used ends up last
+            self._entries[(zobrist, difficulty)] = [(chess.Move.from_uci(uci), cp) for uci, cp in json.loads(candidates)]
+        # Drop whatever no longer fits, so the file does not grow without bound
+        self._db.execute("DELETE FROM moves WHERE rowid NOT IN "
+                         "(SELECT rowid FROM moves ORDER BY used DESC LIMIT ?)", (self.capacity,))
+        self._db.commit()
+
+    @staticmethod
+    def _key(board, strength):
+        # SQLite integers are signed 64-bit
+        return chess.polyglot.zobrist_hash(board) - (1 << 63), strength
+
+    def get(self, board, strength):
+        start = time.perf_counter()
+        key = self._key(board, strength)
+        with self._lock:
+            candidates = self._entries.get(key)
+            if candidates is not None:
+                self._entries.move_to_end(key)
+        self.lookup_latencies.append((time.perf_counter() - start) * 1e6)
+
+        if candidates is None:
+            self.misses += 1
+            return None
+        # A hash collision or stale entry must never produce an illegal move
+        if any(not board.is_legal(move) for move, _ in candidates):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return candidates
+
+    def put(self, board, strength, candidates):
+        if not candidates:
+            return
+        key = self._key(board, strength)
+        with self._lock:
+            self._entries[key] = list(candidates)
+            self._entries.move_to_end(key)
+            if self._db:
+                self._writes.append(("put", (*key, json.dumps([(m.uci(), cp) for m, cp in candidates]), time.time())))
+            while len(self._entries) > self.capacity:
+                evicted = self._entries.popitem(last=False)[0]
+                if self._db:
+                    self._writes.append(("delete", evicted))
+
+    # Writer thread: batched INSERT/DELETE and one commit per interval
+    def _run(self):
+        while self._db:
+            self._wake.wait(self.commit_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            writes, self._writes = self._writes, []
+        if not writes:
+            return
+        with self._db_lock:
+            if not self._db:
+                return
+            for kind, values in writes:
+                if kind == "put":
+                    self._db.execute("INSERT OR REPLACE INTO moves VALUES (?, ?, ?, ?)", values)
+                else:
+                    self._db.execute("DELETE FROM moves WHERE zobrist = ? AND difficulty = ?", values)
+            self._db.commit()
+
+    def close(self):
+        if self._db:
+            self.flush()
+            with self._db_lock:
+                self._db.close()
+                self._db = None
+            self._wake.set()
+            self._writer.join(timeout=2)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def format_stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        p50 = statistics.median(self.lookup_latencies) if self.lookup_latencies else 0.0
+        return f"🗄 Move cache: {self.hits}/{total} hits ({rate:.0%}), {len(self)} positions, lookup p50 {p50:.1f} µs"
+
+
+########################################################################################
+
+
+class OpeningBook:
+    """Polyglot opening book consulted before the engine (only moves the trolley can play)."""
+
+    def __init__(self, path, max_ply=20):
+        self.path = path
+        self.max_ply = max_ply  # Leave the book after this many half-moves
+        self._reader = chess.polyglot.open_reader(path) if path and os.path.exists(path) else None
+        if path and not self._reader:
+            print(f"⚠ Opening book {path} not found, using the engine only.")
+
+    def move(self, board, rng=random):
+        if not self._reader or board.ply() >= self.max_ply:
+            return None
+        playable = set(ai_root_moves(board))
+        entries = [entry for entry in self._reader.find_all(board) if entry.move in playable]
+        if not entries:
+            return None
+        return rng.choices([e.move for e in entries], [max(e.weight, 1) for e in entries])[0]
+
+    def close(self):
+        if self._reader:
+            self._reader.close()
+            self._reader = None
@@ -0,0 +1,78 @@
+import chess
+
+
+# Piece symbol per square (None when empty), indexed by chess square
+def occupancy(board):
+    symbols = [None] * 64
+    for square, piece in board.piece_map().items():
+        symbols[square] = piece.symbol()
+    return symbols
+
+
+# Squares a legal move changes, with what stands on them afterwards
+def move_changes(board, move):
+    piece = board.piece_at(move.from_square)
+    changes = {move.from_square: None}
+
+    if board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        kingside = board.is_kingside_castling(move)
+        rook_from = move.to_square if board.chess960 else chess.square(7 if kingside else 0, rank)
+        changes[rook_from] = None
+        changes[chess.square(6 if kingside else 2, rank)] = piece.symbol()
+        changes[chess.square(5 if kingside else 3, rank)] = chess.Piece(chess.ROOK, piece.color).symbol()
+        return changes
+
+    if board.is_en_passant(move):
+        captured = move.to_square - 8 if piece.color == chess.WHITE else move.to_square + 8
+        changes[captured] = None
+
+    if move.promotion:
+        changes[move.to_square] = chess.Piece(move.promotion, piece.color).symbol()
+    else:
+        changes[move.to_square] = piece.symbol()
+    return changes
+
+
+########################################################################################
+
+
+def rank_legal_moves(previous_board, detected_board):
+    """All legal moves of previous_board as (distance, move), closest to the detected board first.
+
+    distance is the Hamming distance between the occupancy the move would produce and the
+    detected occupancy; an exact match is 0. Only the squares a move touches are re-scored,
+    so ranking all ~30 legal moves costs a single pass."""
+    before = occupancy(previous_board)
+    detected = occupancy(detected_board)
+    base = sum(a != b for a, b in zip(before, detected))
+
+    ranked = []
+    for move in previous_board.legal_moves:
+        distance = base
+        for square, after in move_changes(previous_board, move).items():
+            distance += (after != detected[square]) - (before[square] != detected[square])
+        # Ties (e.g. an unreadable promoted piece) prefer queen promotions, then plain moves
+        preference = 0 if move.promotion in (None, chess.QUEEN) else 1
+        ranked.append((distance, preference, move))
+
+    ranked.sort(key=lambda item: (item[0], item[1]))
+    return [(distance, move) for distance, _, move in ranked]
+
+
+def match_move(previous_board, detected_board, tolerance=0, max_suggestions=3, suggestion_distance=2):
+    """Return (move, suggestions).
+
+    move is the unique legal move within tolerance squares of the detected board (else None);
+    suggestions are the nearest legal moves for "did you mean" feedback when nothing matched."""
+    ranked = rank_legal_moves(previous_board, detected_board)
+    if not ranked:
+        return None, []
+
+    best_distance, best_move = ranked[0]
+    runner_up = ranked[1][0] if len(ranked) > 1 else None
+    if best_distance <= tolerance and (best_distance == 0 or runner_up is None or runner_up > best_distance):
+        return best_move, []
+
+    suggestions = [move for distance, move in ranked[:max_suggestions] if distance <= suggestion_distance]
+    return None, suggestions
@@ -0,0 +1,235 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+from metrics import metrics
+
+# Output of the inference stage; board_state/detections are None when the motion gate skipped the frame
+InferenceResult = namedtuple("InferenceResult",
+                             ["frame_id", "captured_at", "frame", "board_state", "detections", "inferred", "changed"])
+
+
+class LatestQueue:
+    """Bounded single-slot queue: a new item replaces the unread one ("latest frame wins")."""
+
+    def __init__(self):
+        self._item = None
+        self._has_item = False
+        self._cond = threading.Condition()
+        self.dropped = 0  # Items overwritten before anyone read them
+
+    def put(self, item):
+        with self._cond:
+            if self._has_item:
+                self.dropped += 1
+            self._item = item
+            self._has_item = True
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the newest item, or None if nothing new arrives within timeout."""
+        with self._cond:
+            if not self._has_item:
+                self._cond.wait(timeout)
+            if not self._has_item:
+                return None
+            item = self._item
+            self._item = None
+            self._has_item = False
+            return item
+
+
+class ResultQueue:
+    """Inference results for the controller: LatestQueue's API, but a skipped frame never hides an inferred one.
+
+    Skipped frames (inferred=False) only carry a frame for the preview, so the newest one wins,
+    and never over an unread inferred result. Inferred results queue up in order (each one is a
+    tracker vote, and burst counts matter to deferred confirms), up to max_inferred; an evicted
+    result hands its changed flag on so the tracker still starts over."""
+
+    def __init__(self, max_inferred=8):
+        self._inferred = deque()
+        self._skipped = None
+        self.max_inferred = max_inferred
+        self._cond = threading.Condition()
+        self.dropped = 0  # Results overwritten or evicted before anyone read them
+
+    def put(self, result):
+        with self._cond:
+            if result.inferred:
+                if self._skipped is not None:
+                    self._skipped = None
+                    self.dropped += 1
+                if len(self._inferred) == self.max_inferred:
+                    evicted = self._inferred.popleft()
+                    self.dropped += 1
+                    if evicted.changed:
+                        if self._inferred:
+                            self._inferred[0] = self._inferred[0]._replace(changed=True)
+                        else:
+                            result = result._replace(changed=True)
+                self._inferred.append(result)
+            elif self._inferred:
+                self.dropped += 1  # Preview-only frame: an unread inferred result has a frame too
+                return
+            else:
+                if self._skipped is not None:
+                    self.dropped += 1
+                self._skipped = result
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest unread inferred result, else the newest skipped one, or None after timeout."""
+        with self._cond:
+            if not self._inferred and self._skipped is None:
+                self._cond.wait(timeout)
+            if self._inferred:
+                return self._inferred.popleft()
+            result, self._skipped = self._skipped, None
+            return result
+
+
+class FpsCounter:
+    """Frames per second over a sliding time window."""
+
+    def __init__(self, window=2.0):
+        self.window = window
+        self._ticks = deque()
+        self._lock = threading.Lock()
+
+    def tick(self):
+        now = time.perf_counter()
+        with self._lock:
+            self._ticks.append(now)
+            while self._ticks and now - self._ticks[0] > self.window:
+                self._ticks.popleft()
+
+    @property
+    def fps(self):
+        now = time.perf_counter()
+        with self._lock:
+            while self._ticks and now - self._ticks[0] > self.window:
+                self._ticks.popleft()
+            return len(self._ticks) / self.window
+
+
+########################################################################################
+
+
+class Stage(threading.Thread):
+    """Background pipeline stage with its own FPS counter and stop flag."""
+
+    def __init__(self, name):
+        super().__init__(name=name, daemon=True)
+        self.counter = FpsCounter()
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+
+# Capture: keep grabbing so the driver buffer never holds stale frames
+class CaptureStage(Stage):
+    def __init__(self, cap, output, name="capture", registry=None):
+        super().__init__(name)
+        self.cap = cap
+        self.output = output
+        self.registry = registry or metrics  # Per-table Metrics when several cameras share a process
+
+    def run(self):
+        frame_id = 0
+        while not self.stopped and self.cap.isOpened():
+            with self.registry.timer("capture"):
+                ret, frame = self.cap.read()
+            if not ret:
+                print("Failed to grab frame")
+                break
+            frame_id += 1
+            self.output.put((frame_id, time.monotonic(), frame))
+            self.counter.tick()
+        self.stop()
+
+
+# Inference: always works on the newest captured frame, skipping any it fell behind on
+# (and, with a motion gate, any frame where the board hasn't changed)
+class InferenceStage(Stage):
+    def __init__(self, detect, source, output, gate=None):
+        super().__init__("inference")
+        self.detect = detect
+        self.source = source
+        self.output = output
+        self.gate = gate
+
+    def run(self):
+        while not self.stopped:
+            item = self.source.get(timeout=0.1)
+            if item is None:
+                continue
+            frame_id, captured_at, frame = item
+            if self.gate and not self.gate.update(frame):
+                self.output.put(InferenceResult(frame_id, captured_at, frame, None, None, False, False))
+                continue
+            board_state, detections = self.detect(frame)
+            changed = self.gate.changed if self.gate else False
+            self.output.put(InferenceResult(frame_id, captured_at, frame, board_state, detections, True, changed))
+            self.counter.tick()
+
+
+# One camera of a BatchInferenceStage: its frame and result queues, motion gate, board crop (or
+# BoardWarper for the square classifier) and map_detections(found) -> (board_state, detections)
+CameraFeed = namedtuple("CameraFeed", ["name", "frames", "results", "gate", "roi", "map_detections"])
+
+
+# Batched inference for several cameras: each round takes the newest frame of every camera,
+# and all frames that need YOLO go through one model call. N tables share one loaded model
+# and one set of inference threads instead of N models competing for the cores.
+class BatchInferenceStage(Stage):
+    def __init__(self, detector, feeds, idle_wait=0.005):
+        super().__init__("batch-inference")
+        self.detector = detector
+        self.feeds = feeds
+        self.idle_wait = idle_wait
+        self.batch_sizes = deque(maxlen=1000)
+
+    def run(self):
+        while not self.stopped:
+            batch = []  # (feed, frame_id, captured_at, frame)
+            for feed in self.feeds:
+                item = feed.frames.get(timeout=0)
+                if item is None:
+                    continue
+                frame_id, captured_at, frame = item
+                if feed.gate and not feed.gate.update(frame):
+                    feed.results.put(InferenceResult(frame_id, captured_at, frame, None, None, False, False))
+                    continue
+                batch.append((feed, frame_id, captured_at, frame))
+
+            if not batch:
+                time.sleep(self.idle_wait)
+                continue
+
+            with metrics.timer("batch_inference"):
+                found = self.detector.predict([frame for _, _, _, frame in batch],
+                                              rois=[feed.roi for feed, _, _, _ in batch])
+            self.batch_sizes.append(len(batch))
+            metrics.count("inference_frames", len(batch))
+            for (feed, frame_id, captured_at, frame), boxes in zip(batch, found):
+                board_state, detections = feed.map_detections(boxes)
+                changed = feed.gate.changed if feed.gate else False
+                feed.results.put(InferenceResult(frame_id, captured_at, frame, board_state, detections, True, changed))
+            self.counter.tick()
+
+    @property
+    def mean_batch(self):
+        return sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else 0.0
+
+
+# One-line summary of per-stage FPS for periodic logging
+def format_stage_stats(counters, frames, results):
+    parts = [f"{name}={counter.fps:.1f}fps" for name, counter in counters.items()]
+    parts.append(f"dropped(frames={frames.dropped}, results={results.dropped})")
+    return "📊 Pipeline: " + " ".join(parts)
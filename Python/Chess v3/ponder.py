@@ -0,0 +1,138 @@
+import statistics
+import threading
+import time
+
+import chess
+import chess.engine
+import chess.polyglot
+
+from strength import ai_root_moves, candidates_from_infos
+
+
+class Ponderer:
+    """Thinks on the human's time: searches the AI reply to the most likely human moves.
+
+    After the AI moves, start() picks the human's top candidate moves with a short MultiPV
+    search, then runs the AI's own MultiPV search for each reply position in the background.
+    reply() stops pondering and returns the stored scored candidates for the position actually
+    reached: instantly if its search finished, or after a short top-up search if it was cut off."""
+
+    def __init__(self, engine_pool, candidates=4, candidate_time=0.3, top_up_time=0.2):
+        self.engine_pool = engine_pool
+        self.candidates = candidates          # Human moves to prepare a reply for
+        self.candidate_time = candidate_time  # MultiPV search that picks them
+        self.top_up_time = top_up_time        # Extra search when a pondered reply was cut off
+
+        self._replies = {}  # zobrist hash -> (scored candidates, complete)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.hit_latencies = []   # ms from reply() call to AI move, for ponder hits
+        self.miss_latencies = []  # ... and for misses (full search)
+
+    # Start pondering the position where the human is to move
+    def start(self, board, limit, multipv=1, options=None, game=None):
+        self.stop()
+        with self._lock:
+            self._replies.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._ponder, args=(board.copy(), limit, multipv, options, game),
+                                        name="ponder", daemon=True)
+        self._thread.start()
+
+    # Ask the search to stop without waiting for it (safe from any thread, e.g. a shared engine pool)
+    def interrupt(self):
+        self._stop.set()
+
+    @property
+    def interrupted(self):
+        return self._stop.is_set()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _ponder(self, board, limit, multipv, options, game):
+        try:
+            with self.engine_pool.acquire() as engine:
+                infos = engine.analyse(board, chess.engine.Limit(time=self.candidate_time),
+                                       multipv=self.candidates, game=game)
+                likely_moves = [info["pv"][0] for info in infos if info.get("pv")]
+
+                for human_move in likely_moves:
+                    if self._stop.is_set():
+                        break
+                    position = board.copy()
+                    position.push(human_move)
+                    if position.is_game_over():
+                        continue
+                    self._search_reply(engine, position, limit, multipv, options, game)
+        except (chess.engine.EngineError, chess.engine.EngineTerminatedError) as e:
+            print(f"⚠ Pondering stopped: {e}")
+        except TimeoutError:
+            pass  # Stopped while still waiting for a shared engine
+
+    def _search_reply(self, engine, position, limit, multipv, options, game):
+        root_moves = ai_root_moves(position)
+        complete = True
+        with engine.analysis(position, limit, multipv=min(multipv, len(root_moves)), root_moves=root_moves,
+                             options=options or {}, game=game) as analysis:
+            for _ in analysis:
+                if self._stop.is_set():
+                    complete = False
+                    analysis.stop()
+                    break
+            analysis.wait()
+            candidates = candidates_from_infos(analysis.multipv, position.turn)
+        if candidates:
+            with self._lock:
+                self._replies[chess.polyglot.zobrist_hash(position)] = (candidates, complete)
+
+    ########################################################################################
+
+    def reply(self, board, search):
+        """Scored AI candidates for board: pondered if possible, else search(board).
+
+        search(board, limit=None) runs the normal AI search; limit overrides its budget."""
+        start = time.perf_counter()
+        self.stop()
+
+        with self._lock:
+            stored = self._replies.get(chess.polyglot.zobrist_hash(board))
+
+        if stored is None:
+            candidates = search(board)
+            self.misses += 1
+            self.miss_latencies.append((time.perf_counter() - start) * 1000)
+            return candidates
+
+        candidates, complete = stored
+        if not complete:  # Search was cut off: the engine's hash still holds it, so top it up briefly
+            candidates = search(board, chess.engine.Limit(time=self.top_up_time))
+        self.hits += 1
+        self.hit_latencies.append((time.perf_counter() - start) * 1000)
+        return candidates
+
+    def stats(self):
+        total = self.hits + self.misses
+
+        def median(values):
+            return statistics.median(values) if values else 0.0
+
+        return {
+            "requests": total,
+            "hits": self.hits,
+            "hit_rate": self.hits / total if total else 0.0,
+            "hit_latency_ms": median(self.hit_latencies),
+            "miss_latency_ms": median(self.miss_latencies),
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"🧠 Ponder: {s['hits']}/{s['requests']} hits ({s['hit_rate']:.0%}), "
+                f"reply p50 {s['hit_latency_ms']:.0f} ms on hits vs {s['miss_latency_ms']:.0f} ms on misses")
@@ -0,0 +1,417 @@
+"""Framed binary serial protocol between Python and the Arduino (version 1).
+
+Frame:  0xA5 | version << 4 | type | seq | length | payload (length bytes) | CRC-16 (big endian)
+The CRC (CCITT, init 0xFFFF) covers everything after the 0xA5 start byte. DATA frames are
+acknowledged with an ACK frame carrying the same seq and retransmitted until they are; a
+repeated seq is acknowledged again but delivered only once. Each side opens with a SYN frame
+(acknowledged like DATA) that makes the other forget the last seq it received, so the first
+frame after a restart is never mistaken for a repeat. Bytes outside frames are the Arduino's
+plain-text DEBUG chatter (0xA5 never occurs in ASCII).
+
+Payloads are the game's text messages, compacted: one id byte for the fixed messages
+("MOVE_OK", "GAME_CONTINUES", ...), moves as 2-byte words, trolley plans as 1-3 bytes per op.
+Anything else travels as id 0x7F followed by the ASCII text. Both sides convert back to the
+exact same text, so the game code only ever sees text.
+"""
+import binascii
+import logging
+import os
+import random
+import re
+import select
+import struct
+import threading
+
+import chess
+import serial
+
+from serial_transport import SerialTransport, parse_line
+
+PROTOCOL_VERSION = 1
+SOF = 0xA5
+DATA, ACK, SYN = 0, 1, 2
+MAX_PAYLOAD = 255
+
+FIXED_MESSAGES = {
+    # Arduino -> Python
+    0x01: "START",
+    0x02: "END",
+    0x03: "EASY",
+    0x04: "HARD",
+    0x05: "MOVE_CONFIRM",
+    0x06: "ASK_HUMAN_STATUS",
+    0x07: "ASK_AI_MOVE",
+    0x08: "ASK_AI_STATUS",
+    # Python -> Arduino
+    0x10: "START_OK",
+    0x11: "START_ERROR",
+    0x12: "MOVE_OK",
+    0x13: "MOVE_ERROR",
+    0x14: "MOVE_NO_CHANGE",
+    0x15: "GAME_CONTINUES",
+    0x16: "Human is CHECK",
+    0x17: "AI is CHECK",
+    0x18: "CHECKMATE: Human Wins",
+    0x19: "CHECKMATE: AI Wins",
+    0x1A: "STALEMATE",
+    0x1B: "DRAW INSUFFICIENT MATERIAL",
+    0x1C: "DRAW REPETITION",
+    0x1D: "DRAW 50 MOVE RULE",
+    0x1E: "READY",  # Camera, model, engines and serial are all up; resent whenever the Arduino boots
+}
+FIXED_IDS = {text: message_id for message_id, text in FIXED_MESSAGES.items()}
+
+MOVE_LIST_MESSAGES = {0x20: "MOVE_ERROR", 0x21: "MOVE_ERROR_CHECK"}  # "<kind>:<uci> <uci> ..."
+AI_MOVE = 0x22  # "e2e4:1" or "e2e4:1|<plan>"
+PARK = 0x23     # "PARK:<plan>"
+TEXT = 0x7F
+
+AI_MOVE_PATTERN = re.compile(r"^([a-h][1-8][a-h][1-8]):([01])(?:\|(.+))?$")
+
+
+def crc16(data):
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode_frame(frame_type, seq, payload=b""):
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"payload of {len(payload)} bytes does not fit a frame")
+    body = bytes([(PROTOCOL_VERSION << 4) | frame_type, seq & 0xFF, len(payload)]) + payload
+    return bytes([SOF]) + body + struct.pack(">H", crc16(body))
+
+
+########################################################################################
+# Message compaction
+
+
+def _encode_move(uci):
+    move = chess.Move.from_uci(uci)
+    return struct.pack(">H", move.from_square | move.to_square << 6 | (move.promotion or 0) << 12)
+
+
+def _decode_move(word):
+    return chess.Move(word & 0x3F, (word >> 6) & 0x3F, promotion=(word >> 12) or None).uci()
+
+
+def _encode_plan(plan):
+    out = bytearray()
+    for step in plan.split(";"):
+        kind = step[0]
+        if kind in "TC":
+            x, y = step[1:].split(",")
+            out += kind.encode() + struct.pack(">bb", int(x), int(y))
+        elif kind == "W":
+            out += b"W" + struct.pack(">H", int(step[1:]))
+        elif kind in "GR" and len(step) == 1:
+            out += kind.encode()
+        else:
+            raise ValueError(f"unknown plan step {step!r}")
+    return bytes(out)
+
+
+def _decode_plan(data):
+    steps = []
+    i = 0
+    while i < len(data):
+        kind = chr(data[i])
+        if kind in "TC":
+            x, y = struct.unpack_from(">bb", data, i + 1)
+            steps.append(f"{kind}{x},{y}")
+            i += 3
+        elif kind == "W":
+            steps.append(f"W{struct.unpack_from('>H', data, i + 1)[0]}")
+            i += 3
+        else:
+            steps.append(kind)
+            i += 1
+    return ";".join(steps)
+
+
+def _compact(text):
+    if text in FIXED_IDS:
+        return bytes([FIXED_IDS[text]])
+
+    kind, _, rest = text.partition(":")
+    for message_id, name in MOVE_LIST_MESSAGES.items():
+        if kind == name and rest:
+            return bytes([message_id]) + b"".join(_encode_move(uci) for uci in rest.split(" "))
+    if kind == "PARK" and rest:
+        return bytes([PARK]) + _encode_plan(rest)
+
+    match = AI_MOVE_PATTERN.match(text)
+    if match:
+        uci, flag, plan = match.groups()
+        return bytes([AI_MOVE]) + _encode_move(uci) + bytes([int(flag)]) + (_encode_plan(plan) if plan else b"")
+    return None
+
+
+def encode_message(text):
+    """Compact payload for a text message; falls back to plain text whenever compaction would not round-trip."""
+    try:
+        payload = _compact(text)
+    except (ValueError, struct.error):
+        payload = None
+    if payload is None or decode_message(payload) != text:
+        payload = bytes([TEXT]) + text.encode()
+    return payload
+
+
+def decode_message(payload):
+    message_id, data = payload[0], payload[1:]
+    if message_id in FIXED_MESSAGES:
+        return FIXED_MESSAGES[message_id]
+    if message_id in MOVE_LIST_MESSAGES:
+        words = struct.unpack(f">{len(data) // 2}H", data)
+        return f"{MOVE_LIST_MESSAGES[message_id]}:" + " ".join(_decode_move(w) for w in words)
+    if message_id == AI_MOVE:
+        text = f"{_decode_move(struct.unpack_from('>H', data)[0])[:4]}:{data[2]}"
+        return text + (f"|{_decode_plan(data[3:])}" if len(data) > 3 else "")
+    if message_id == PARK:
+        return f"PARK:{_decode_plan(data)}"
+    return data.decode(errors="replace")
+
+
+########################################################################################
+
+
+class FrameDecoder:
+    """Byte stream -> frames and the plain-text lines between them.
+
+    feed() returns ("frame", type, seq, payload) and ("text", line) items; damaged frames are
+    dropped and counted (the sender retransmits them)."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._text = bytearray()
+        self.crc_errors = 0
+        self.version_errors = 0
+
+    def feed(self, data):
+        self._buffer += data
+        items = []
+        while self._buffer:
+            if self._buffer[0] != SOF:
+                byte = self._buffer.pop(0)
+                if byte == ord("\n"):
+                    line = self._text.decode(errors="replace").strip()
+                    self._text.clear()
+                    if line:
+                        items.append(("text", line))
+                elif 32 <= byte < 127:  # Skips the bytes of frames we could not resynchronise on
+                    self._text.append(byte)
+                continue
+
+            if len(self._buffer) < 4:
+                break  # Header not complete yet
+            length = self._buffer[3]
+            if len(self._buffer) < 6 + length:
+                break
+            body = bytes(self._buffer[1:4 + length])
+            (crc,) = struct.unpack_from(">H", self._buffer, 4 + length)
+            if crc != crc16(body):
+                self.crc_errors += 1
+                self._buffer.pop(0)  # Resynchronise on the next start byte
+                continue
+            del self._buffer[:6 + length]
+            if body[0] >> 4 != PROTOCOL_VERSION:
+                self.version_errors += 1
+                continue
+            items.append(("frame", body[0] & 0x0F, body[1], body[3:]))
+        return items
+
+
+class FramedTransport(SerialTransport):
+    """SerialTransport over the framed protocol: same Message queue, send() and wait_for() API.
+
+    send() blocks until the Arduino acknowledges the frame, retransmitting every ack_timeout
+    seconds up to retries times, and returns False if it never does. start() announces this
+    side with a SYN; a SYN from the other side counts in peer_restarts."""
+
+    def __init__(self, ser, ack_timeout=0.1, retries=5, **kwargs):
+        super().__init__(ser, **kwargs)
+        self.ack_timeout = ack_timeout
+        self.retries = retries
+        self.decoder = FrameDecoder()
+        self._send_lock = threading.Lock()  # One DATA frame in flight at a time
+        self._acks = threading.Condition()
+        self._acked = set()
+        self._next_seq = 0
+        self._last_rx_seq = None
+        self.peer_restarts = 0
+        self.retransmits = 0
+        self.send_failures = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def start(self):
+        super().start()
+        if not self._send_frame(SYN):  # The board may still be booting; it starts from a clean state then
+            self.debug_logger.info("No ack for SYN")
+        return self
+
+    def _write(self, data):
+        with self._write_lock:
+            self.ser.write(data)
+            self.bytes_sent += len(data)
+
+    def _read_loop(self):
+        while self._running and self.is_open:
+            try:
+                data = self.ser.read(self.ser.in_waiting or 1)  # Returns after the port timeout when idle
+            except serial.SerialException as e:
+                print(f"❌ ERROR: Serial read failed: {e}")
+                break
+            if not data:
+                continue
+            self.bytes_received += len(data)
+
+            for item in self.decoder.feed(data):
+                if item[0] == "text":  # Only ever DEBUG chatter (or debris of a damaged frame)
+                    self.debug_logger.info(item[1])
+                    self._check_boot(item[1])
+                    continue
+                _, frame_type, seq, payload = item
+                if frame_type == ACK:
+                    with self._acks:
+                        self._acked.add(seq)
+                        self._acks.notify_all()
+                elif frame_type == SYN:
+                    self._write(encode_frame(ACK, seq))
+                    self._last_rx_seq = None  # The peer restarted: its seqs start over
+                    self.peer_restarts += 1
+                elif frame_type == DATA and payload:
+                    self._write(encode_frame(ACK, seq))
+                    if seq != self._last_rx_seq:  # Not a retransmission of what we already have
+                        self._last_rx_seq = seq
+                        self._deliver(decode_message(payload))
+
+    def _deliver(self, line):
+        if self.tap:
+            self.tap("rx", line)
+        self._messages.put(parse_line(line))
+
+    def send(self, text):
+        if not self.is_open:
+            print(f"❌ ERROR: Serial connection is closed. Cannot send: {text}")
+            return False
+        if self.tap:
+            self.tap("tx", text)
+
+        if self._send_frame(DATA, encode_message(text)):
+            return True
+        self.send_failures += 1
+        print(f"❌ ERROR: Arduino did not acknowledge: {text}")
+        return False
+
+    # One frame, retransmitted until acknowledged; False if it never is
+    def _send_frame(self, frame_type, payload=b""):
+        with self._send_lock:
+            seq = self._next_seq
+            self._next_seq = (seq + 1) & 0xFF
+            frame = encode_frame(frame_type, seq, payload)
+            with self._acks:
+                self._acked.discard(seq)
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self.retransmits += 1
+                self._write(frame)
+                with self._acks:
+                    if self._acks.wait_for(lambda: seq in self._acked, timeout=self.ack_timeout):
+                        return True
+        return False
+
+    def format_stats(self):
+        return (f"🔌 Link: {self.bytes_sent} B sent, {self.bytes_received} B received, "
+                f"{self.retransmits} retransmits, {self.send_failures} failed sends, "
+                f"{self.decoder.crc_errors} CRC errors")
+
+
+########################################################################################
+# Stand-in Arduino for tests and benchmarks
+
+
+class NoisyPty:
+    """The master end of a pty as a serial-like object, optionally damaging what passes through.
+
+    error_rate is the chance of each byte getting one bit flipped, drop_rate the chance of a
+    whole write being lost; both apply to reads and writes."""
+
+    def __init__(self, fd, error_rate=0.0, drop_rate=0.0, rng=None):
+        self.fd = fd
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.rng = rng or random.Random()
+        self.is_open = True
+        self.in_waiting = 0
+        self.damaged_bytes = 0
+        self.dropped_writes = 0
+
+    def _damage(self, data):
+        if not self.error_rate:
+            return data
+        out = bytearray(data)
+        for i in range(len(out)):
+            if self.rng.random() < self.error_rate:
+                out[i] ^= 1 << self.rng.randrange(8)
+                self.damaged_bytes += 1
+        return bytes(out)
+
+    def read(self, size=1):
+        ready, _, _ = select.select([self.fd], [], [], 0.1)
+        if not ready or not self.is_open:
+            return b""
+        try:
+            return self._damage(os.read(self.fd, 4096))
+        except OSError:
+            return b""
+
+    def write(self, data):
+        if self.drop_rate and self.rng.random() < self.drop_rate:
+            self.dropped_writes += 1
+            return len(data)
+        os.write(self.fd, self._damage(data))
+        return len(data)
+
+    def close(self):
+        self.is_open = False
+
+
+class PtyArduino:
+    """Stand-in Arduino on a pty speaking the framed protocol (the sketch's protocol.h).
+
+    Open .port with serial.Serial like the real board. The device side is a FramedTransport
+    too: send() frames a message and waits for the ack, get() returns what Python sent, and
+    debug() writes plain-text chatter between frames as the sketch does."""
+
+    def __init__(self, error_rate=0.0, drop_rate=0.0, seed=None):
+        import tty  # Unix only (termios), like the pty itself: the tables on Windows never get here
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)  # No echo or newline translation of the SYN written before the port is opened
+        self.port = os.ttyname(self._slave)
+        self.link = NoisyPty(self._master, error_rate, drop_rate, random.Random(seed))
+        self.transport = FramedTransport(self.link, debug_logger=logging.getLogger("pty_arduino.debug"))
+
+    def start(self):
+        self.transport.start()
+        return self
+
+    def stop(self):
+        self.link.close()
+        self.transport.stop()
+        os.close(self._master)
+        os.close(self._slave)
+
+    # Reset like the board: fresh protocol state (seqs from 0), announced with a SYN
+    def restart(self):
+        self.transport.stop()
+        self.transport = FramedTransport(self.link, debug_logger=self.transport.debug_logger).start()
+
+    def send(self, text):
+        return self.transport.send(text)
+
+    def get(self, timeout=0):
+        return self.transport.get(timeout)
+
+    def debug(self, text):
+        self.link.write(f"DEBUG: {text}\n".encode())
@@ -0,0 +1,372 @@
+"""Headless self-play load test of the game logic: no camera, Arduino or Stockfish needed.
+
+Plays engine-vs-engine games from the start position through a real GameSession. Every
+white ("human") move is turned into synthetic YOLO boxes on a camera view of the board,
+optionally noisy (missed pieces, swapped classes, box centres near a square's edge), mapped to
+squares by map_detections and the calibration LUT, and goes through the tracker, FEN and
+move-detection path. A mock Arduino holds the sketch's conversation, either in-process
+or in the framed protocol over a pty. The report gives positions per second, how often the
+human move was detected on the first try by move type, and p50/p99 latency of
+board_state_to_fen, detect_human_move, process_game_status and get_ai_move.
+    python selfplay.py --games 200 --miss 0.02 --swap 0.01 --boundary 0.01
+    python selfplay.py --games 20 --link pty --stockfish stockfish/stockfish
+"""
+import argparse
+import json
+import random
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+import chess
+import chess.engine
+import numpy as np
+
+from board_calibration import build_square_lut, compute_homography, default_corners, transform_points
+from board_tracker import BoardStateTracker
+from detector_backends import Detections
+from game_session import GameSession, map_detections, piece_short_names
+from metrics import Metrics
+from motion_planner import MotionPlanner
+from move_cache import MoveCache, OpeningBook
+from serial_transport import parse_line
+
+MOVE_KINDS = ("quiet", "capture", "castling", "en passant", "promotion")
+TIMED_FUNCTIONS = ("board_state_to_fen", "detect_human_move", "process_game_status", "get_ai_move")
+GAME_OVER_MESSAGES = ("CHECKMATE", "STALEMATE", "DRAW")
+REPLY_TIMEOUT = 5.0  # Seconds the mock Arduino waits for an answer
+
+# Detector mistakes, each a per-piece, per-frame probability
+Noise = namedtuple("Noise", ["miss", "swap", "boundary"])
+CLEAN = Noise(0.0, 0.0, 0.0)
+SWAPS = {"p": "b", "b": "p", "n": "b", "r": "q", "q": "k", "k": "q"}  # Classes that look alike from above
+
+# Synthetic camera: chess_test.py's default grid in a 1280 x 720 frame
+FRAME_WIDTH, FRAME_HEIGHT = 1280, 720
+BOARD_GRID = (340, 940, 60, 660)
+BOX_PX = 60
+CLASS_NAMES = dict(enumerate(piece_short_names))  # Class id -> YOLO label, like detector.names
+CLASS_IDS = {piece_short_names[label]: class_id for class_id, label in CLASS_NAMES.items()}
+EDGE_DIRECTIONS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+
+def move_kind(board, move):
+    if board.is_castling(move):
+        return "castling"
+    if board.is_en_passant(move):
+        return "en passant"
+    if move.promotion:
+        return "promotion"
+    if board.is_capture(move):
+        return "capture"
+    return "quiet"
+
+
+class SyntheticCamera:
+    """YOLO boxes of a board on a fixed camera view, mapped to squares the way the tables do it."""
+
+    def __init__(self, corners=None, width=FRAME_WIDTH, height=FRAME_HEIGHT):
+        H = compute_homography(corners or default_corners(*BOARD_GRID))
+        self.plane_to_image = np.linalg.inv(H)
+        self.lut = build_square_lut(H, width, height)
+
+    def detections(self, board, noise, rng):
+        """One frame's detections, as map_detections returns them: (x1, y1, x2, y2, piece, square, conf)."""
+        centres, classes, confs = [], [], []  # Box centres on the board plane, in squares
+        for square, piece in board.piece_map().items():
+            if rng.random() < noise.miss:
+                continue
+            symbol = piece.symbol()
+            conf = rng.uniform(0.6, 0.95)
+            if rng.random() < noise.swap:
+                swapped = SWAPS[symbol.lower()]
+                symbol = swapped.upper() if piece.color == chess.WHITE else swapped
+                conf = rng.uniform(0.4, 0.7)
+            x, y = chess.square_file(square) + 0.5, chess.square_rank(square) + 0.5
+            if rng.random() < noise.boundary:  # Box centre near an edge: the LUT may put it on either side
+                dx, dy = rng.choice(EDGE_DIRECTIONS)
+                reach = rng.uniform(0.4, 0.6)
+                x, y = x + dx * reach, y + dy * reach
+                conf = rng.uniform(0.4, 0.7)
+            centres.append((x, y))
+            classes.append(CLASS_IDS[symbol])
+            confs.append(conf)
+
+        pixels = transform_points(self.plane_to_image, centres) if centres else np.zeros((0, 2))
+        xyxy = np.hstack([pixels - BOX_PX / 2, pixels + BOX_PX / 2])
+        found = Detections(xyxy, np.array(confs), np.array(classes, dtype=int))
+        return map_detections(found, CLASS_NAMES, self.lut)[1]
+
+
+########################################################################################
+
+
+class LoopbackTransport:
+    """In-process stand-in for one end of the serial link: what one end sends, the other get()s."""
+
+    is_open = True
+
+    def __init__(self):
+        self.peer = None
+        self._inbox = deque()
+
+    @classmethod
+    def pair(cls):
+        a, b = cls(), cls()
+        a.peer, b.peer = b, a
+        return a, b
+
+    def send(self, text):
+        self.peer._inbox.append(parse_line(text))
+        return True
+
+    def get(self, timeout=0):
+        return self._inbox.popleft() if self._inbox else None
+
+    def stop(self):
+        pass
+
+
+class RandomEngine:
+    """Engine stand-in: random scores for the candidate moves, so the Elo curve still picks among them."""
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        yield self
+
+    def analyse(self, board, limit, multipv=1, root_moves=None, **kwargs):
+        moves = self.rng.sample(root_moves or list(board.legal_moves), multipv)
+        return [{"pv": [move], "score": chess.engine.PovScore(chess.engine.Cp(self.rng.randint(-300, 300)), board.turn)}
+                for move in moves]
+
+    def close(self):
+        pass
+
+
+class FixedLimits:
+    """search_limits for GameSession: one small budget for every difficulty."""
+
+    def __init__(self, limit):
+        self._limit = limit
+        self.kind = f"fixed {limit}"  # Part of the move cache's key, like SearchLimits.kind
+
+    def limit(self, profile):
+        return self._limit
+
+
+########################################################################################
+
+
+class SelfPlay:
+    """Mock Arduino and camera around one GameSession, playing the white side itself."""
+
+    def __init__(self, session, peer, noise, rng, frames=3, white_engine=None, white_limit=None,
+                 special_bias=0.5, max_plies=200):
+        self.session = session
+        self.peer = peer  # Arduino end of the link
+        self.noise = noise
+        self.rng = rng
+        self.frames = frames  # Frames the tracker sees of each position
+        self.white_engine = white_engine
+        self.white_limit = white_limit
+        self.special_bias = special_bias  # Chance to play castling/en passant/promotion when legal (random white)
+        self.max_plies = max_plies
+        self.camera = SyntheticCamera()
+
+        self.positions = 0
+        self.games = 0
+        self.detected = {kind: [0, 0] for kind in MOVE_KINDS}  # kind -> [moves, right on the first try]
+        self.retries = 0     # Human moves that needed a second, clean confirm
+        self.desyncs = 0     # Games abandoned because the session's board no longer matched
+        self.cut_games = 0   # Games stopped at max_plies
+        self.results = {}
+
+    # Camera: a few frames of the physical board into the tracker
+    def show(self, board, noise):
+        for i in range(self.frames):
+            self.session.update_board(self.camera.detections(board, noise, self.rng), time.monotonic(),
+                                      changed=i == 0)
+
+    # Arduino: send a message and wait for the answer (PARK requests need none)
+    def ask(self, text):
+        self.peer.send(text)
+        deadline = time.monotonic() + REPLY_TIMEOUT
+        while time.monotonic() < deadline:
+            self.session.poll()
+            reply = self.peer.get(timeout=0.001)
+            if reply and reply.kind != "PARK":
+                return reply
+        raise TimeoutError(f"no reply to {text}")
+
+    def white_move(self, board):
+        if self.white_engine:
+            return self.white_engine.play(board, self.white_limit).move
+        moves = list(board.legal_moves)
+        special = [m for m in moves if move_kind(board, m) in ("castling", "en passant", "promotion")]
+        if special and self.rng.random() < self.special_bias:
+            return self.rng.choice(special)
+        return self.rng.choice(moves)
+
+    def play_game(self, difficulty="easy"):
+        physical = chess.Board()  # The pieces on the table
+        self.show(physical, self.noise)
+        if self.ask("START").kind != "START_OK":
+            self.show(physical, CLEAN)  # The player straightens the pieces and presses START again
+            if self.ask("START").kind != "START_OK":
+                raise RuntimeError("start position not recognized on a clean board")
+        self.peer.send(difficulty.upper())
+        self.games += 1
+
+        while True:
+            if physical.ply() >= self.max_plies:
+                self.cut_games += 1
+                return self.end_game("max plies")
+
+            # Human (white) turn: move, confirm, and check the session saw the same move
+            move = self.white_move(physical)
+            kind = move_kind(physical, move)
+            physical.push(move)
+            self.show(physical, self.noise)
+            reply = self.ask("MOVE_CONFIRM")
+            right = reply.kind == "MOVE_OK" and self.session.board.peek() == move
+            self.detected[kind][0] += 1
+            self.detected[kind][1] += right
+            if reply.kind != "MOVE_OK":
+                self.retries += 1
+                self.show(physical, CLEAN)
+                reply = self.ask("MOVE_CONFIRM")
+            if reply.kind != "MOVE_OK" or self.session.board.peek() != move:
+                self.desyncs += 1
+                return self.end_game("desync")
+            self.positions += 1
+
+            status = self.ask("ASK_HUMAN_STATUS")
+            if status.raw.startswith(GAME_OVER_MESSAGES):
+                return self.finish(status.raw)
+
+            # AI (black) turn: the trolley plays the move it was sent
+            ai_reply = self.ask("ASK_AI_MOVE")
+            ai_move = chess.Move.from_uci(ai_reply.kind)
+            if physical.piece_type_at(ai_move.from_square) == chess.PAWN and chess.square_rank(ai_move.to_square) == 0:
+                ai_move.promotion = chess.QUEEN
+            physical.push(ai_move)
+            self.positions += 1
+            status = self.ask("ASK_AI_STATUS")
+            if status.raw.startswith(GAME_OVER_MESSAGES):
+                return self.finish(status.raw)
+
+    def finish(self, result):
+        result = result.partition(":")[0]
+        self.results[result] = self.results.get(result, 0) + 1
+        return result
+
+    def end_game(self, result):
+        self.peer.send("END")
+        return self.finish(result)
+
+    def report(self, wall_s):
+        stages = self.session.metrics.snapshot()["stages"]
+        return {
+            "games": self.games,
+            "positions": self.positions,
+            "wall_s": round(wall_s, 2),
+            "positions_per_s": round(self.positions / wall_s, 1),
+            "games_per_hour": round(self.games / wall_s * 3600),
+            "results": self.results,
+            "detection": {kind: {"moves": n, "first_try": right, "accuracy": round(right / n, 4) if n else None}
+                          for kind, (n, right) in self.detected.items()},
+            "retries": self.retries,
+            "desyncs": self.desyncs,
+            "cut_games": self.cut_games,
+            "latency": {name: stages[name] for name in TIMED_FUNCTIONS if name in stages},
+        }
+
+
+def print_report(report, noise):
+    print(f"🎲 {report['games']} games, {report['positions']} positions in {report['wall_s']:.1f} s: "
+          f"{report['positions_per_s']:.0f} positions/s, {report['games_per_hour']} games/hour")
+    print(f"Results: {', '.join(f'{k} {v}' for k, v in sorted(report['results'].items()))}")
+    print(f"Human move detection, first try (noise: miss {noise.miss}, swap {noise.swap}, boundary {noise.boundary}):")
+    print(f"  {'move':<12}{'moves':>8}{'right':>8}{'accuracy':>10}")
+    for kind, d in report["detection"].items():
+        accuracy = f"{d['accuracy']:.1%}" if d["accuracy"] is not None else "-"
+        print(f"  {kind:<12}{d['moves']:>8}{d['first_try']:>8}{accuracy:>10}")
+    print(f"Clean re-confirms: {report['retries']}, desyncs: {report['desyncs']}, "
+          f"games cut at the ply limit: {report['cut_games']}")
+    print(f"  {'function':<22}{'calls':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, stats in report["latency"].items():
+        print(f"  {name:<22}{stats['count']:>8}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-play load test of the game logic.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--max-plies", type=int, default=200)
+    parser.add_argument("--difficulty", choices=["easy", "hard"], default="easy")
+    parser.add_argument("--miss", type=float, default=0.0, help="chance a piece isn't detected in a frame")
+    parser.add_argument("--swap", type=float, default=0.0, help="chance a piece is detected as a look-alike class")
+    parser.add_argument("--boundary", type=float, default=0.0, help="chance a box centre lands near a square's edge")
+    parser.add_argument("--frames", type=int, default=3, help="frames the tracker sees of each position")
+    parser.add_argument("--link", choices=["loopback", "pty"], default="loopback",
+                        help="in-process messages, or the framed protocol over a pty (Linux)")
+    parser.add_argument("--stockfish", metavar="PATH", help="play both sides with Stockfish instead of random moves")
+    parser.add_argument("--nodes", type=int, default=2000, help="Stockfish nodes per move")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", metavar="FILE", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)  # choose_move's Elo curve draws from the global generator
+    noise = Noise(args.miss, args.swap, args.boundary)
+
+    if args.link == "pty":
+        import serial
+        from protocol import FramedTransport, PtyArduino
+        arduino = PtyArduino().start()
+        transport = FramedTransport(serial.Serial(arduino.port, 115200, timeout=1)).start()
+        peer = arduino
+    else:
+        transport, peer = LoopbackTransport.pair()
+
+    white_engine = None
+    if args.stockfish:
+        from engine_pool import EnginePool
+        engine_pool = EnginePool(args.stockfish)
+        white_engine = chess.engine.SimpleEngine.popen_uci(args.stockfish)
+    else:
+        engine_pool = RandomEngine(rng)
+    limit = chess.engine.Limit(nodes=args.nodes)
+
+    session = GameSession(transport, engine_pool, MoveCache(None, capacity=0), OpeningBook(None), name="selfplay",
+                          motion_planner=MotionPlanner(), tracker=BoardStateTracker(history=args.frames),
+                          metrics=Metrics({"table": "selfplay"}, window=None), search_limits=FixedLimits(limit))
+    session.log = lambda text: None  # Thousands of games: keep the console for the report
+    session.process_game_status = session.metrics.timed("process_game_status")(session.process_game_status)
+
+    play = SelfPlay(session, peer, noise, rng, frames=args.frames, white_engine=white_engine, white_limit=limit,
+                    max_plies=args.max_plies)
+    started = time.perf_counter()
+    try:
+        for _ in range(args.games):
+            play.play_game(args.difficulty)
+    finally:
+        wall_s = time.perf_counter() - started
+        engine_pool.close()
+        if white_engine:
+            white_engine.quit()
+        transport.stop()
+        if args.link == "pty":
+            arduino.stop()
+
+    report = play.report(wall_s)
+    print_report(report, noise)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
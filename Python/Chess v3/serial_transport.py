@@ -0,0 +1,157 @@
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import serial
+
+# A parsed line from the Arduino: kind is the command ("MOVE_CONFIRM", "DEBUG", ...),
+# payload is whatever followed the first ':' (or None)
+Message = namedtuple("Message", ["kind", "payload", "raw", "received_at"])
+
+# Arduino "DEBUG: ..." chatter goes here instead of the game's message queue
+debug_log = logging.getLogger("arduino.debug")
+
+# Printed by the sketch's setup(): the Arduino (re)started and waits for READY before it accepts START
+BOOT_LINE = "System initialized"
+
+
+# Write Arduino DEBUG lines to a file so they don't clutter the console
+def log_debug_to_file(path, logger=debug_log):
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+# Split a raw line into a typed Message
+def parse_line(line, received_at=None):
+    if received_at is None:
+        received_at = time.monotonic()
+
+    kind, sep, payload = line.partition(":")
+    kind = kind.strip()
+    payload = payload.strip() if sep else None
+    return Message(kind, payload, line, received_at)
+
+
+# Opening the port resets the Arduino; wait for the sketch to say it is up (setup() prints
+# "DEBUG: System initialized...") instead of always sleeping. Returns the seconds waited, or
+# None if the line never came (older firmware, or a board that doesn't reset on open).
+def wait_for_boot(ser, timeout=2.0, boot_line=BOOT_LINE.encode(), debug_logger=debug_log):
+    started = time.monotonic()
+    previous_timeout, ser.timeout = ser.timeout, 0.05
+    buffer = b""
+    try:
+        while time.monotonic() - started < timeout:
+            buffer += ser.read(ser.in_waiting or 1)
+            if boot_line in buffer:
+                debug_logger.info(buffer.decode(errors="replace").strip())
+                return time.monotonic() - started
+    finally:
+        ser.timeout = previous_timeout
+    return None
+
+
+########################################################################################
+
+
+class SerialTransport:
+    """Background reader that turns Arduino lines into Messages on a dispatch queue."""
+
+    def __init__(self, ser, debug_logger=debug_log, tap=None):
+        self.ser = ser
+        self.debug_logger = debug_logger
+        self.tap = tap  # Optional tap(direction, line) seeing every line, "rx" and "tx" (session recording)
+        self._messages = queue.Queue()
+        self._deferred = []  # Messages skipped by wait_for, handed out again by get()
+        self._write_lock = threading.Lock()
+        self._running = False
+        self._reader = None
+
+    @property
+    def is_open(self):
+        return self.ser is not None and self.ser.is_open
+
+    def start(self):
+        self._running = True
+        self._reader = threading.Thread(target=self._read_loop, name="serial-reader", daemon=True)
+        self._reader.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._reader:
+            self._reader.join(timeout=2)
+
+    def _read_loop(self):
+        while self._running and self.is_open:
+            try:
+                raw = self.ser.readline()  # Returns after the port timeout when idle
+            except serial.SerialException as e:
+                print(f"❌ ERROR: Serial read failed: {e}")
+                break
+            if not raw:
+                continue
+
+            line = raw.decode(errors="replace").strip()
+            if not line:
+                continue
+            if self.tap:
+                self.tap("rx", line)
+
+            message = parse_line(line)
+            if message.kind == "DEBUG":
+                self.debug_logger.info(message.payload)
+                self._check_boot(line)
+            else:
+                self._messages.put(message)
+
+    # A boot line seen while running means the Arduino was reset: hand the game a BOOT message
+    def _check_boot(self, text):
+        if BOOT_LINE in text:
+            self._messages.put(parse_line("BOOT"))
+
+    # Send one line to the Arduino
+    def send(self, text):
+        if not self.is_open:
+            print(f"❌ ERROR: Serial connection is closed. Cannot send: {text}")
+            return False
+        if self.tap:
+            self.tap("tx", text)
+        with self._write_lock:
+            self.ser.write(f"{text}\n".encode())
+        return True
+
+    def get(self, timeout=0):
+        """Next message (deferred ones first), or None if nothing arrives within timeout."""
+        if self._deferred:
+            return self._deferred.pop(0)
+        try:
+            return self._messages.get(timeout=timeout) if timeout else self._messages.get_nowait()
+        except queue.Empty:
+            return None
+
+    def wait_for(self, kind, timeout):
+        """Block until a message of the given kind arrives; None on timeout.
+
+        Other messages received meanwhile are kept and returned by later get() calls."""
+        deadline = time.monotonic() + timeout
+        for i, message in enumerate(self._deferred):
+            if message.kind == kind:
+                return self._deferred.pop(i)
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                message = self._messages.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if message.kind == kind:
+                return message
+            self._deferred.append(message)
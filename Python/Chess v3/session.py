@@ -0,0 +1,367 @@
+"""Record/replay of game sessions: camera frames, Arduino serial traffic and engine calls.
+
+A session is a directory holding events.jsonl (one timestamped event per line) and the
+recorded frames as lossless PNGs in frames/. Recording wraps the real camera and engine pool
+and taps the serial transport; replay substitutes a fake camera, a pty-backed stand-in Arduino
+and an engine that answers from the recording, so a whole game runs on a plain Linux box.
+"""
+import json
+import os
+import queue
+import select
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import chess
+import chess.engine
+import cv2
+
+from strength import ai_root_moves, candidates_from_infos
+
+EVENTS_FILE = "events.jsonl"
+FRAMES_DIR = "frames"
+
+
+class SessionRecorder:
+    """Appends timestamped events to a session directory; frames are written by a background thread."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.join(path, FRAMES_DIR), exist_ok=True)
+        self._events = open(os.path.join(path, EVENTS_FILE), "w", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._frames = queue.Queue()
+        self._frame_count = 0
+        self._start = time.monotonic()
+        self._writer = threading.Thread(target=self._write_frames, name="session-frames", daemon=True)
+        self._writer.start()
+
+    def now(self):
+        return time.monotonic() - self._start
+
+    def record(self, kind, **data):
+        event = {"t": round(self.now(), 4), "kind": kind, **data}
+        with self._lock:
+            self._events.write(json.dumps(event) + "\n")
+            self._events.flush()
+
+    # SerialTransport tap: every line in both directions (rx = from the Arduino)
+    def record_serial(self, direction, line):
+        self.record(direction, line=line)
+
+    def record_frame(self, frame):
+        with self._lock:
+            index = self._frame_count
+            self._frame_count += 1
+        name = f"{FRAMES_DIR}/{index:06d}.png"
+        self.record("frame", file=name)
+        self._frames.put((name, frame.copy()))
+
+    def _write_frames(self):
+        while True:
+            item = self._frames.get()
+            if item is None:
+                break
+            name, frame = item
+            cv2.imwrite(os.path.join(self.path, name), frame, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+
+    def close(self):
+        self._frames.put(None)
+        self._writer.join()
+        with self._lock:
+            self._events.close()
+        print(f"💾 Session recorded to {self.path} ({self._frame_count} frames)")
+
+
+class RecordingCapture:
+    """cv2.VideoCapture wrapper that records every grabbed frame."""
+
+    def __init__(self, cap, recorder):
+        self._cap = cap
+        self._recorder = recorder
+
+    def read(self):
+        ret, frame = self._cap.read()
+        if ret:
+            self._recorder.record_frame(frame)
+        return ret, frame
+
+    def __getattr__(self, name):
+        return getattr(self._cap, name)
+
+
+class RecordingEnginePool:
+    """EnginePool wrapper that records every analyse() call with its scored result and duration."""
+
+    def __init__(self, pool, recorder):
+        self._pool = pool
+        self._recorder = recorder
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        with self._pool.acquire(timeout) as engine:
+            yield _RecordingEngine(engine, self._recorder)
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+
+class _RecordingEngine:
+    def __init__(self, engine, recorder):
+        self._engine = engine
+        self._recorder = recorder
+
+    def analyse(self, board, limit, **kwargs):
+        start = time.perf_counter()
+        infos = self._engine.analyse(board, limit, **kwargs)
+        elapsed = time.perf_counter() - start
+        result = infos if isinstance(infos, list) else [infos]
+        self._recorder.record("engine", fen=board.fen(), multipv=kwargs.get("multipv"),
+                              candidates=[(m.uci(), cp) for m, cp in candidates_from_infos(result, board.turn)],
+                              elapsed=round(elapsed, 4))
+        return infos
+
+    def __getattr__(self, name):
+        return getattr(self._engine, name)
+
+
+########################################################################################
+
+
+def load_session(path):
+    with open(os.path.join(path, EVENTS_FILE), encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayClock:
+    """Session time during replay.
+
+    Runs in real time from the first frame read, but can be held at a recorded timestamp
+    while the stand-in Arduino waits for a reply the recording says came first; the time
+    spent held is skipped, so frames never run ahead of the serial conversation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = threading.Event()
+        self._start = 0.0
+        self._stalled = 0.0
+        self._hold = None
+
+    def start(self):
+        with self._lock:
+            if not self._started.is_set():
+                self._start = time.monotonic()
+                self._started.set()
+
+    def wait_started(self, timeout=None):
+        return self._started.wait(timeout)
+
+    def _elapsed(self):
+        return time.monotonic() - self._start - self._stalled
+
+    def now(self):
+        if not self._started.is_set():
+            return 0.0
+        with self._lock:
+            t = self._elapsed()
+            return min(t, self._hold) if self._hold is not None else t
+
+    def hold(self, t):
+        with self._lock:
+            self._hold = t if self._hold is None else min(self._hold, t)
+
+    def release(self):
+        with self._lock:
+            if self._hold is not None:
+                self._stalled += max(0.0, self._elapsed() - self._hold)
+                self._hold = None
+
+
+class ReplayCapture:
+    """Stands in for cv2.VideoCapture: serves recorded frames at their recorded session times.
+
+    Like a camera with a one-frame buffer, read() returns the newest frame due by now."""
+
+    def __init__(self, path, events, clock):
+        self.path = path
+        self.clock = clock
+        self._frames = [(e["t"], e["file"]) for e in events if e["kind"] == "frame"]
+        self._next = 0
+        self.served = 0
+
+    def isOpened(self):
+        return self._next < len(self._frames)
+
+    def read(self):
+        self.clock.start()
+        if self._next >= len(self._frames):
+            return False, None
+        while self._next + 1 < len(self._frames) and self._frames[self._next + 1][0] <= self.clock.now():
+            self._next += 1  # Drop frames we fell behind on
+        due, name = self._frames[self._next]
+        while self.clock.now() < due:
+            time.sleep(min(0.005, due - self.clock.now()))
+        self._next += 1
+        self.served += 1
+        return True, cv2.imread(os.path.join(self.path, name))
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        return 0
+
+    def release(self):
+        self._next = len(self._frames)
+
+
+class ReplayArduino:
+    """Stand-in Arduino on a pty: replays the recorded Arduino lines and times the replies.
+
+    Each recorded line is sent at its session time, but not before the game has sent as many
+    lines as it had by then in the recording, so the conversation keeps its order however fast
+    or slow the host is. Reply latency is measured from each line sent to the next line back."""
+
+    def __init__(self, events, clock, stall_timeout=30.0):
+        self.clock = clock
+        self.stall_timeout = stall_timeout  # Give up on a reply the game never sends
+        self._script = []  # (session time, line, tx lines recorded before it)
+        self.expected_tx = []
+        for e in events:
+            if e["kind"] == "tx" and e["line"] != "READY":  # Startup handshake, not part of the game
+                self.expected_tx.append(e["line"])
+            elif e["kind"] == "rx":
+                self._script.append((e["t"], e["line"], len(self.expected_tx)))
+
+        self.received_tx = []
+        self.latencies = defaultdict(list)  # Arduino message kind -> reply latency in ms
+        self.stalls = 0
+        self._awaiting = deque()  # (kind, sent at) of lines not replied to yet
+        self._cond = threading.Condition()
+        self._running = False
+        self.done = threading.Event()
+
+        self._master, self._slave = os.openpty()
+        self.port = os.ttyname(self._slave)
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._read_loop, name="replay-arduino-rx", daemon=True).start()
+        threading.Thread(target=self._send_loop, name="replay-arduino-tx", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+
+    def _read_loop(self):
+        buffer = b""
+        while self._running:
+            ready, _, _ = select.select([self._master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                buffer += os.read(self._master, 4096)
+            except OSError:
+                break
+            while b"\n" in buffer:
+                raw, buffer = buffer.split(b"\n", 1)
+                line = raw.decode(errors="replace").strip()
+                if not line or line == "READY":
+                    continue
+                now = time.monotonic()
+                with self._cond:
+                    self.received_tx.append(line)
+                    if self._awaiting:
+                        kind, sent_at = self._awaiting.popleft()
+                        self.latencies[kind].append((now - sent_at) * 1000)
+                    self._cond.notify_all()
+
+    def _send_loop(self):
+        self.clock.wait_started()
+        for due, line, required_tx in self._script:
+            with self._cond:
+                if len(self.received_tx) < required_tx:
+                    self.clock.hold(due)
+                    if not self._cond.wait_for(lambda: len(self.received_tx) >= required_tx or not self._running,
+                                               timeout=self.stall_timeout):
+                        self.stalls += 1
+                        print(f"⚠ Replay: no reply after {self.stall_timeout:.0f} s, sending {line} anyway")
+                    self.clock.release()
+            if not self._running:
+                return
+            while self.clock.now() < due:
+                time.sleep(min(0.005, due - self.clock.now()))
+            with self._cond:
+                self._awaiting.clear()  # Only the first reply to a line counts
+                self._awaiting.append((line.partition(":")[0], time.monotonic()))
+            os.write(self._master, f"{line}\n".encode())
+        self.done.set()
+
+    def report(self):
+        def summary(values):
+            ordered = sorted(values)
+            return {
+                "count": len(ordered),
+                "p50_ms": round(statistics.median(ordered), 1),
+                "p95_ms": round(ordered[max(0, int(len(ordered) * 0.95) - 1)], 1),
+                "max_ms": round(ordered[-1], 1),
+            }
+
+        mismatches = sum(a != b for a, b in zip(self.received_tx, self.expected_tx))
+        mismatches += abs(len(self.received_tx) - len(self.expected_tx))
+        return {
+            "latency": {kind: summary(values) for kind, values in sorted(self.latencies.items())},
+            "tx_lines": len(self.received_tx),
+            "tx_mismatches": mismatches,
+            "stalls": self.stalls,
+        }
+
+
+class ReplayEnginePool:
+    """Stands in for EnginePool: answers searches with the recorded results (no Stockfish needed).
+
+    A position the AI moved from answers with that recorded move only, so the replayed game
+    follows the recording whatever the difficulty curve would pick. engine_time "recorded"
+    sleeps for the recorded search time, "zero" answers at once."""
+
+    def __init__(self, events, engine_time="recorded"):
+        self.engine_time = engine_time
+        self._ai_moves = defaultdict(deque)  # fen -> moves the AI played there, in order
+        self._searches = defaultdict(deque)  # fen -> (candidates, elapsed)
+        for e in events:
+            if e["kind"] == "ai_move":
+                self._ai_moves[e["fen"]].append(e["move"])
+            elif e["kind"] == "engine":
+                self._searches[e["fen"]].append((e["candidates"], e["elapsed"]))
+        self.misses = 0
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        yield self
+
+    def analyse(self, board, limit, multipv=None, root_moves=None, options=None, **kwargs):
+        fen = board.fen()
+        searches = self._searches.get(fen)
+        candidates, elapsed = searches.popleft() if searches else (None, 0.0)
+        if self._ai_moves.get(fen):
+            candidates = [(self._ai_moves[fen].popleft(), 0)]
+        if not candidates:
+            self.misses += 1
+            candidates = [((root_moves or ai_root_moves(board))[0].uci(), 0)]
+        if self.engine_time == "recorded":
+            time.sleep(elapsed)
+
+        infos = [{"pv": [chess.Move.from_uci(uci)], "score": chess.engine.PovScore(chess.engine.Cp(cp), board.turn),
+                  "multipv": i + 1} for i, (uci, cp) in enumerate(candidates)]
+        return infos if multipv else infos[0]
+
+    def analysis(self, *args, **kwargs):
+        raise chess.engine.EngineError("pondering is not replayed")
+
+    def close(self):
+        pass
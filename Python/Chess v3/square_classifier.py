@@ -0,0 +1,124 @@
+"""Per-square classifier: a lighter alternative to full-frame YOLO detection.
+
+With the board and camera fixed, there is no need to search the frame for boxes. The board is
+warped to a top-down view with the calibration homography, cut into 64 tiles (with a margin, as
+tall pieces lean into the next square), and all tiles are classified in one batched pass into 13
+classes: "empty" plus the 12 YOLO piece labels. No NMS and no box-to-square mapping; every square
+gets exactly one answer. The model is a small Ultralytics classification network trained on tiles
+labeled by the YOLO path (see train_square_classifier.py), exportable to ONNX/OpenVINO like best.pt.
+"""
+import os
+import shutil
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from board_calibration import compute_homography, transform_points
+from detector_backends import BACKENDS, exported_model_path
+
+CLASSIFIER_WEIGHTS = "square_classifier.pt"
+EMPTY_CLASS = "empty"
+PIECE_CLASSES = ("white-pawn", "white-knight", "white-bishop", "white-rook", "white-queen", "white-king",
+                 "black-pawn", "black-knight", "black-bishop", "black-rook", "black-queen", "black-king")
+CLASSES = (EMPTY_CLASS,) + PIECE_CLASSES  # Also the dataset's folder names (case-safe on Windows)
+
+SQUARE_PX = 48   # Side of one square in the top-down view
+TILE_MARGIN = 8  # Pixels of the neighbouring squares around each tile
+TILE_SIZE = SQUARE_PX + 2 * TILE_MARGIN  # 64: the classifier's imgsz (a multiple of its stride)
+
+# Classes of one frame's 64 squares (index a1=0 ... h8=63) as NumPy arrays; cls is -1 below the confidence
+Squares = namedtuple("Squares", ["cls", "conf"])
+
+
+class BoardWarper:
+    """Cuts one camera's board into 64 tiles; built once per calibration."""
+
+    def __init__(self, corners):
+        # Board plane (files along x, ranks along y, in squares) -> top-down pixels, rank 8 at the top
+        plane_to_view = np.float64([[SQUARE_PX, 0, TILE_MARGIN],
+                                    [0, -SQUARE_PX, TILE_MARGIN + 8 * SQUARE_PX],
+                                    [0, 0, 1]])
+        H = compute_homography(corners)
+        self.matrix = plane_to_view @ H
+        self.view_size = 8 * SQUARE_PX + 2 * TILE_MARGIN
+
+        # Each square's bounding box in the camera image, for the preview and the tracker's detections
+        H_inv = np.linalg.inv(H)
+        self.square_boxes = []
+        for square in range(64):
+            file, rank = square % 8, square // 8
+            outline = transform_points(H_inv, [(file, rank), (file + 1, rank), (file + 1, rank + 1), (file, rank + 1)])
+            x1, y1 = outline.min(axis=0)
+            x2, y2 = outline.max(axis=0)
+            self.square_boxes.append((int(x1), int(y1), int(x2), int(y2)))
+
+    def warp(self, frame):
+        return cv2.warpPerspective(frame, self.matrix, (self.view_size, self.view_size), flags=cv2.INTER_LINEAR)
+
+    def tiles(self, frame):
+        """The 64 tiles of a frame as one (64, TILE_SIZE, TILE_SIZE, 3) BGR array, in square index order."""
+        view = self.warp(frame)
+        windows = np.lib.stride_tricks.sliding_window_view(view, (TILE_SIZE, TILE_SIZE), axis=(0, 1))
+        windows = windows[::SQUARE_PX, ::SQUARE_PX][::-1]  # 8 x 8 tiles, rank 1 first
+        return np.ascontiguousarray(windows.reshape(64, 3, TILE_SIZE, TILE_SIZE).transpose(0, 2, 3, 1))
+
+
+# BGR uint8 tiles -> N x 3 x S x S float RGB in [0, 1], as the classifier was trained
+def tiles_to_tensor(tiles):
+    return np.ascontiguousarray(tiles[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+
+
+########################################################################################
+
+
+def export_classifier(weights, backend):
+    """Export the classifier for a backend (dynamic batch: 64 tiles per camera) and return its path."""
+    from ultralytics import YOLO
+
+    target = exported_model_path(weights, backend, TILE_SIZE)
+    if backend == "torch" or os.path.exists(target):
+        return target
+
+    print(f"📦 Exporting {weights} to {backend}...")
+    exported = YOLO(weights).export(format=backend, imgsz=TILE_SIZE, dynamic=True)
+    shutil.move(exported, target)
+    return target
+
+
+class SquareClassifier:
+    """Classifies the 64 squares of each frame in one batched call; a drop-in for YoloDetector."""
+
+    def __init__(self, weights=CLASSIFIER_WEIGHTS, backend="torch", warper=None, conf=0.4):
+        import torch
+        from ultralytics import YOLO
+
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown classifier backend: {backend} (choose from {', '.join(BACKENDS)})")
+        self._torch = torch
+        self.backend = backend
+        self.warper = warper  # BoardWarper of the camera, when predict() isn't given one per frame
+        self.conf = conf      # Pieces below this probability are left out, like YOLO boxes below conf
+        self.model = YOLO(export_classifier(weights, backend), task="classify")
+        self.names = self.model.names
+
+    def __call__(self, frame):
+        return self.predict([frame])[0]
+
+    # One throwaway inference at startup, so the first real frame doesn't pay the warm-up cost
+    def warm_up(self, frame_shape):
+        self(np.zeros((frame_shape[0], frame_shape[1], 3), dtype=np.uint8))
+
+    def predict(self, frames, rois=None):
+        """Classify the squares of several frames in one pass; returns one Squares per frame.
+
+        rois gives each frame its own BoardWarper (frames of several cameras); default self.warper."""
+        warpers = rois or [self.warper] * len(frames)
+        tiles = np.concatenate([warper.tiles(frame) for frame, warper in zip(frames, warpers)])
+        results = self.model(self._torch.from_numpy(tiles_to_tensor(tiles)), imgsz=TILE_SIZE, verbose=False)
+
+        probs = np.stack([r.probs.data.cpu().numpy() for r in results])
+        cls = probs.argmax(axis=1)
+        conf = probs[np.arange(len(cls)), cls]
+        cls[conf < self.conf] = -1
+        return [Squares(cls[i:i + 64], conf[i:i + 64]) for i in range(0, len(cls), 64)]
@@ -0,0 +1,57 @@
+"""Concurrent startup: the slow, independent parts of bringing a table up run side by side.
+
+Opening the serial port (and waiting for the Arduino to come out of reset), loading YOLO plus
+a warm-up inference, opening the camera and spawning Stockfish each take from under a second to
+several seconds and don't need each other, so they run in threads and the table is ready about
+as soon as the slowest of them is. Run them one after another (parallel=False) to compare.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Startup:
+    def __init__(self, parallel=True, registry=None):
+        self.parallel = parallel
+        self.registry = registry  # Metrics registry for startup_<task> timings, or None
+        self.timings = {}  # Task name -> seconds
+        self.wall = None   # Seconds from run() to the last task finishing
+        self._tasks = []
+
+    def add(self, name, func):
+        self._tasks.append((name, func))
+
+    def _timed(self, name, func):
+        started = time.perf_counter()
+        try:
+            if self.registry:
+                with self.registry.timer(f"startup_{name}"):
+                    return func()
+            return func()
+        finally:
+            self.timings[name] = time.perf_counter() - started
+
+    def run(self):
+        """Run every task; returns {name: result}. A failure is raised once all tasks have finished."""
+        self.timings = {name: 0.0 for name, _ in self._tasks}  # Reported in the order the tasks were added
+        started = time.perf_counter()
+        if self.parallel and len(self._tasks) > 1:
+            with ThreadPoolExecutor(max_workers=len(self._tasks), thread_name_prefix="startup") as executor:
+                futures = [(name, executor.submit(self._timed, name, func)) for name, func in self._tasks]
+            results = {name: future.result() for name, future in futures}
+        else:
+            results = {name: self._timed(name, func) for name, func in self._tasks}
+        self.wall = time.perf_counter() - started
+        return results
+
+    def report(self):
+        return {
+            "parallel": self.parallel,
+            "wall_s": round(self.wall, 3),
+            "sum_s": round(sum(self.timings.values()), 3),  # What the same tasks take one after another
+            "tasks_s": {name: round(seconds, 3) for name, seconds in self.timings.items()},
+        }
+
+    def format_report(self):
+        tasks = ", ".join(f"{name} {seconds:.1f} s" for name, seconds in self.timings.items())
+        mode = "in parallel" if self.parallel else "one after another"
+        return f"🚀 Ready in {self.wall:.1f} s ({mode}: {tasks})"
@@ -0,0 +1,93 @@
+import math
+import random
+from collections import namedtuple
+
+import chess
+import chess.engine
+
+# How the AI plays at a difficulty: one MultiPV search, then a move picked by the Elo curve.
+# limit is the search on the reference host; engine_config.SearchLimits turns it into this
+# host's time or node budget, or uses depth instead.
+StrengthProfile = namedtuple("StrengthProfile", ["elo", "limit", "multipv", "depth"])
+
+DIFFICULTY_PROFILES = {
+    "easy": StrengthProfile(elo=1000, limit=chess.engine.Limit(time=0.5), multipv=8, depth=8),
+    "hard": StrengthProfile(elo=2000, limit=chess.engine.Limit(time=1.5), multipv=4, depth=14),
+}
+
+# Elo -> (temperature in centipawns, blunder chance), linearly interpolated between points.
+# Temperature spreads the choice over near-best moves; a blunder picks any candidate.
+ELO_CURVE = [
+    (800, 250, 0.25),
+    (1200, 120, 0.10),
+    (1600, 60, 0.04),
+    (2000, 25, 0.01),
+    (2400, 8, 0.0),
+    (2800, 0, 0.0),
+]
+
+MATE_SCORE = 100000
+
+
+def curve_at(elo, curve=ELO_CURVE):
+    """(temperature_cp, blunder_chance) for an Elo rating."""
+    if elo <= curve[0][0]:
+        return curve[0][1:]
+    for (elo_a, temp_a, blunder_a), (elo_b, temp_b, blunder_b) in zip(curve, curve[1:]):
+        if elo <= elo_b:
+            t = (elo - elo_a) / (elo_b - elo_a)
+            return temp_a + t * (temp_b - temp_a), blunder_a + t * (blunder_b - blunder_a)
+    return curve[-1][1:]
+
+
+# Moves the trolley can play: no castling, no en passant, promotions only to a Queen
+def ai_root_moves(board):
+    moves = [m for m in board.legal_moves
+             if not board.is_castling(m) and not board.is_en_passant(m)
+             and m.promotion in (None, chess.QUEEN)]
+    if not moves:  # Only special moves are legal: better an odd move than no move
+        print("⚠ Only castling/en passant available to the AI, allowing them.")
+        moves = list(board.legal_moves)
+    return moves
+
+
+# Scored candidates [(move, centipawns for the side to move)], best first
+def candidates_from_infos(infos, turn):
+    candidates = []
+    for info in infos:
+        if info.get("pv") and "score" in info:
+            candidates.append((info["pv"][0], info["score"].pov(turn).score(mate_score=MATE_SCORE)))
+    candidates.sort(key=lambda c: -c[1])
+    return candidates
+
+
+# What a difficulty searches (not its Elo, applied after the search): the move cache's key, so
+# candidates found under an older profile or limit kind aren't served once it changes
+def profile_signature(difficulty, profile, search_limits=None):
+    kind = search_limits.kind if search_limits else "profile"
+    return f"{difficulty}|{kind}|{profile.limit}|depth={profile.depth}|multipv={profile.multipv}"
+
+
+def analyse_candidates(engine, board, limit, multipv, options=None, game=None):
+    """The one bounded search of an AI turn: MultiPV over the moves the trolley can play.
+
+    game identifies the game: the engine gets ucinewgame (and clears its hash) when it changes."""
+    root_moves = ai_root_moves(board)
+    infos = engine.analyse(board, limit, multipv=min(multipv, len(root_moves)),
+                           root_moves=root_moves, options=options or {}, game=game)
+    return candidates_from_infos(infos, board.turn)
+
+
+def choose_move(candidates, elo, rng=random):
+    """Pick a move from scored candidates the way a player of the given Elo would."""
+    temperature, blunder_chance = curve_at(elo)
+    moves = [move for move, _ in candidates]
+
+    if len(moves) > 1 and rng.random() < blunder_chance:
+        return rng.choice(moves[1:])
+    if temperature <= 0:
+        return moves[0]
+
+    best = candidates[0][1]
+    weights = [math.exp(-(best - score) / temperature) for _, score in candidates]
+    return rng.choices(moves, weights)[0]
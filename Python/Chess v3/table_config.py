@@ -0,0 +1,57 @@
+"""Settings shared by chess_test.py (one table) and table_server.py (several tables per process).
+
+Anything that only one of them uses (serial port and camera index of the single table, preview,
+pipeline mode, engine workers of the server, ...) stays at the top of that script.
+"""
+
+# Serial link, as set in the sketch's global.h (SERIAL_BAUD / FRAMED_PROTOCOL)
+SERIAL_BAUD = 115200
+SERIAL_PROTOCOL = "framed"  # "framed" (CRC, acks, compact messages) or "text" (one line per message)
+ARDUINO_BOOT_TIMEOUT = 2.0  # Longest wait for the Arduino to come out of the reset that opening the port causes
+
+# Per-stage latency histograms and event counters (see metrics.py)
+METRICS_FILE = "metrics.jsonl"   # Snapshot appended every METRICS_INTERVAL seconds; None to disable
+METRICS_INTERVAL = 10.0
+METRICS_PORT = 9108              # Prometheus text endpoint at http://127.0.0.1:9108/metrics; None to disable
+
+# Controls without the window: "quit", "reset" and "status" on the control socket or typed in the console
+CONTROL_PORT = 9109  # Local TCP port (echo reset | nc 127.0.0.1 9109); None to disable
+
+# Move the trolley towards the AI's likely next move while the human thinks
+PRE_POSITION_TROLLEY = True
+
+# Stockfish Engine
+STOCKFISH_PATH = "stockfish/stockfish-windows-x86-64-avx2.exe"
+PONDER_CANDIDATES = 4  # Human moves to prepare a reply for
+MOVE_CACHE_FILE = "ai_move_cache.sqlite"  # Searched positions survive restarts; None keeps them in memory only
+MOVE_CACHE_SIZE = 50000                   # Positions kept (least recently used are evicted)
+OPENING_BOOK = None                       # Path to a Polyglot .bin book, consulted before the engine
+SEARCH_LIMIT_KIND = "time"  # Difficulty as "time" (calibrated by a one-off `bench`), "nodes" or "depth"
+
+# Webcam
+FRAME_WIDTH, FRAME_HEIGHT = 1280, 720
+
+# Define chessboard grid (used until board_calibration.py has been run)
+BOARD_X_MIN, BOARD_X_MAX = 340, 940
+BOARD_Y_MIN, BOARD_Y_MAX = 60, 660
+
+# YOLO Model (Ensure best.pt is in the same directory)
+DETECTOR_WEIGHTS = "best.pt"
+DETECTOR_BACKEND = "torch"   # "torch", "onnx" or "openvino" (exported from best.pt on first use)
+DETECTOR_IMGSZ = 640         # Smaller sizes are faster on CPU, check bench_detector.py for accuracy
+DETECTOR_INT8 = False        # int8 quantization (see detector_backends.py for calibration data)
+DETECTOR_CROP_MARGIN = 40    # Run on the board crop plus this margin; None for the full frame
+
+# Recognition: "detector" (YOLO boxes on the frame) or "classifier" (the 64 warped squares, see square_classifier.py)
+RECOGNITION = "detector"
+CLASSIFIER_WEIGHTS = "square_classifier.pt"  # Trained by train_square_classifier.py; runs on DETECTOR_BACKEND
+
+# Multi-frame consensus: squares are voted on over the last few frames, weighted by confidence
+TRACKER_HISTORY = 5       # Frames kept in the ring buffer
+MIN_SQUARE_CERTAINTY = 0.6  # Squares below this are reported when converting to FEN
+
+# Motion gating: only run YOLO once the board changed and settled, or when the Arduino asks
+MOTION_ROI_MARGIN = 40  # Pixels around the board that still count (hands reaching in)
+
+# Human move detection: squares the best legal move may differ from the detected board
+MOVE_MATCH_TOLERANCE = 0
@@ -0,0 +1,263 @@
+"""Runs several chess tables from one process.
+
+Every table (a camera + Arduino pair) gets its own GameSession, capture thread and controller
+thread. The heavy parts are shared: one YOLO model runs batched over the newest frames of all
+cameras, and a bounded Stockfish pool serves the tables round robin, pondering only when no
+table is waiting for a move. Start it with a JSON file describing the tables:
+    python table_server.py tables.json
+
+    {
+      "engine_workers": 2,
+      "tables": [
+        {"name": "table-1", "camera": 0, "serial_port": "COM5", "calibration": "board_calibration_1.json"},
+        {"name": "table-2", "camera": 1, "serial_port": "COM6", "calibration": "board_calibration_2.json"}
+      ]
+    }
+Per table, "baud" and "protocol" override SERIAL_BAUD / SERIAL_PROTOCOL. The server is
+headless; control it on the control socket or console ("reset table-1", "status", "quit").
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+
+import cv2
+import serial
+
+from board_calibration import board_roi, build_square_lut, compute_homography, default_corners, load_calibration
+from board_tracker import BoardStateTracker
+from control import ControlQueue, ControlServer, read_console
+from detector_backends import YoloDetector
+from engine_config import SearchLimits, calibrate, engine_options
+from engine_pool import EnginePool, FairEnginePool
+from game_session import GameSession, map_detections, map_squares
+from journal import GameJournal
+from metrics import JsonlExporter, Metrics, MetricsServer, metrics
+from motion_gate import MotionGate
+from motion_planner import MotionPlanner
+from move_cache import MoveCache, OpeningBook
+from pipeline import BatchInferenceStage, CameraFeed, CaptureStage, FpsCounter, LatestQueue, ResultQueue
+from ponder import Ponderer
+from protocol import FramedTransport
+from serial_transport import SerialTransport, log_debug_to_file, wait_for_boot
+from square_classifier import BoardWarper, SquareClassifier
+from strength import DIFFICULTY_PROFILES
+from table_config import (ARDUINO_BOOT_TIMEOUT, BOARD_X_MAX, BOARD_X_MIN, BOARD_Y_MAX, BOARD_Y_MIN, CLASSIFIER_WEIGHTS,
+                          CONTROL_PORT, DETECTOR_BACKEND, DETECTOR_CROP_MARGIN, DETECTOR_IMGSZ, DETECTOR_INT8,
+                          DETECTOR_WEIGHTS, FRAME_HEIGHT, FRAME_WIDTH, METRICS_FILE, METRICS_INTERVAL, METRICS_PORT,
+                          MIN_SQUARE_CERTAINTY, MOTION_ROI_MARGIN, MOVE_CACHE_FILE, MOVE_CACHE_SIZE,
+                          MOVE_MATCH_TOLERANCE, OPENING_BOOK, PONDER_CANDIDATES, PRE_POSITION_TROLLEY, RECOGNITION,
+                          SEARCH_LIMIT_KIND, SERIAL_BAUD, SERIAL_PROTOCOL, STOCKFISH_PATH, TRACKER_HISTORY)
+
+ENGINE_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # Leave the other cores to YOLO and capture
+STATS_INTERVAL = 30.0  # Seconds between console summaries
+
+
+class Table:
+    """One camera + Arduino pair: capture thread, GameSession and the controller thread driving it."""
+
+    def __init__(self, spec, detector, engines, move_cache, opening_book, search_limits=None):
+        self.name = spec["name"]
+        self.registry = Metrics({"table": self.name})
+
+        # Serial link; opening it resets the Arduino, so wait for its boot line like chess_test.py
+        debug_logger = log_debug_to_file(f"arduino_debug_{self.name}.log", logging.getLogger(f"arduino.debug.{self.name}"))
+        try:
+            ser = serial.Serial(spec["serial_port"], spec.get("baud", SERIAL_BAUD), timeout=1)
+            if wait_for_boot(ser, ARDUINO_BOOT_TIMEOUT, debug_logger=debug_logger) is None:
+                print(f"⚠ [{self.name}] No boot message from the Arduino within {ARDUINO_BOOT_TIMEOUT:.0f} s, carrying on.")
+            print(f"✅ [{self.name}] Serial connection established on {spec['serial_port']}.")
+        except serial.SerialException:
+            print(f"❌ [{self.name}] Unable to connect to Arduino on {spec['serial_port']}.")
+            ser = None
+        transport_class = FramedTransport if spec.get("protocol", SERIAL_PROTOCOL) == "framed" else SerialTransport
+        self.transport = transport_class(ser, debug_logger=debug_logger).start() if ser else None
+
+        # Camera and its calibration
+        self.cap = cv2.VideoCapture(spec["camera"])
+        self.cap.set(3, FRAME_WIDTH)
+        self.cap.set(4, FRAME_HEIGHT)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        corners = load_calibration(spec["calibration"]) if spec.get("calibration") else None
+        corners = corners or default_corners(BOARD_X_MIN, BOARD_X_MAX, BOARD_Y_MIN, BOARD_Y_MAX)
+        square_lut = build_square_lut(compute_homography(corners), FRAME_WIDTH, FRAME_HEIGHT)
+        frame_shape = (FRAME_HEIGHT, FRAME_WIDTH)
+        gate = MotionGate(board_roi(corners, MOTION_ROI_MARGIN, frame_shape))
+
+        # Engines: AI moves borrow in the foreground, pondering in the background (and yields when asked)
+        ponder_client = engines.client(self.name, background=True)
+        self.ponderer = Ponderer(ponder_client, candidates=PONDER_CANDIDATES)
+        ponder_client.on_preempt = self.ponderer.interrupt
+        ponder_client.cancelled = lambda: self.ponderer.interrupted
+
+        # Journal of this table's games: the game in progress survives a restart
+        self.journal = GameJournal(f"game_journal_{self.name}.log", f"games_{self.name}.pgn", site=self.name)
+
+        self.session = GameSession(self.transport, engines.client(self.name, registry=self.registry), move_cache,
+                                   opening_book, name=self.name, ponderer=self.ponderer,
+                                   motion_planner=MotionPlanner(), motion_gate=gate,
+                                   tracker=BoardStateTracker(history=TRACKER_HISTORY), metrics=self.registry,
+                                   min_square_certainty=MIN_SQUARE_CERTAINTY, move_match_tolerance=MOVE_MATCH_TOLERANCE,
+                                   pre_position_trolley=PRE_POSITION_TROLLEY, search_limits=search_limits,
+                                   journal=self.journal)
+
+        frames, self.results = LatestQueue(), ResultQueue()
+        self.capture = CaptureStage(self.cap, frames, name=f"capture-{self.name}", registry=self.registry)
+        if RECOGNITION == "classifier":  # The feed's "roi" is its board warp
+            warper = BoardWarper(corners)
+            self.feed = CameraFeed(self.name, frames, self.results, gate, warper,
+                                   lambda found: map_squares(found, detector.names, warper.square_boxes))
+        else:
+            self.feed = CameraFeed(self.name, frames, self.results, gate,
+                                   board_roi(corners, DETECTOR_CROP_MARGIN, frame_shape),
+                                   lambda found: map_detections(found, detector.names, square_lut))
+        self.controller = FpsCounter()
+        self._stop = threading.Event()
+        self._reset = threading.Event()  # Set by the control thread, applied on the table's own thread
+        self._thread = threading.Thread(target=self._run, name=f"table-{self.name}", daemon=True)
+
+    def start(self):
+        self.capture.start()
+        self._thread.start()
+        return self
+
+    # Controller: newest inference result into the session, then the Arduino conversation
+    def _run(self):
+        while not self._stop.is_set() and not self.capture.stopped:
+            if self._reset.is_set():
+                self._reset.clear()
+                self.session.reset()
+                self.session.log("🔄 Game Ended. Press Start Button for a new game.")
+            latest = self.results.get(timeout=0.01)
+            if latest and latest.inferred:
+                self.session.update_board(latest.detections, latest.captured_at, changed=latest.changed)
+            self.session.poll()
+            self.controller.tick()
+
+    def request_reset(self):
+        self._reset.set()
+
+    def status(self):
+        state = "playing" if self.session.game_started else "waiting for START"
+        return f"{self.name}: {state}, difficulty={self.session.difficulty}, fen={self.session.board.fen()}"
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def stop(self):
+        self._stop.set()
+        self.capture.stop()
+        self._thread.join(timeout=2)
+        self.capture.join(timeout=1)
+        self.session.close()
+        self.journal.close()
+        self.cap.release()
+        if self.transport:
+            self.transport.stop()
+
+    def format_stats(self):
+        return (f"🎥 [{self.name}] capture {self.capture.counter.fps:.1f} fps, controller {self.controller.fps:.0f} Hz, "
+                f"YOLO skipped {self.feed.gate.skipped}/{self.feed.gate.skipped + self.feed.gate.inferred} frames")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several chess tables from one process.")
+    parser.add_argument("config", help="JSON file listing the tables (see the module docstring)")
+    args = parser.parse_args()
+    with open(args.config, encoding="utf-8") as f:
+        config = json.load(f)
+
+    # Shared by every table
+    if RECOGNITION == "classifier":
+        detector = SquareClassifier(CLASSIFIER_WEIGHTS, backend=DETECTOR_BACKEND)
+    else:
+        detector = YoloDetector(DETECTOR_WEIGHTS, backend=DETECTOR_BACKEND, imgsz=DETECTOR_IMGSZ, conf=0.4,
+                                int8=DETECTOR_INT8)
+    workers = config.get("engine_workers", ENGINE_WORKERS)
+    engine_settings = engine_options(workers)  # Threads and Hash split between the workers
+    engines = FairEnginePool(EnginePool(STOCKFISH_PATH, size=workers, options=engine_settings))
+    search_limits = SearchLimits(SEARCH_LIMIT_KIND)
+    if SEARCH_LIMIT_KIND == "time":
+        search_limits.nps = calibrate(STOCKFISH_PATH, engine_settings)
+    move_cache = MoveCache(MOVE_CACHE_FILE, capacity=MOVE_CACHE_SIZE)
+    opening_book = OpeningBook(OPENING_BOOK)
+    print(f"♟ {len(config['tables'])} tables, {workers} Stockfish workers {engine_settings}, "
+          f"one {DETECTOR_BACKEND} {RECOGNITION}")
+    print(search_limits.describe(DIFFICULTY_PROFILES))
+
+    tables = [Table(spec, detector, engines, move_cache, opening_book, search_limits) for spec in config["tables"]]
+    inference = BatchInferenceStage(detector, [table.feed for table in tables])
+    for table in tables:
+        table.start()
+    inference.start()
+    for table in tables:  # Only now may the Arduinos accept START: camera, model, engines and serial are up
+        table.session.send_ready()
+
+    metrics.labels["table"] = "shared"  # Batched inference and anything else not tied to one table
+    registries = [metrics] + [table.registry for table in tables]
+    metrics_exporter = JsonlExporter(registries, METRICS_FILE, METRICS_INTERVAL) if METRICS_FILE else None
+    if metrics_exporter:
+        metrics_exporter.start()
+    try:
+        metrics_server = MetricsServer(registries, METRICS_PORT).start() if METRICS_PORT else None
+    except OSError as e:
+        print(f"⚠ Metrics endpoint disabled: {e}")
+        metrics_server = None
+
+    controls = ControlQueue()
+    try:
+        control_server = ControlServer(controls, CONTROL_PORT,
+                                       status=lambda: " | ".join(t.status() for t in tables)).start()
+    except OSError as e:
+        print(f"⚠ Control socket disabled: {e}")
+        control_server = None
+    read_console(controls)
+
+    last_report = time.perf_counter()
+    try:
+        while any(table.running for table in tables):
+            time.sleep(0.1)
+            command = controls.get()
+            if command and command.name == "quit":
+                print(f"❌ Exiting program ({command.source})...")
+                break
+            if command and command.name == "reset":
+                for table in tables:
+                    if not command.args or table.name in command.args:
+                        table.request_reset()
+            if command and command.name == "status":
+                for table in tables:
+                    print(f"ℹ {table.status()}")
+            if time.perf_counter() - last_report > STATS_INTERVAL:
+                last_report = time.perf_counter()
+                for table in tables:
+                    print(table.format_stats())
+                print(f"📊 Batched YOLO: {inference.counter.fps:.1f} batches/s, {inference.mean_batch:.1f} frames per batch")
+                print(engines.format_stats())
+    except KeyboardInterrupt:
+        print("❌ Exiting program...")
+
+    inference.stop()
+    inference.join(timeout=2)
+    for table in tables:
+        table.stop()
+        print(table.ponderer.format_stats())
+    engines.close()
+    move_cache.close()
+    opening_book.close()
+    if metrics_exporter:
+        metrics_exporter.stop()
+    if metrics_server:
+        metrics_server.stop()
+    if control_server:
+        control_server.stop()
+    print(engines.format_stats())
+    for registry in registries:
+        print(registry.format_summary())
+
+
+if __name__ == "__main__":
+    main()
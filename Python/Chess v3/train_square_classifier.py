@@ -0,0 +1,145 @@
+"""Build the square classifier's dataset from recorded frames, train it and export it.
+
+Every frame is labeled by the existing YOLO path (PyTorch, full frame, imgsz 640, the same
+reference bench_detector.py uses), then cut into its 64 tiles and filed by class. Frames where
+any piece was detected below --min-conf are left out rather than teaching the classifier YOLO's
+doubts. Whole frames go to the validation split (every VAL_EVERY-th), so no position is in both.
+    python bench_detector.py --record 300 --frames frames/     (play a few games while recording)
+    python train_square_classifier.py --frames frames/ --export onnx
+
+The dataset folder also gets labels.json (frame -> split and board). bench_classifier.py takes
+its frames from there; for accuracy it needs a copy with the boards checked by hand (--truth).
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+
+import chess
+import cv2
+
+from board_calibration import CALIBRATION_FILE, build_square_lut, compute_homography, default_corners, load_calibration
+from detector_backends import BACKENDS, YoloDetector
+from game_session import map_detections, piece_short_names
+from square_classifier import (CLASSES, CLASSIFIER_WEIGHTS, EMPTY_CLASS, TILE_SIZE, BoardWarper,
+                               export_classifier)
+
+DATASET_DIR = "square_dataset"
+BASE_MODEL = "yolov8n-cls.pt"  # Ultralytics classification network the classifier is fine-tuned from
+MIN_LABEL_CONF = 0.6
+VAL_EVERY = 5
+EMPTY_PER_FRAME = 8  # Empty tiles kept per frame; they outnumber every piece class otherwise
+
+piece_labels = {short: label for label, short in piece_short_names.items()}
+
+
+def frame_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, "*.png")) + glob.glob(os.path.join(directory, "*.jpg")))
+
+
+# YOLO's board of one frame, or None when a piece was found below min_conf
+def label_frame(detector, frame, lut, min_conf):
+    board_state, detections = map_detections(detector(frame), detector.names, lut)
+    best_conf = {}
+    for *_, square, conf in detections:
+        if square:
+            best_conf[square] = max(conf, best_conf.get(square, 0))
+    if any(best_conf[square] < min_conf for square in board_state):
+        return None
+    return board_state
+
+
+def board_to_fen(board_state):
+    board = chess.Board(None)
+    for square, piece in board_state.items():
+        board.set_piece_at(chess.parse_square(square), chess.Piece.from_symbol(piece))
+    return board.board_fen()
+
+
+def build_dataset(frames_dir, dataset_dir, corners, weights, min_conf=MIN_LABEL_CONF, val_every=VAL_EVERY,
+                  empty_per_frame=EMPTY_PER_FRAME, seed=1):
+    rng = random.Random(seed)
+    paths = frame_paths(frames_dir)
+    if not paths:
+        raise SystemExit(f"❌ No frames found in {frames_dir}")
+    lut = None
+    warper = BoardWarper(corners)
+    detector = YoloDetector(weights, "torch", 640)
+
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+    for split in ("train", "val"):
+        for name in CLASSES:
+            os.makedirs(os.path.join(dataset_dir, split, name))
+
+    labels = {}
+    tiles_written = {name: 0 for name in CLASSES}
+    kept = 0
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        if lut is None:
+            lut = build_square_lut(compute_homography(corners), frame.shape[1], frame.shape[0])
+        name = os.path.basename(path)
+        board_state = label_frame(detector, frame, lut, min_conf)
+        if board_state is None:
+            continue
+        split = "val" if kept % val_every == val_every - 1 else "train"
+        kept += 1
+        labels[name] = {"split": split, "board": board_to_fen(board_state)}
+
+        tiles = warper.tiles(frame)
+        empty = [square for square in range(64) if chess.square_name(square) not in board_state]
+        empty = set(rng.sample(empty, min(empty_per_frame, len(empty))))
+        stem = os.path.splitext(name)[0]
+        for square, tile in enumerate(tiles):
+            piece = board_state.get(chess.square_name(square))
+            if piece is None and square not in empty:
+                continue
+            label = piece_labels[piece] if piece else EMPTY_CLASS
+            cv2.imwrite(os.path.join(dataset_dir, split, label, f"{stem}_{chess.square_name(square)}.png"), tile)
+            tiles_written[label] += 1
+
+    with open(os.path.join(dataset_dir, "labels.json"), "w", encoding="utf-8") as f:
+        json.dump(labels, f, indent=2)
+    print(f"🗂 {kept}/{len(paths)} frames labeled ({len(paths) - kept} left out below conf {min_conf}), "
+          f"tiles: " + ", ".join(f"{name} {count}" for name, count in tiles_written.items()))
+    return labels
+
+
+def train(dataset_dir, epochs, base_model=BASE_MODEL, output=CLASSIFIER_WEIGHTS):
+    from ultralytics import YOLO
+
+    model = YOLO(base_model)
+    results = model.train(data=os.path.abspath(dataset_dir), imgsz=TILE_SIZE, epochs=epochs, batch=256,
+                          project=os.path.join(dataset_dir, "runs"), name="train", exist_ok=True)
+    shutil.copy(os.path.join(results.save_dir, "weights", "best.pt"), output)
+    print(f"✅ Classifier saved to {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the per-square classifier on YOLO-labeled frames.")
+    parser.add_argument("--frames", default="frames", help="directory of recorded camera frames")
+    parser.add_argument("--dataset", default=DATASET_DIR)
+    parser.add_argument("--weights", default="best.pt", help="YOLO detector that labels the frames")
+    parser.add_argument("--calibration", default=CALIBRATION_FILE, help="board calibration of the camera")
+    parser.add_argument("--min-conf", type=float, default=MIN_LABEL_CONF)
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--base-model", default=BASE_MODEL)
+    parser.add_argument("--output", default=CLASSIFIER_WEIGHTS)
+    parser.add_argument("--skip-build", action="store_true", help="train on an already built dataset")
+    parser.add_argument("--export", choices=BACKENDS, help="also export the trained classifier for this backend")
+    args = parser.parse_args()
+
+    if not args.skip_build:
+        corners = load_calibration(args.calibration) or default_corners(340, 940, 60, 660)
+        build_dataset(args.frames, args.dataset, corners, args.weights, min_conf=args.min_conf)
+    train(args.dataset, args.epochs, args.base_model, args.output)
+    if args.export:
+        print(f"✅ Exported model: {export_classifier(args.output, args.export)}")
+
+
+if __name__ == "__main__":
+    main()